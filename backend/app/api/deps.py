@@ -0,0 +1,13 @@
+"""Service instances shared by the route modules
+
+Every router uses the same AstronomyService and its DatabaseService, so
+the catalog hot swap and change watching started in main.lifespan reach
+all of them, and a worker holds one connection, one set of indexes and
+one shared-catalog handle.
+"""
+from app.services.astronomy import AstronomyService
+from app.services.zones import ZoneService
+
+astronomy_service = AstronomyService()
+db_service = astronomy_service.db
+zone_service = ZoneService(db_service)
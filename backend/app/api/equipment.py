@@ -1,6 +1,7 @@
 """Equipment API routes"""
 from fastapi import APIRouter
 import math
+from app.api.deps import db_service
 from app.models.equipment import (
     EquipmentPreset,
     FOVCalculateRequest,
@@ -65,10 +66,6 @@ PRESETS = [
     }
 ]
 
-# 存储的设备配置
-equipment_storage = {}
-
-
 @router.get("/presets")
 async def get_presets() -> dict:
     """获取预设配置"""
@@ -133,7 +130,7 @@ async def create_equipment(equipment: EquipmentCreate) -> dict:
         "fov_vertical": round(math.degrees(fov_v_rad), 2)
     }
 
-    equipment_storage[equipment_id] = new_equipment
+    await db_service.save_equipment(new_equipment)
 
     return {
         "success": True,
@@ -152,6 +149,6 @@ async def list_equipment() -> dict:
     """获取保存的设备配置列表"""
     return {
         "success": True,
-        "data": list(equipment_storage.values()),
+        "data": await db_service.list_equipment(),
         "message": "获取成功"
     }
@@ -1,6 +1,7 @@
 """Locations API routes"""
 from fastapi import APIRouter, HTTPException
 from typing import List
+from app.api.deps import db_service
 from app.models.location import (
     LocationCreate,
     LocationResponse,
@@ -10,21 +11,6 @@ from app.models.location import (
 
 router = APIRouter()
 
-# Mock 存储位置数据
-locations_storage = {
-    "loc_1": {
-        "id": "loc_1",
-        "name": "北京",
-        "latitude": 39.9042,
-        "longitude": 116.4074,
-        "timezone": "Asia/Shanghai",
-        "country": "CN",
-        "region": "Beijing",
-        "is_default": True
-    }
-}
-
-
 @router.post("/geolocate")
 async def geolocate():
     """自动定位"""
@@ -62,7 +48,7 @@ async def list_locations() -> dict:
     """获取保存的地点列表"""
     return {
         "success": True,
-        "data": list(locations_storage.values()),
+        "data": await db_service.list_locations(),
         "message": "获取成功"
     }
 
@@ -84,7 +70,7 @@ async def create_location(location: LocationCreate) -> dict:
         "is_default": False
     }
 
-    locations_storage[location_id] = new_location
+    await db_service.save_location(new_location)
 
     return {
         "success": True,
@@ -96,11 +82,9 @@ async def create_location(location: LocationCreate) -> dict:
 @router.delete("/{location_id}")
 async def delete_location(location_id: str) -> dict:
     """删除地点"""
-    if location_id not in locations_storage:
+    if not await db_service.delete_location(location_id):
         raise HTTPException(status_code=404, detail="地点不存在")
 
-    del locations_storage[location_id]
-
     return {
         "success": True,
         "message": "地点已删除"
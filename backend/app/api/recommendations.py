@@ -3,46 +3,39 @@ Recommendations API routes
 
 Uses real astronomical data from DatabaseService (OpenNGC database with 13,318 objects).
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from app.services.recommendation import RecommendationService
-from app.services.database import DatabaseService
+from app.api.deps import astronomy_service, db_service, zone_service
 from app.services.model_adapter import ModelAdapter
-from app.models.target import VisibleZone
+from app.services.zones import CompiledZone
 
 router = APIRouter()
-recommendation_service = RecommendationService()
-db_service = DatabaseService()
+recommendation_service = RecommendationService(astronomy_service)
 model_adapter = ModelAdapter()
 
+FULL_SKY_ZONE = CompiledZone(
+    "full_sky", "Full Sky",
+    [(0, 15), (90, 15), (180, 15), (270, 15), (270, 90), (180, 90), (90, 90), (0, 90)]
+)
+
 
 @router.post("")
 async def get_recommendations(request: dict) -> dict:
     """Get recommendations using real database"""
-    # Convert visible zones format
-    visible_zones = [
-        VisibleZone(
-            id=zone.get("id", f"zone_{i}"),
-            name=zone.get("name", f"Zone {i}"),
-            polygon=zone["polygon"],
-            priority=zone.get("priority", 1)
+    # Inline polygons and saved zones, each compiled once for the whole request
+    try:
+        visible_zones = await zone_service.resolve_zones(
+            request.get("visible_zones", []), request.get("zone_ids")
         )
-        for i, zone in enumerate(request.get("visible_zones", []))
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"无效的可视区域: {e}")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"区域不存在: {e.args[0]}")
 
-    # If no zones provided, create a default full-sky zone
+    # If no zones provided, use the default full-sky zone
     if not visible_zones:
-        visible_zones = [
-            VisibleZone(
-                id="full_sky",
-                name="Full Sky",
-                polygon=[
-                    (0, 15), (90, 15), (180, 15), (270, 15),
-                    (270, 90), (180, 90), (90, 90), (0, 90)
-                ],
-                priority=1
-            )
-        ]
+        visible_zones = [FULL_SKY_ZONE]
 
     # Generate recommendations with real database
     recommendations = await recommendation_service.generate_recommendations(
@@ -79,12 +72,26 @@ async def get_recommendations(request: dict) -> dict:
         "average_score": round(average_score, 1)
     }
 
+    data = {
+        "recommendations": recommendations,
+        "summary": summary
+    }
+
+    # Optional composite targets: several objects in one frame
+    if request.get("include_groups"):
+        data["groups"] = await recommendation_service.recommend_groups(
+            observer_lat=request["location"]["latitude"],
+            observer_lon=request["location"]["longitude"],
+            date=datetime.fromisoformat(request["date"]),
+            equipment=request["equipment"],
+            visible_zones=visible_zones,
+            filters=request.get("filters"),
+            min_count=request.get("group_min_count", 3)
+        )
+
     return {
         "success": True,
-        "data": {
-            "recommendations": recommendations,
-            "summary": summary
-        },
+        "data": data,
         "message": "推荐生成成功"
     }
 
@@ -1,17 +1,22 @@
 """Sky Map API routes"""
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-from typing import Optional, List, Dict
-from app.services.astronomy import AstronomyService
-from app.services.database import DatabaseService
+from typing import Optional, List, Dict, Tuple
+import math
+from app.api.deps import astronomy_service, db_service
+from app.config import settings
 from app.services.model_adapter import ModelAdapter
+from app.services.sky_delta import (
+    encode_snapshot, decode_snapshot, view_viewport, compact_positions, diff_positions
+)
+from app.services.viewport import Viewport
 import logging
 
 # Constants
-DEFAULT_MAX_TARGETS = 500
 DEFAULT_LATITUDE = 39.9042  # Beijing
 DEFAULT_LONGITUDE = 116.4074  # Beijing
 HORIZON_THRESHOLD = 0.0
+FULL_SKY_FOV = 180.0  # Field of view of the unzoomed map (degrees)
 
 # Color mapping for target types
 TARGET_COLOR_MAP = {
@@ -25,75 +30,148 @@ TARGET_COLOR_MAP = {
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-astronomy_service = AstronomyService()
-db_service = DatabaseService()
 model_adapter = ModelAdapter()
 
 
-def _prepare_target_filters(target_types: List[str]) -> List[str]:
+def _prepare_target_filters(target_types: List[str]) -> Optional[List[str]]:
     """
     Prepare and normalize target type filters.
 
     Args:
-        target_types: List of target type names (lowercase)
+        target_types: List of API type names (galaxy, emission-nebula, ...)
 
     Returns:
-        List of normalized database type names (uppercase)
+        Matching database type names, or None for all types
     """
     if target_types:
-        # Normalize API type to database type (galaxy -> GALAXY)
-        return [obj_type.upper() for obj_type in target_types]
-    else:
-        # Default types when no filter specified
-        return ["GALAXY", "NEBULA", "CLUSTER"]
-
-
-def _calculate_targets_positions(
-    targets: list,
-    location: Dict[str, float],
-    timestamp: datetime
-) -> List[Dict]:
+        return model_adapter.db_types(target_types)
+    return None
+
+
+def _number(request: dict, key: str) -> Optional[float]:
     """
-    Calculate positions for a list of targets.
+    A finite numeric request field, or None when absent
 
-    Args:
-        targets: List of target objects with ra/dec
-        location: Location dict with latitude/longitude
-        timestamp: Datetime for calculation
+    Raises:
+        HTTPException: 400 for anything else
+    """
+    value = request.get(key)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise HTTPException(status_code=400, detail=f"Invalid {key}: {value!r}")
+    return number
+
+
+def _parse_viewport(request: dict) -> Optional[Viewport]:
+    """
+    The request's alt/az viewport widened by its margin, if any.
+
+    `viewport` is {azimuth, altitude, width, height} or
+    {az_min, az_max, alt_min, alt_max}; `margin` defaults to
+    SKYMAP_VIEWPORT_MARGIN degrees.
+    """
+    viewport = request.get("viewport")
+    if not viewport:
+        return None
+    margin = _number(request, "margin")
+    margin = settings.SKYMAP_VIEWPORT_MARGIN if margin is None else margin
+    try:
+        return Viewport.from_request(viewport, max(margin, 0.0))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid viewport: {str(e)}")
+
+
+def _level_of_detail(request: dict, viewport: Optional[Viewport] = None) -> Tuple[float, float, int]:
+    """
+    Derive the magnitude limit and target cap from the client's view.
+
+    The view is `fov` (degrees across), `zoom` (FULL_SKY_FOV / zoom), or
+    else the viewport's larger side.
+    Each halving of the field shows a quarter of the sky, and deep sky
+    counts grow roughly fourfold per magnitude, so the limit loosens by
+    one magnitude per zoom doubling and the density on screen stays about
+    the same. `magnitude_limit` and `max_targets` override the derived
+    values; the cap never exceeds SKYMAP_MAX_TARGETS.
 
     Returns:
-        List of target dicts with altitude/azimuth
+        (fov, magnitude_limit, max_targets)
     """
-    targets_with_position = []
-
-    for target in targets:
-        try:
-            alt, az = astronomy_service.calculate_position(
-                target.ra,
-                target.dec,
-                location.get("latitude", DEFAULT_LATITUDE),
-                location.get("longitude", DEFAULT_LONGITUDE),
-                timestamp
-            )
-
-            # Only include targets above horizon
-            if alt > HORIZON_THRESHOLD:
-                color = TARGET_COLOR_MAP.get(target.type, "#FFFFFF")
-
-                targets_with_position.append({
-                    "id": target.id,
-                    "name": target.name,
-                    "altitude": round(alt, 2),
-                    "azimuth": round(az, 2),
-                    "type": target.type,
-                    "magnitude": target.magnitude,
-                    "color": color
-                })
-        except Exception as e:
-            logger.error(f"Error calculating position for {target.id}: {e}")
-            continue
+    fov, zoom = _number(request, "fov"), _number(request, "zoom")
+    if fov is None and zoom is None and viewport is not None:
+        fov = viewport.extent
+    if fov is None:
+        fov = FULL_SKY_FOV / max(zoom or 1.0, 1.0)
+    fov = min(max(fov, 0.01), FULL_SKY_FOV)
+
+    magnitude_limit = _number(request, "magnitude_limit")
+    if magnitude_limit is None:
+        magnitude_limit = settings.SKYMAP_BASE_MAGNITUDE + math.log2(FULL_SKY_FOV / fov)
+
+    max_targets = int(_number(request, "max_targets") or settings.SKYMAP_MAX_TARGETS)
+    max_targets = min(max(max_targets, 1), settings.SKYMAP_MAX_TARGETS)
+    return fov, magnitude_limit, max_targets
+
+
+def _target_metadata(row: dict) -> Dict:
+    """Static sky map fields of a catalog row, cached by delta clients"""
+    api_type = model_adapter._normalize_type(row["type"])
+    return {
+        "name": row["name"],
+        "type": api_type,
+        # The magnitude unknown objects were filtered and ranked as
+        "magnitude": row["magnitude"] if row["magnitude"] is not None else settings.SKYMAP_UNKNOWN_MAGNITUDE,
+        "color": TARGET_COLOR_MAP.get(api_type, "#FFFFFF")
+    }
+
+
+def _target_payload(row: dict) -> Dict:
+    """Sky map entry for a sky_view() row"""
+    return {
+        "id": row["id"],
+        "altitude": round(row["altitude"], 2),
+        "azimuth": round(row["azimuth"], 2),
+        **_target_metadata(row)
+    }
+
+
+def _previous_view(request: dict, version: str) -> Optional[dict]:
+    """
+    The view of the request's `since` token, or None when there is none
+    or it belongs to another catalog version (the client then starts over)
+    """
+    token = request.get("since")
+    if not token:
+        return None
+    try:
+        view = decode_snapshot(str(token))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot token: {str(e)}")
+    return view if view["version"] == version else None
 
-    return targets_with_position
+
+async def _view_rows(view: dict) -> Tuple[List[dict], bool]:
+    """
+    sky_view() rows of a snapshot view, and whether max_targets cut any off
+
+    One row past the cap is fetched to tell an exact fit from a cut.
+    """
+    rows = await astronomy_service.sky_view(
+        view["latitude"],
+        view["longitude"],
+        datetime.fromisoformat(view["timestamp"]),
+        obj_types=view["obj_types"],
+        magnitude_limit=view["magnitude_limit"],
+        max_count=view["max_targets"] + 1,
+        unknown_magnitude=view["unknown_magnitude"],
+        min_altitude=HORIZON_THRESHOLD,
+        viewport=view_viewport(view)
+    )
+    return rows[:view["max_targets"]], len(rows) > view["max_targets"]
 
 
 @router.post("/data")
@@ -101,7 +179,18 @@ async def get_sky_map_data(request: dict) -> dict:
     """
     获取天空图数据
 
-    Uses real astronomical database (13,318+ objects) instead of mock data.
+    Covers the whole catalog (all types unless target_types is given):
+    alt/az is computed for every object at once, and the level of detail
+    (see _level_of_detail) keeps the brightest objects above the horizon.
+    With a `viewport` only objects inside it (plus `margin`) are returned,
+    and only the RA/Dec region around it is positioned.
+
+    Every response carries a `snapshot` token. With `delta: true` or a
+    `since` token the targets come as `delta` instead: objects that
+    `entered` the view, ids that `left` it and `moved` positions, each
+    position [id, altitude, azimuth]. `metadata` holds name, type,
+    magnitude and color of entered objects, unless `catalog_version`
+    names the version the client already cached from /catalog.
     """
     try:
         location = request.get("location", {})
@@ -142,24 +231,52 @@ async def get_sky_map_data(request: dict) -> dict:
 
         # Load targets if requested
         if include_targets:
-            # Prepare type filters
-            db_types = _prepare_target_filters(target_types)
-
-            # Load targets from database
-            all_db_objects = []
-            for db_type in db_types:
-                objects = await db_service.get_objects_by_type(db_type)
-                all_db_objects.extend(objects[:DEFAULT_MAX_TARGETS])
-
-            # Convert database models to API models
-            targets = [model_adapter.to_target(obj) for obj in all_db_objects]
-
-            # Calculate positions
-            targets_with_position = _calculate_targets_positions(
-                targets, location, timestamp
-            )
-
-            data["targets"] = targets_with_position
+            viewport = _parse_viewport(request)
+            fov, magnitude_limit, max_targets = _level_of_detail(request, viewport)
+            # Both views below read the arrays sky_catalog() returned: nothing yields in between
+            version, _ = await astronomy_service.sky_catalog()
+            view = {
+                "version": version,
+                "latitude": float(location.get("latitude", DEFAULT_LATITUDE)),
+                "longitude": float(location.get("longitude", DEFAULT_LONGITUDE)),
+                "timestamp": timestamp.isoformat(),
+                "obj_types": _prepare_target_filters(target_types),
+                "magnitude_limit": magnitude_limit,
+                "max_targets": max_targets,
+                "unknown_magnitude": settings.SKYMAP_UNKNOWN_MAGNITUDE,
+                "viewport": viewport.bounds if viewport is not None else None
+            }
+            previous = _previous_view(request, version)
+            rows, truncated = await _view_rows(view)
+
+            if request.get("delta") or request.get("since"):
+                current = compact_positions(rows)
+                if previous is not None:
+                    previous_rows, _ = await _view_rows(previous)
+                    entered, left, moved = diff_positions(compact_positions(previous_rows), current)
+                else:
+                    entered, left, moved = current, [], []
+                data["delta"] = {
+                    "full": previous is None,
+                    "entered": entered,
+                    "left": left,
+                    "moved": moved
+                }
+                if request.get("catalog_version") != version:
+                    new_ids = {position[0] for position in entered}
+                    data["metadata"] = {
+                        row["id"]: _target_metadata(row) for row in rows if row["id"] in new_ids
+                    }
+            else:
+                data["targets"] = [_target_payload(row) for row in rows]
+            data["snapshot"] = encode_snapshot(view)
+            data["catalog_version"] = version
+            data["lod"] = {
+                "fov": fov,
+                "magnitude_limit": round(magnitude_limit, 2),
+                "max_targets": max_targets,
+                "truncated": truncated
+            }
 
         return {
             "success": True,
@@ -175,6 +292,35 @@ async def get_sky_map_data(request: dict) -> dict:
         raise HTTPException(status_code=500, detail=f"获取天空图数据失败: {str(e)}")
 
 
+@router.get("/catalog")
+async def get_sky_map_catalog(version: Optional[str] = None) -> dict:
+    """
+    Static sky map fields of every catalog object, keyed by id
+
+    Clients cache them under `version` and pass it as the data request's
+    `catalog_version`; a request naming the current version gets no
+    objects back.
+    """
+    try:
+        current, rows = await astronomy_service.sky_catalog()
+        objects = None
+        if version != current:
+            objects = {row["id"]: _target_metadata(row) for row in rows}
+        return {
+            "success": True,
+            "data": {
+                "version": current,
+                "not_modified": objects is None,
+                "objects": objects
+            },
+            "message": "获取天空图目录成功"
+        }
+
+    except Exception as e:
+        logger.error(f"Error in get_sky_map_catalog: {e}")
+        raise HTTPException(status_code=500, detail=f"获取天空图目录失败: {str(e)}")
+
+
 @router.post("/timeline")
 async def get_sky_map_timeline(request: dict) -> dict:
     """获取时间轴数据"""
@@ -1,14 +1,16 @@
 """Targets API endpoints with real database"""
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from app.services.astronomy import AstronomyService
+from app.api.deps import astronomy_service
+from app.services.sync_jobs import SyncJobQueue
 from app.models.database import DeepSkyObject, DatabaseStats
+from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-astronomy_service = AstronomyService()
+sync_jobs = SyncJobQueue(astronomy_service)
 
 
 # IMPORTANT: Specific routes must be defined before parameterized routes
@@ -18,16 +20,18 @@ astronomy_service = AstronomyService()
 @router.get("/search")
 async def search_targets(
     q: str = Query(..., description="搜索关键词"),
-    limit: int = Query(20, ge=1, le=100, description="返回数量限制")
+    limit: int = Query(20, ge=1, le=100, description="返回数量限制"),
+    fuzzy: bool = Query(False, description="容错模糊匹配")
 ):
     """
     Search objects by name or alias
 
     - Uses LIKE query on aliases table
     - Returns partial matches
+    - fuzzy=true: trigram similarity ranking, tolerates typos
     """
     try:
-        results = await astronomy_service.search_objects(q, limit)
+        results = await astronomy_service.search_objects(q, limit, fuzzy=fuzzy)
     except Exception as e:
         logger.error(f"Error searching objects: {e}")
         results = []
@@ -42,6 +46,132 @@ async def search_targets(
     }
 
 
+@router.get("/autocomplete")
+async def autocomplete_targets(
+    q: str = Query(..., min_length=1, description="名称或编号前缀"),
+    limit: int = Query(settings.AUTOCOMPLETE_LIMIT, ge=1, le=50, description="返回数量限制")
+):
+    """
+    Complete a partial name, catalog designation or alias
+
+    - Served from an in-memory prefix index (no SQLite query per keystroke)
+    - Ranked Messier objects first, then by brightness
+    """
+    try:
+        completions = await astronomy_service.autocomplete(q, limit)
+    except Exception as e:
+        logger.error(f"Error autocompleting '{q}': {e}")
+        completions = []
+
+    return {
+        "success": True,
+        "data": {
+            "completions": completions,
+            "count": len(completions)
+        },
+        "message": f"Found {len(completions)} completions for '{q}'"
+    }
+
+
+@router.get("/cone")
+async def cone_search(
+    ra: float = Query(..., ge=0, le=360, description="中心赤经 (度)"),
+    dec: float = Query(..., ge=-90, le=90, description="中心赤纬 (度)"),
+    radius: float = Query(..., gt=0, le=180, description="搜索半径 (度)"),
+    type: Optional[str] = Query(None, description="目标类型"),
+    limit: int = Query(100, ge=1, le=1000, description="返回数量限制")
+):
+    """
+    Find objects within a radius of a sky position
+
+    - Backed by an in-memory spatial index on unit vectors
+    - Correct across RA 0°/360° and near the poles
+    - Sorted by angular separation
+    """
+    try:
+        results = await astronomy_service.cone_search(ra, dec, radius, type, limit)
+    except Exception as e:
+        logger.error(f"Error in cone search at ({ra}, {dec}): {e}")
+        results = []
+
+    return {
+        "success": True,
+        "data": {
+            "targets": results,
+            "count": len(results)
+        },
+        "message": f"Found {len(results)} objects within {radius}° of ({ra}, {dec})"
+    }
+
+
+@router.get("/in-frame")
+async def objects_in_frame(
+    ra: float = Query(..., ge=0, le=360, description="画幅中心赤经 (度)"),
+    dec: float = Query(..., ge=-90, le=90, description="画幅中心赤纬 (度)"),
+    fov_horizontal: float = Query(..., gt=0, lt=180, description="水平视场角 (度)"),
+    fov_vertical: float = Query(..., gt=0, lt=180, description="垂直视场角 (度)"),
+    rotation: float = Query(0.0, ge=-360, le=360, description="画幅旋转角 (度, 自北向东)"),
+    type: Optional[str] = Query(None, description="目标类型")
+):
+    """
+    List every catalog object inside a camera frame
+
+    - FOV as returned by /equipment/calculate-fov
+    - Spatial prefilter + exact tangent-plane rectangle test
+    - Objects partially overlapping the frame edge are included
+    """
+    try:
+        results = await astronomy_service.objects_in_frame(
+            ra, dec, fov_horizontal, fov_vertical, rotation, type
+        )
+    except Exception as e:
+        logger.error(f"Error listing objects in frame at ({ra}, {dec}): {e}")
+        results = []
+
+    return {
+        "success": True,
+        "data": {
+            "targets": results,
+            "count": len(results)
+        },
+        "message": f"Found {len(results)} objects in frame"
+    }
+
+
+@router.get("/groups")
+async def find_groups(
+    fov_horizontal: float = Query(..., gt=0, lt=180, description="水平视场角 (度)"),
+    fov_vertical: float = Query(..., gt=0, lt=180, description="垂直视场角 (度)"),
+    min_count: int = Query(3, ge=2, le=50, description="每组最少天体数"),
+    type: Optional[str] = Query(None, description="目标类型"),
+    max_magnitude: Optional[float] = Query(None, description="最暗星等"),
+    limit: int = Query(20, ge=1, le=100, description="返回数量限制")
+):
+    """
+    Find groups of objects that fit in a single frame
+
+    - e.g. Leo Triplet, Markarian's Chain for a suitable FOV
+    - Neighbour search over the spatial index (no pairwise scan)
+    - Ranked by combined magnitude
+    """
+    try:
+        groups = await astronomy_service.find_groups(
+            fov_horizontal, fov_vertical, min_count, [type] if type else None, max_magnitude, limit
+        )
+    except Exception as e:
+        logger.error(f"Error finding groups: {e}")
+        groups = []
+
+    return {
+        "success": True,
+        "data": {
+            "groups": groups,
+            "count": len(groups)
+        },
+        "message": f"Found {len(groups)} groups"
+    }
+
+
 @router.get("/stats")
 async def get_statistics():
     """
@@ -65,7 +195,10 @@ async def get_statistics():
 
 
 @router.post("/sync")
-async def sync_from_simbad(object_ids: List[str]):
+async def sync_from_simbad(
+    object_ids: List[str],
+    background: bool = Query(False, description="作为后台任务执行，立即返回任务ID")
+):
     """
     Manually trigger SIMBAD sync for specific objects
 
@@ -73,17 +206,20 @@ async def sync_from_simbad(object_ids: List[str]):
     - Refreshing data
     - Adding new objects
     - Updating existing objects
+
+    Ids are queried in concurrent ADQL batches and saved in one transaction.
+    background=true: enqueue a persisted job, poll GET /sync/{job_id}
     """
-    synced = []
-    failed = []
-
-    for object_id in object_ids:
-        obj = await astronomy_service.simbad.query_object(object_id)
-        if obj:
-            await astronomy_service.db.save_object(obj)
-            synced.append(object_id)
-        else:
-            failed.append(object_id)
+    if background:
+        job = await sync_jobs.submit(object_ids)
+        return {
+            "success": True,
+            "data": job,
+            "message": f"Queued sync job {job['job_id']} for {job['total']} objects"
+        }
+
+    # Progress of a long sync is reported by the job endpoint (background=true)
+    synced, failed = await astronomy_service.sync_objects(object_ids)
 
     return {
         "success": True,
@@ -95,6 +231,25 @@ async def sync_from_simbad(object_ids: List[str]):
     }
 
 
+@router.get("/sync/{job_id}")
+async def get_sync_job(job_id: str):
+    """
+    Get background sync job status
+
+    - Progress is checkpointed, interrupted jobs resume after restart
+    - throughput in objects/s, eta_seconds while queued or running
+    """
+    job = await sync_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Sync job {job_id} not found")
+
+    return {
+        "success": True,
+        "data": job,
+        "message": f"Sync job {job_id} is {job['status']}"
+    }
+
+
 @router.get("")
 async def list_targets(
     type: Optional[str] = Query(None, description="目标类型"),
@@ -235,7 +390,10 @@ async def get_statistics():
 
 
 @router.post("/sync")
-async def sync_from_simbad(object_ids: List[str]):
+async def sync_from_simbad(
+    object_ids: List[str],
+    background: bool = Query(False, description="作为后台任务执行，立即返回任务ID")
+):
     """
     Manually trigger SIMBAD sync for specific objects
 
@@ -243,17 +401,20 @@ async def sync_from_simbad(object_ids: List[str]):
     - Refreshing data
     - Adding new objects
     - Updating existing objects
+
+    Ids are queried in concurrent ADQL batches and saved in one transaction.
+    background=true: enqueue a persisted job, poll GET /sync/{job_id}
     """
-    synced = []
-    failed = []
-
-    for object_id in object_ids:
-        obj = await astronomy_service.simbad.query_object(object_id)
-        if obj:
-            await astronomy_service.db.save_object(obj)
-            synced.append(object_id)
-        else:
-            failed.append(object_id)
+    if background:
+        job = await sync_jobs.submit(object_ids)
+        return {
+            "success": True,
+            "data": job,
+            "message": f"Queued sync job {job['job_id']} for {job['total']} objects"
+        }
+
+    # Progress of a long sync is reported by the job endpoint (background=true)
+    synced, failed = await astronomy_service.sync_objects(object_ids)
 
     return {
         "success": True,
@@ -5,16 +5,13 @@ Uses real astronomical data from DatabaseService (OpenNGC database with 13,318 o
 """
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-from app.services.astronomy import AstronomyService
 from app.services.visibility import VisibilityService
-from app.services.database import DatabaseService
+from app.api.deps import astronomy_service, db_service, zone_service
 from app.services.model_adapter import ModelAdapter
 from app.models.visibility import PositionRequest, VisibilityWindowsRequest, BatchPositionsRequest
 
 router = APIRouter()
-astronomy_service = AstronomyService()
-visibility_service = VisibilityService()
-db_service = DatabaseService()  # CHANGED: Use real database
+visibility_service = VisibilityService(astronomy_service)
 model_adapter = ModelAdapter()  # NEW: Model adapter
 
 
@@ -76,17 +73,13 @@ async def calculate_visibility_windows(request: VisibilityWindowsRequest) -> dic
     # Convert to API model
     target = model_adapter.to_target(obj)
 
-    # 转换可视区域格式
-    from app.models.target import VisibleZone
-    visible_zones = [
-        VisibleZone(
-            id=zone.get("id", f"zone_{i}"),
-            name=zone.get("name", f"Zone {i}"),
-            polygon=zone["polygon"],
-            priority=zone.get("priority", 1)
-        )
-        for i, zone in enumerate(request.visible_zones)
-    ]
+    # 请求内的多边形与已保存区域 (按 ID)，每个区域只编译一次
+    try:
+        visible_zones = await zone_service.resolve_zones(request.visible_zones, request.zone_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"无效的可视区域: {e}")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"区域不存在: {e.args[0]}")
 
     date = datetime.fromisoformat(request.date)
 
@@ -0,0 +1,59 @@
+"""Visible zones API routes
+
+Zones are saved in SQLite and compiled once per version (see
+app.services.zones), so compute endpoints can take `zone_ids` instead of
+re-sending and re-parsing full polygons.
+"""
+from fastapi import APIRouter, HTTPException
+from app.api.deps import zone_service
+from app.models.target import VisibleZoneCreate
+from app.services.zones import zone_payload
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_zones() -> dict:
+    """获取保存的可视区域"""
+    return {
+        "success": True,
+        "data": [zone_payload(zone) for zone in await zone_service.list_zones()],
+        "message": "获取成功"
+    }
+
+
+@router.post("")
+async def create_zone(zone: VisibleZoneCreate) -> dict:
+    """保存可视区域"""
+    saved = await zone_service.create_zone(zone.name, zone.polygon, zone.priority)
+    return {
+        "success": True,
+        "data": zone_payload(saved),
+        "message": "区域保存成功"
+    }
+
+
+@router.put("/{zone_id}")
+async def update_zone(zone_id: str, zone: VisibleZoneCreate) -> dict:
+    """更新可视区域"""
+    updated = await zone_service.update_zone(zone_id, zone.name, zone.polygon, zone.priority)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="区域不存在")
+
+    return {
+        "success": True,
+        "data": zone_payload(updated),
+        "message": "区域更新成功"
+    }
+
+
+@router.delete("/{zone_id}")
+async def delete_zone(zone_id: str) -> dict:
+    """删除可视区域"""
+    if not await zone_service.delete_zone(zone_id):
+        raise HTTPException(status_code=404, detail="区域不存在")
+
+    return {
+        "success": True,
+        "message": "区域已删除"
+    }
@@ -28,12 +28,43 @@ class Settings(BaseSettings):
     # 天文数据库配置
     USE_ONLINE_DATABASES: bool = True      # 是否使用在线数据库
     SIMBAD_TIMEOUT: int = 30               # SIMBAD 查询超时 (秒)
+    SIMBAD_MAX_CONNECTIONS: int = 10       # SIMBAD 连接池最大连接数
+    SIMBAD_MAX_KEEPALIVE: int = 5          # SIMBAD 连接池保活连接数
+    SIMBAD_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保活时间 (秒)
+    SIMBAD_BREAKER_THRESHOLD: int = 5      # 连续失败多少次后熔断 SIMBAD 查询
+    SIMBAD_BREAKER_RESET_TIMEOUT: float = 30.0  # 熔断后多久放行一次探测请求 (秒)
+    SIMBAD_LOOKUP_BUDGET: float = 2.0      # 单个请求等待 SIMBAD 回退查询的最长时间 (秒, 0 不限)
     GAIA_TIMEOUT: int = 60                 # Gaia 查询超时 (秒)
+    NEGATIVE_CACHE_TTL: int = 86400        # SIMBAD 未找到结果的缓存时间 (秒)
+    SIMBAD_BATCH_SIZE: int = 50            # 同步时每个 ADQL IN 查询的天体数
+    SIMBAD_SYNC_CONCURRENCY: int = 4       # 同步时并发查询批次数
+    SYNC_JOB_MAX_RATE: float = 50.0        # 后台同步任务每秒最多查询天体数 (0 不限速)
+    SYNC_JOB_LEASE: float = 120.0          # 同步任务租约 (秒)，持有者超过此时间未写检查点视为已退出，可被其他 worker 接管
 
     # 缓存配置
     ENABLE_CACHE: bool = True
     CACHE_DIR: str = "data/cache"
-    CACHE_TTL: int = 86400                 # 缓存过期时间 (秒)
+    CACHE_TTL: int = 86400                 # 缓存过期时间 (秒, 0 永不过期)
+    CACHE_MAX_SIZE_MB: int = 100           # SIMBAD TAP 响应磁盘缓存上限 (MB)，超出按 LRU 淘汰
+
+    # 搜索索引配置
+    ENABLE_SEARCH_INDEX: bool = True       # 是否启用内存前缀索引 (自动补全)
+    AUTOCOMPLETE_LIMIT: int = 10           # 自动补全默认返回数量
+
+    # 目录热切换配置
+    CATALOG_POLL_INTERVAL: float = 5.0     # 检查数据库文件是否被替换的间隔 (秒)
+    CATALOG_SWAP_GRACE: float = 5.0        # 切换后旧连接保留时间 (秒)，供进行中的查询完成
+    USE_CATALOG_STORE: bool = True         # 启动时优先内存映射导入脚本生成的二进制列存储
+    CATALOG_STORE_DIR: str = "app/data/catalog"  # 二进制列存储目录 (.npy 列 + 字符串偏移)
+    SHARED_CATALOG: bool = False           # 多 worker 部署时通过共享内存共享目录数组与空间索引
+    SHARED_CATALOG_NAME: str = "skywatcher"  # 共享内存段名前缀
+    SHARED_CATALOG_WAIT: float = 30.0      # 等待其他 worker 发布共享目录的最长时间 (秒)
+
+    # 天空图配置
+    SKYMAP_MAX_TARGETS: int = 2000         # 天空图单次最多返回天体数 (按亮度优先保留)
+    SKYMAP_BASE_MAGNITUDE: float = 10.0    # 全天视野 (180°) 的极限星等，视野每缩小一半放宽 1 等
+    SKYMAP_UNKNOWN_MAGNITUDE: float = 14.0  # 星等未知的天体按此星等参与筛选和排序
+    SKYMAP_VIEWPORT_MARGIN: float = 5.0    # 视口裁剪时向四周额外保留的角度 (度)
 
     # OpenNGC 配置
     OPENNGC_PATH: str = "data/catalogs/opengc.csv"
@@ -2,6 +2,7 @@
 -- Deep Sky Objects Database Schema
 
 -- Drop tables if exists (for clean import)
+DROP TABLE IF EXISTS objects_api;
 DROP TABLE IF EXISTS observational_info;
 DROP TABLE IF EXISTS aliases;
 DROP TABLE IF EXISTS objects;
@@ -41,8 +42,66 @@ CREATE TABLE observational_info (
   FOREIGN KEY (object_id) REFERENCES objects(id) ON DELETE CASCADE
 );
 
+-- Denormalized ready-to-serve rows (ModelAdapter.to_api_row), written at import/save time
+CREATE TABLE objects_api (
+  id TEXT PRIMARY KEY,
+  type TEXT NOT NULL,
+  name TEXT NOT NULL,
+  name_en TEXT NOT NULL,
+  api_type TEXT NOT NULL,
+  ra REAL NOT NULL,
+  dec REAL NOT NULL,
+  magnitude REAL NOT NULL,
+  size REAL NOT NULL,
+  constellation TEXT NOT NULL,
+  difficulty INTEGER NOT NULL,
+  description TEXT,
+  optimal_season TEXT NOT NULL,
+  optimal_fov_min INTEGER NOT NULL,
+  optimal_fov_max INTEGER NOT NULL,
+  tags TEXT NOT NULL
+);
+
+-- Content hash of each row imported from OpenNGC (incremental re-imports)
+DROP TABLE IF EXISTS catalog_rows;
+CREATE TABLE catalog_rows (
+  object_id TEXT PRIMARY KEY,
+  content_hash TEXT NOT NULL
+);
+
+-- Catalog metadata (version stamped by the importer on every rebuild)
+CREATE TABLE IF NOT EXISTS catalog_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+
+-- SIMBAD negative cache (ids SIMBAD has no object for); survives catalog re-imports
+CREATE TABLE IF NOT EXISTS lookup_misses (
+  query_key TEXT PRIMARY KEY,
+  missed_at REAL NOT NULL
+);
+
+-- Background SIMBAD sync jobs (checkpointed, resumed after restart)
+CREATE TABLE IF NOT EXISTS sync_jobs (
+  id TEXT PRIMARY KEY,
+  status TEXT NOT NULL,
+  object_ids TEXT NOT NULL,
+  processed INTEGER NOT NULL DEFAULT 0,
+  synced TEXT NOT NULL DEFAULT '[]',
+  failed TEXT NOT NULL DEFAULT '[]',
+  error TEXT,
+  created_at REAL NOT NULL,
+  started_at REAL,
+  finished_at REAL,
+  owner TEXT,
+  heartbeat REAL,
+  active_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sync_jobs_status ON sync_jobs(status);
+
 -- Create indexes for performance
 CREATE INDEX idx_objects_ra_dec ON objects(ra, dec);
 CREATE INDEX idx_objects_constellation ON objects(constellation);
 CREATE INDEX idx_objects_type ON objects(type);
 CREATE INDEX idx_aliases_alias ON aliases(alias);
+CREATE INDEX idx_objects_api_type ON objects_api(type);
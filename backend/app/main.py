@@ -1,17 +1,67 @@
 """FastAPI application entry point"""
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from app.api import locations, equipment, targets, visibility, recommendations, skymap
+from app.api import deps, locations, equipment, targets, visibility, recommendations, skymap, zones
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm in-memory indexes on startup, release connections on shutdown"""
+    await deps.astronomy_service.simbad.start()
+
+    # Baseline for picking up objects other workers save later
+    try:
+        await deps.astronomy_service.refresh_external_changes()
+    except Exception as e:
+        logger.error(f"Failed to read catalog change marker at startup: {e}")
+
+    # Indexes are rebuilt lazily on first use if startup fails
+    if settings.ENABLE_SEARCH_INDEX:
+        try:
+            await deps.astronomy_service.load_indexes()
+        except Exception as e:
+            logger.error(f"Failed to build search indexes at startup: {e}")
+
+    try:
+        await deps.astronomy_service.load_spatial_index()
+    except Exception as e:
+        logger.error(f"Failed to build spatial index at startup: {e}")
+
+    try:
+        await targets.sync_jobs.start()
+    except Exception as e:
+        logger.error(f"Failed to start SIMBAD sync worker: {e}")
+
+    # Hot swap catalogs atomically replaced by scripts/import_openngc.py
+    catalog_watch = asyncio.create_task(
+        deps.astronomy_service.watch_catalog(settings.CATALOG_POLL_INTERVAL)
+    )
+
+    yield
+
+    catalog_watch.cancel()
+    await targets.sync_jobs.stop()
+    await deps.astronomy_service.simbad.close()
+    deps.astronomy_service.shared_catalog.close()
+    await deps.astronomy_service.db.close()
+
+
 app = FastAPI(
     title="Deep Sky Target Recommender API",
     description="深空拍摄目标推荐工具后端API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS 配置
@@ -40,6 +90,12 @@ app.include_router(
     tags=["equipment"]
 )
 
+app.include_router(
+    zones.router,
+    prefix="/api/v1/visible-zones",
+    tags=["visible-zones"]
+)
+
 app.include_router(
     targets.router,
     prefix="/api/v1/targets",
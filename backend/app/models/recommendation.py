@@ -44,7 +44,8 @@ class RecommendationRequest(BaseModel):
     location: dict  # {latitude, longitude, timezone}
     date: str  # YYYY-MM-DD
     equipment: dict  # {fov_horizontal, fov_vertical}
-    visible_zones: List[dict]
+    visible_zones: List[dict] = []
+    zone_ids: Optional[List[str]] = None  # 已保存区域的 ID
     filters: Optional[dict] = None
     sort_by: str = "score"
     limit: int = Field(default=20, ge=1, le=100)
@@ -0,0 +1,77 @@
+"""Compact internal records for service-layer data flow
+
+Plain __slots__ classes with the same attributes as the pydantic database
+models, so services (and ModelAdapter) can use either. Rows read in bulk
+from SQLite are trusted, so they skip validation here; pydantic models are
+built only at the API boundary via to_model() / model_dump().
+TargetRecord is a tuple of just the columns ranking needs.
+"""
+from typing import List, NamedTuple, Optional
+
+from app.models.database import DeepSkyObject, ObservationalInfo
+
+
+class ObservationalRecord:
+    """Slotted counterpart of ObservationalInfo"""
+
+    __slots__ = ("best_month", "difficulty", "min_aperture", "min_magnitude", "notes")
+
+    def __init__(self, best_month: Optional[int] = None, difficulty: Optional[str] = None,
+                 min_aperture: Optional[float] = None, min_magnitude: Optional[float] = None,
+                 notes: Optional[str] = None):
+        self.best_month = best_month
+        self.difficulty = difficulty
+        self.min_aperture = min_aperture
+        self.min_magnitude = min_magnitude
+        self.notes = notes
+
+    def to_model(self) -> ObservationalInfo:
+        return ObservationalInfo(**{name: getattr(self, name) for name in self.__slots__})
+
+
+class ObjectRecord:
+    """Slotted counterpart of DeepSkyObject"""
+
+    __slots__ = ("id", "name", "type", "ra", "dec", "magnitude", "size_major", "size_minor",
+                 "constellation", "surface_brightness", "aliases", "observational_info")
+
+    def __init__(self, id: str, name: str, type: str, ra: float, dec: float,
+                 magnitude: Optional[float] = None, size_major: Optional[float] = None,
+                 size_minor: Optional[float] = None, constellation: Optional[str] = None,
+                 surface_brightness: Optional[float] = None, aliases: Optional[List[str]] = None,
+                 observational_info: Optional[ObservationalRecord] = None):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.ra = ra
+        self.dec = dec
+        self.magnitude = magnitude
+        self.size_major = size_major
+        self.size_minor = size_minor
+        self.constellation = constellation
+        self.surface_brightness = surface_brightness
+        self.aliases = aliases if aliases is not None else []
+        self.observational_info = observational_info
+
+    def __repr__(self) -> str:
+        return f"ObjectRecord(id={self.id!r}, type={self.type!r})"
+
+    def to_model(self) -> DeepSkyObject:
+        """Validated pydantic model for API responses"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        if self.observational_info is not None:
+            fields["observational_info"] = self.observational_info.to_model()
+        return DeepSkyObject(**fields)
+
+    def model_dump(self) -> dict:
+        """Same dict DeepSkyObject.model_dump() would produce"""
+        return self.to_model().model_dump()
+
+
+class TargetRecord(NamedTuple):
+    """Compact numeric view of a target, enough to rank it"""
+    id: str
+    ra: float
+    dec: float
+    magnitude: float
+    size: float
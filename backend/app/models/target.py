@@ -41,19 +41,20 @@ class VisibleZone(BaseModel):
     """可视区域模型"""
     id: str
     name: str
-    polygon: List[Tuple[float, float]] = Field(..., description="[方位角, 高度角]")
+    polygon: List[Tuple[float, float]] = Field(..., min_length=3, description="[方位角, 高度角]")
     priority: int = Field(default=1, ge=1, le=10)
 
 
 class VisibleZoneCreate(BaseModel):
     """创建可视区域请求"""
     name: str
-    polygon: List[Tuple[float, float]]
+    polygon: List[Tuple[float, float]] = Field(..., min_length=3, description="[方位角, 高度角]")
     priority: int = Field(default=1, ge=1, le=10)
 
 
 class VisibleZoneResponse(VisibleZone):
     """可视区域响应"""
+    version: int
     azimuth_range: Tuple[float, float]
     altitude_range: Tuple[float, float]
 
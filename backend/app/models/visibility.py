@@ -28,7 +28,8 @@ class VisibilityWindowsRequest(BaseModel):
     target_id: str
     location: dict  # {latitude, longitude}
     date: str  # YYYY-MM-DD
-    visible_zones: List[dict]
+    visible_zones: List[dict] = []
+    zone_ids: Optional[List[str]] = None  # 已保存区域的 ID，与 visible_zones 合并使用
 
 
 class VisibilityWindowsResponse(BaseModel):
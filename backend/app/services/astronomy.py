@@ -1,11 +1,24 @@
 """Enhanced astronomy service with database + SIMBAD fallback"""
+import asyncio
 import logging
-from typing import Tuple, Optional, List
+import time
+from typing import Tuple, Optional, List, Sequence
 from datetime import datetime, timedelta
 import math
+import numpy as np
 from app.services.database import DatabaseService
-from app.services.simbad import SIMBADService
+from app.services.simbad import SIMBADService, SIMBADUnavailableError
+from app.services.search_index import PrefixIndex, AliasIndex, TrigramIndex, normalize_designation
+from app.services.tap_cache import TAPResponseCache
+from app.services.catalog_store import (
+    CatalogRows, CatalogStore, OverlayRows, StringColumn, STRING_COLUMNS, columns_from_rows
+)
+from app.services.shared_catalog import SharedCatalog
+from app.services.spatial_index import SpatialIndex, gnomonic_projection, radec_to_xyz, tangent_to_radec
+from app.services.viewport import Viewport
 from app.models.database import DeepSkyObject
+from app.models.records import ObjectRecord
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +27,21 @@ class AstronomyService:
 
     def __init__(self):
         self.db = DatabaseService()
-        self.simbad = SIMBADService()
+        self.simbad = SIMBADService(cache=TAPResponseCache.from_settings())
+        self.prefix_index = PrefixIndex()
+        self.alias_index = AliasIndex()
+        self.trigram_index = TrigramIndex()
+        self.spatial_index = SpatialIndex()
+        self.shared_catalog = SharedCatalog(settings.SHARED_CATALOG_NAME)
+        self._sky_rows = []  # list of dicts, or rows over the mmapped catalog store
+        self._sky_types = np.empty(0, dtype=str)
+        self._sky_radii = np.empty(0)  # Object extent radius (degrees)
+        self._sky_magnitudes = np.empty(0)  # NaN where unknown
+        self.sky_version = None  # Catalog key of the loaded sky arrays (see _catalog_key)
+        self._misses = {}  # normalized id -> time SIMBAD last found nothing
+        self._inflight = {}  # normalized id -> pending SIMBAD lookup
+        self._data_version = None  # PRAGMA data_version at the last refresh_external_changes
+        self._updated_since = None  # objects.updated_at watermark for external changes
 
     # ========== Data Access Methods ==========
 
@@ -22,8 +49,12 @@ class AstronomyService:
         """
         Get object with automatic fallback:
         1. Try local database (fast, <5ms)
-        2. Fallback to SIMBAD API (slow, ~200-500ms)
-        3. Cache API results locally
+        2. Resolve aliases ("M 31", "m031", "NGC 224") via in-memory index
+        3. Fallback to SIMBAD API (slow, ~200-500ms), skipped for ids SIMBAD
+           recently did not know; concurrent lookups of one id share a query.
+           Waits at most SIMBAD_LOOKUP_BUDGET, then returns None and lets the
+           lookup finish in the background
+        4. Cache API results (and misses) locally
         """
         # Try local database first
         logger.debug(f"Looking up object {object_id} in local database")
@@ -33,29 +64,726 @@ class AstronomyService:
             logger.info(f"Found {object_id} in local database")
             return obj
 
+        canonical_id = await self.resolve_alias(object_id)
+        if canonical_id and canonical_id != object_id:
+            obj = await self.db.get_object_by_id(canonical_id)
+            if obj:
+                logger.info(f"Resolved {object_id} to {canonical_id} in local database")
+                return obj
+
         # Not found locally, try SIMBAD API
+        key = normalize_designation(object_id)
+        if await self._is_known_miss(key):
+            logger.info(f"Object {object_id} recently not found in SIMBAD, skipping lookup")
+            return None
+
+        lookup = self._inflight.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup_simbad(object_id, key))
+            self._inflight[key] = lookup
+            lookup.add_done_callback(lambda task: self._lookup_done(key, task))
+        else:
+            logger.info(f"Joining in-flight SIMBAD lookup for {object_id}")
+
+        # Shield so one cancelled or timed-out request does not cancel the
+        # shared lookup; past the budget it finishes in the background and
+        # caches its result for later requests.
+        budget = settings.SIMBAD_LOOKUP_BUDGET
+        try:
+            return await asyncio.wait_for(asyncio.shield(lookup), budget if budget > 0 else None)
+        except asyncio.TimeoutError:
+            logger.info(f"SIMBAD lookup for {object_id} exceeded {budget}s budget, deferring")
+            return None
+
+    def _lookup_done(self, key: str, task: asyncio.Future) -> None:
+        """Forget a finished lookup, logging errors nobody awaited"""
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"SIMBAD lookup for {key} failed: {task.exception()}")
+
+    async def _lookup_simbad(self, object_id: str, key: str) -> Optional[DeepSkyObject]:
+        """Single SIMBAD lookup shared by concurrent callers"""
         logger.info(f"Object {object_id} not found locally, querying SIMBAD API")
-        obj = await self.simbad.query_object(object_id)
+        try:
+            obj = await self.simbad.query_object(object_id, raise_on_error=True)
+        except SIMBADUnavailableError as e:
+            # Transient failure: not a miss, try again next request
+            logger.error(f"SIMBAD unavailable for {object_id}: {e}")
+            return None
 
         if obj:
             # Cache result locally
             logger.info(f"SIMBAD returned {object_id}, caching locally")
-            await self.db.save_object(obj)
+            await self.cache_object(obj)
             return obj
 
         # Not found anywhere
         logger.warning(f"Object {object_id} not found in local DB or SIMBAD")
+        missed_at = time.time()
+        self._misses[key] = missed_at
+        await self.db.save_lookup_miss(key, missed_at)
         return None
 
-    async def search_objects(self, name: str, limit: int = 20) -> List[DeepSkyObject]:
-        """Search objects by name (local database only)"""
-        return await self.db.search_objects(name, limit)
+    async def _is_known_miss(self, key: str) -> bool:
+        """Whether SIMBAD reported no object for key within NEGATIVE_CACHE_TTL"""
+        missed_at = self._misses.get(key)
+        if missed_at is None:
+            missed_at = await self.db.get_lookup_miss(key)
+            if missed_at is None:
+                return False
+            self._misses[key] = missed_at
+
+        if time.time() - missed_at < settings.NEGATIVE_CACHE_TTL:
+            return True
+        del self._misses[key]
+        return False
+
+    async def cache_object(self, obj: DeepSkyObject) -> None:
+        """Persist an object fetched from SIMBAD and update in-memory indexes"""
+        await self.db.save_object(obj)
+        self._index_objects([obj])
+
+    async def cache_objects(self, objs: List[DeepSkyObject]) -> None:
+        """Persist many SIMBAD objects in one transaction and update indexes"""
+        if not objs:
+            return
+        await self.db.save_objects(objs)
+        self._index_objects(objs)
+
+    def _index_objects(self, objs: List[DeepSkyObject]) -> None:
+        """Apply freshly saved objects to the in-memory indexes"""
+        self._index_entries([(obj.id, obj.name, obj.magnitude, obj.aliases) for obj in objs])
+        # Positions changed; rebuilt from SQLite on the next positional query
+        self.spatial_index.loaded = False
+
+    def _index_entries(self, entries: List[tuple]) -> None:
+        """Add or replace (id, name, magnitude, aliases) entries in the loaded name indexes"""
+        for object_id, _, _, aliases in entries:
+            for designation in [object_id] + list(aliases):
+                self._misses.pop(normalize_designation(designation), None)
+        if self.prefix_index.loaded:
+            self.prefix_index.add_many(entries)
+        for object_id, name, _, aliases in entries:
+            if self.alias_index.loaded:
+                self.alias_index.add(object_id, name, aliases)
+            if self.trigram_index.loaded:
+                self.trigram_index.add(object_id, name, aliases)
+
+    async def refresh_external_changes(self) -> List[str]:
+        """
+        Apply objects other processes (workers, sync jobs) saved since the last call
+
+        Costs one PRAGMA data_version when nothing changed. Otherwise the
+        objects written since the updated_at watermark are re-read and
+        applied like locally cached ones. The first call records the baseline.
+
+        Returns:
+            ids of the refreshed objects
+        """
+        data_version = await self.db.get_data_version()
+        if data_version == self._data_version:
+            return []
+        baseline = self._data_version is None
+        self._data_version = data_version
+
+        # Read the new watermark first: rows committed meanwhile are at or after it
+        since, self._updated_since = self._updated_since, await self.db.get_last_update() or ""
+        if baseline:
+            return []
+
+        entries = await self.db.get_search_entries(updated_since=since)
+        self._index_entries(entries)
+        if entries:
+            self.spatial_index.loaded = False
+            logger.info(f"Refreshed {len(entries)} objects saved by other processes")
+        return [entry[0] for entry in entries]
+
+    async def sync_objects(self, object_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Fetch objects from SIMBAD in batches and store them locally
+
+        Ids are split into ADQL IN batches of SIMBAD_BATCH_SIZE, at most
+        SIMBAD_SYNC_CONCURRENCY batches run at once, and every result is
+        written in one transaction at the end. Long syncs report progress
+        through their job record (see SyncJobQueue), one checkpoint at a time.
+
+        Returns:
+            (synced ids, failed ids), both in request order
+        """
+        ids = list(dict.fromkeys(object_ids))
+        batch_size = max(1, settings.SIMBAD_BATCH_SIZE)
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, settings.SIMBAD_SYNC_CONCURRENCY))
+
+        fetched = []
+        done = 0
+
+        async def run_batch(batch: List[str]) -> None:
+            nonlocal done
+            async with semaphore:
+                try:
+                    objs = await self.simbad.query_objects_batch(batch, raise_on_error=True)
+                except SIMBADUnavailableError as e:
+                    logger.error(f"SIMBAD batch of {len(batch)} objects failed: {e}")
+                    objs = []
+            fetched.extend(objs)
+            done += len(batch)
+            logger.info(f"SIMBAD sync progress: {done}/{len(ids)}")
+
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        await self.cache_objects(fetched)
+
+        synced_ids = {obj.id for obj in fetched}
+        synced = [object_id for object_id in ids if object_id in synced_ids]
+        failed = [object_id for object_id in ids if object_id not in synced_ids]
+        return synced, failed
+
+    async def load_indexes(self) -> None:
+        """Build in-memory name indexes from the local catalog"""
+        entries = await self._search_entries()
+        self.prefix_index.build(entries)
+        self.alias_index.build(entries)
+        self.trigram_index.build(entries)
+        logger.info(
+            f"Built prefix index with {len(self.prefix_index)} keys, "
+            f"alias index with {len(self.alias_index)} designations, "
+            f"trigram index with {len(self.trigram_index)} labels"
+        )
+
+    async def _search_entries(self) -> List[tuple]:
+        """(id, name, magnitude, aliases) per object, from the catalog store when current"""
+        store = await self._open_catalog_store()
+        entries = store.search_entries() if store is not None else None
+        if entries is None:
+            return await self.db.get_search_entries()
+
+        newer = await self.db.get_search_entries(updated_since=store.last_update)
+        if newer:
+            replaced = {entry[0] for entry in newer}
+            entries = [entry for entry in entries if entry[0] not in replaced] + newer
+        return entries
+
+    async def reload_catalog(self) -> None:
+        """
+        Switch to a catalog file swapped in by the importer
+
+        The connection moves to the new file, then indexes that were already
+        built are rebuilt from it; each index is replaced in one step, so
+        requests see either the old or the new snapshot.
+        """
+        await self.db.reopen(settings.CATALOG_SWAP_GRACE)
+        self._misses.clear()
+        self._data_version = None
+        await self.refresh_external_changes()
+        if self.prefix_index.loaded or self.alias_index.loaded or self.trigram_index.loaded:
+            await self.load_indexes()
+        if self.spatial_index.loaded:
+            await self.load_spatial_index()
+        logger.info(f"Reloaded catalog version {await self.db.get_catalog_version()}")
+
+    async def watch_catalog(self, interval: float) -> None:
+        """
+        Poll for a replaced catalog file and hot swap it (runs until cancelled)
+
+        Objects other processes saved are applied here too, so requests
+        never pay for change detection; in shared mode so is a snapshot
+        published by another worker.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.db.file_replaced():
+                    await self.reload_catalog()
+                    continue
+                await self.refresh_external_changes()
+                if settings.SHARED_CATALOG and self.shared_catalog.stale():
+                    await self.load_spatial_index()
+            except Exception as e:
+                logger.error(f"Failed to reload catalog: {e}")
+
+    async def load_spatial_index(self) -> None:
+        """Build the RA/Dec spatial index, shared between workers when enabled"""
+        key = await self._catalog_key()
+        if settings.SHARED_CATALOG:
+            try:
+                await self._load_shared_catalog(key)
+                self.sky_version = key
+                return
+            except Exception as e:
+                logger.error(f"Shared catalog unavailable, building a private copy: {e}")
+        await self._build_spatial_index()
+        self.sky_version = key
+
+    async def _catalog_key(self) -> str:
+        """
+        Catalog version, object count and latest updated_at
+
+        Identical in every worker reading the same catalog state, so it names
+        shared snapshots and versions sky map tokens and metadata.
+        """
+        return (f"{await self.db.get_catalog_version()}:{await self.db.count_objects()}:"
+                f"{await self.db.get_last_update()}")
+
+    async def _build_spatial_index(self) -> None:
+        """Build the spatial index in this process, from the catalog store when current"""
+        store = await self._open_catalog_store()
+        if store is not None:
+            xyz, rows, types = store.xyz, store.rows, store.strings_of('type')
+            numeric = {column: store.column(column) for column in ('magnitude', 'size_major', 'size_minor')}
+
+            # Objects saved since the import (SIMBAD cache) replace or extend the store
+            newer = []
+            if store.last_update is not None:
+                newer = [dict(row) for row in await self.db.get_sky_rows(updated_since=store.last_update)]
+            if newer:
+                replaced = {row['id'] for row in newer}
+                kept = np.array([i for i, object_id in enumerate(store.strings_of('id'))
+                                 if object_id not in replaced], dtype=np.int64)
+                extra, _ = columns_from_rows(newer)
+                xyz = np.concatenate([xyz[kept], radec_to_xyz(extra['ra'], extra['dec']).reshape(-1, 3)])
+                rows = OverlayRows(store.rows, kept, newer)
+                types = [types[i] for i in kept.tolist()] + [row['type'] for row in newer]
+                numeric = {column: np.concatenate([values[kept], extra[column]])
+                           for column, values in numeric.items()}
+
+            self.spatial_index.build_xyz(xyz)
+            self._sky_rows = rows
+            self._sky_types = np.array(types)
+            major = np.nan_to_num(numeric['size_major'])
+            minor = np.nan_to_num(numeric['size_minor'])
+            self._sky_radii = np.where(major != 0, major, minor) / 120.0
+            self._sky_magnitudes = np.array(numeric['magnitude'])
+            logger.info(f"Mapped catalog store {store.version} with {store.count} objects "
+                        f"and {len(newer)} newer from SQLite")
+            return
+
+        rows = [dict(row) for row in await self.db.get_sky_rows()]
+        self.spatial_index.build([r['ra'] for r in rows], [r['dec'] for r in rows])
+        self._sky_rows = rows
+        self._sky_types = np.array([r['type'] for r in rows])
+        self._sky_radii = np.array(
+            [(r['size_major'] or r['size_minor'] or 0.0) / 120.0 for r in rows]
+        )
+        self._sky_magnitudes = np.array(
+            [r['magnitude'] if r['magnitude'] is not None else np.nan for r in rows]
+        )
+        logger.info(f"Built spatial index with {len(rows)} objects")
+
+    async def _load_shared_catalog(self, key: str) -> None:
+        """
+        Attach to the shared-memory snapshot of this catalog, publishing it
+        from a locally built index if no worker has yet
+        """
+
+        async def build():
+            await self._build_spatial_index()
+            numeric, strings = columns_from_rows(self._sky_rows)
+            arrays = dict(self.spatial_index.export_arrays())
+            arrays.update(numeric)
+            for column, (data, offsets) in strings.items():
+                arrays[f"{column}.data"] = data
+                arrays[f"{column}.offsets"] = offsets
+            arrays["types"] = self._sky_types
+            arrays["radii"] = self._sky_radii
+            return arrays, {"key": key}
+
+        segment = await self.shared_catalog.acquire(key, build, settings.SHARED_CATALOG_WAIT)
+        arrays = segment.arrays
+        self.spatial_index.load_arrays(arrays)
+        strings = {
+            column: StringColumn(arrays[f"{column}.data"], arrays[f"{column}.offsets"])
+            for column in STRING_COLUMNS
+        }
+        self._sky_rows = CatalogRows(len(arrays["types"]), arrays, strings)
+        self._sky_types = arrays["types"]
+        self._sky_radii = arrays["radii"]
+        self._sky_magnitudes = arrays["magnitude"]
+        logger.info(f"Attached shared catalog {segment.name} (generation {segment.generation})")
+
+    async def _open_catalog_store(self) -> Optional[CatalogStore]:
+        """
+        The importer's memory-mapped column store, if it matches the database
+
+        It must carry the same catalog version. Objects cached from SIMBAD
+        after the import are newer than the store's last_update and are
+        read from SQLite on top of it; stores without last_update are only
+        used while the object count still matches.
+        """
+        if not settings.USE_CATALOG_STORE:
+            return None
+        store = CatalogStore.open(settings.CATALOG_STORE_DIR)
+        if store is None:
+            return None
+        if store.version != await self.db.get_catalog_version():
+            logger.info(f"Catalog store {store.version} does not match the database, using SQLite")
+            return None
+        if store.last_update is None and store.count != await self.db.count_objects():
+            return None
+        return store
+
+    async def cone_search(
+        self,
+        ra: float,
+        dec: float,
+        radius: float,
+        obj_type: Optional[str] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """
+        Objects within radius degrees of (ra, dec), nearest first
+
+        Each result is the object's positional columns plus `separation`
+        (degrees from the cone center).
+        """
+        if not self.spatial_index.loaded:
+            await self.load_spatial_index()
+
+        indices, separations = self.spatial_index.query_cone(ra, dec, radius)
+
+        results = []
+        for index, separation in zip(indices.tolist(), separations.tolist()):
+            if obj_type and self._sky_types[index] != obj_type:
+                continue
+            results.append({**self._sky_rows[index], "separation": round(separation, 4)})
+            if len(results) >= limit:
+                break
+        return results
+
+    async def objects_in_frame(
+        self,
+        ra: float,
+        dec: float,
+        fov_horizontal: float,
+        fov_vertical: float,
+        rotation: float = 0.0,
+        obj_type: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Objects whose extent intersects a rotated camera frame
+
+        The frame is a rectangle on the tangent plane at (ra, dec); with
+        rotation 0 its width runs east-west, positive rotation turns it from
+        north through east. Candidates come from a cone around the frame's
+        half-diagonal, then each object's disc (half its major axis) is tested
+        exactly against the rectangle.
+
+        Each result adds `frame_x`/`frame_y` (degrees from the frame center
+        along its width/height) and `fully_inside`.
+        """
+        if not self.spatial_index.loaded:
+            await self.load_spatial_index()
+        if not self._sky_rows:
+            return []
+
+        half_w = math.tan(math.radians(fov_horizontal) / 2)
+        half_h = math.tan(math.radians(fov_vertical) / 2)
+        half_diagonal = math.degrees(math.atan(math.hypot(half_w, half_h)))
+        radius = min(half_diagonal + float(self._sky_radii.max()), 180.0)
+
+        indices, _ = self.spatial_index.query_cone(ra, dec, radius)
+        if not len(indices):
+            return []
+
+        xi, eta, cos_c = gnomonic_projection(self.spatial_index.xyz[indices], ra, dec)
+        theta = math.radians(rotation)
+        u = xi * math.cos(theta) - eta * math.sin(theta)
+        v = xi * math.sin(theta) + eta * math.cos(theta)
+        extent = np.tan(np.radians(self._sky_radii[indices]))
+
+        dx = np.maximum(np.abs(u) - half_w, 0.0)
+        dy = np.maximum(np.abs(v) - half_h, 0.0)
+        hits = (cos_c > 0) & (dx * dx + dy * dy <= extent * extent)
+        inside = (np.abs(u) + extent <= half_w) & (np.abs(v) + extent <= half_h)
+
+        results = []
+        for k in np.nonzero(hits)[0].tolist():
+            if obj_type and self._sky_types[indices[k]] != obj_type:
+                continue
+            results.append({
+                **self._sky_rows[indices[k]],
+                "frame_x": round(math.degrees(math.atan(u[k])), 4),
+                "frame_y": round(math.degrees(math.atan(v[k])), 4),
+                "fully_inside": bool(inside[k])
+            })
+        return results
+
+    async def sky_view(
+        self,
+        observer_lat: float,
+        observer_lon: float,
+        timestamp: datetime,
+        obj_types: Optional[Sequence[str]] = None,
+        magnitude_limit: Optional[float] = None,
+        max_count: Optional[int] = None,
+        unknown_magnitude: float = 99.0,
+        min_altitude: float = 0.0,
+        viewport: Optional[Viewport] = None
+    ) -> List[dict]:
+        """
+        Catalog objects above min_altitude at timestamp, brightest first
+
+        Positions are computed at once from the spatial index's unit vectors:
+        for the whole catalog, or with a viewport only for the RA/Dec cone
+        that covers its bounding cap at timestamp, then culled to the box.
+        Objects without a magnitude count as unknown_magnitude for the limit
+        and the ordering, so a count cap drops the faintest objects first.
+
+        Each result is the object's positional columns plus `altitude` and
+        `azimuth` (degrees).
+        """
+        if not self.spatial_index.loaded:
+            await self.load_spatial_index()
+        # Snapshot locals: a catalog reload swaps these attributes
+        rows, types, magnitudes = self._sky_rows, self._sky_types, self._sky_magnitudes
+        xyz = self.spatial_index.xyz
+        if not len(rows):
+            return []
+
+        candidates = None
+        cap = viewport.bounding_cap() if viewport is not None else None
+        if cap is not None:
+            center_alt, center_az, radius = cap
+            ra, dec = self.altaz_to_radec(center_alt, center_az, observer_lat, observer_lon, timestamp)
+            candidates, _ = self.spatial_index.query_cone(ra, dec, radius)
+            candidates = np.sort(candidates)  # Catalog order, for stable ties
+            xyz = xyz[candidates]
+            types = types[candidates]
+            magnitudes = magnitudes[candidates]
+
+        alt, az = self.calculate_positions(xyz, observer_lat, observer_lon, timestamp)
+        brightness = np.where(np.isnan(magnitudes), unknown_magnitude, magnitudes)
+        mask = alt > min_altitude
+        if viewport is not None:
+            mask &= viewport.contains_many(az, alt)
+        if obj_types:
+            mask &= np.isin(types, list(obj_types))
+        if magnitude_limit is not None:
+            mask &= brightness <= magnitude_limit
+
+        selected = np.flatnonzero(mask)
+        selected = selected[np.argsort(brightness[selected], kind="stable")]
+        if max_count is not None:
+            selected = selected[:max_count]
+
+        indices = candidates[selected] if candidates is not None else selected
+        return [
+            {**rows[i], "altitude": a, "azimuth": z}
+            for i, a, z in zip(indices.tolist(), alt[selected].tolist(), az[selected].tolist())
+        ]
+
+    async def sky_catalog(self) -> Tuple[str, Sequence[dict]]:
+        """
+        (sky_version, rows) of the loaded sky arrays, loading them if needed
+
+        With the arrays loaded nothing yields between this call returning
+        and a following sky_view() taking its snapshot, so both see the
+        same catalog.
+        """
+        if not self.spatial_index.loaded:
+            await self.load_spatial_index()
+        return self.sky_version, self._sky_rows
+
+    async def find_groups(
+        self,
+        fov_horizontal: float,
+        fov_vertical: float,
+        min_count: int = 3,
+        obj_types: Optional[Sequence[str]] = None,
+        max_magnitude: Optional[float] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        """
+        Find groups of at least min_count objects that fit in one frame
+
+        Every object passing the filters seeds a search: its neighbours come
+        from a cone of the frame's half-diagonal, are projected onto the
+        tangent plane at the seed and added nearest first while the group's
+        bounding box still fits the frame in landscape or portrait. Groups
+        are ranked by combined magnitude (brightest first).
+
+        The search runs in a worker thread; it visits every seed.
+        """
+        if not self.spatial_index.loaded:
+            await self.load_spatial_index()
+        if not self._sky_rows:
+            return []
+
+        return await asyncio.to_thread(
+            self._find_groups, fov_horizontal, fov_vertical, min_count,
+            obj_types, max_magnitude, limit
+        )
+
+    def _find_groups(self, fov_horizontal, fov_vertical, min_count, obj_types, max_magnitude, limit):
+        """Blocking part of find_groups"""
+        # A reload swaps these attributes; keep one consistent snapshot
+        rows, types, magnitudes = self._sky_rows, self._sky_types, self._sky_magnitudes
+        index = self.spatial_index
+
+        mask = np.ones(len(rows), dtype=bool)
+        if obj_types:
+            mask &= np.isin(types, list(obj_types))
+        if max_magnitude is not None:
+            mask &= magnitudes <= max_magnitude
+
+        frame_w = math.tan(math.radians(fov_horizontal) / 2) * 2
+        frame_h = math.tan(math.radians(fov_vertical) / 2) * 2
+        half_diagonal = math.degrees(math.atan(math.hypot(frame_w, frame_h) / 2))
+
+        seeds = np.nonzero(mask)[0]
+        seeds = seeds[np.argsort(np.nan_to_num(magnitudes[seeds], nan=99.0), kind="stable")]
+
+        found = {}  # member set -> (seed row, members, box), first seed wins
+        for seed in seeds.tolist():
+            seed_row = rows[seed]
+            indices, _ = index.query_cone(seed_row['ra'], seed_row['dec'], half_diagonal)
+            indices = indices[mask[indices]]
+            if len(indices) < min_count:
+                continue
+
+            xi, eta, _ = gnomonic_projection(index.xyz[indices], seed_row['ra'], seed_row['dec'])
+            members, box = self._grow_group(indices, xi, eta, frame_w, frame_h)
+            if len(members) >= min_count:
+                found.setdefault(frozenset(members), (seed_row, members, box))
+
+        # Keep maximal groups only. Largest first, so a kept group is never a
+        # strict subset of a later one; a superset must contain every member,
+        # so checking the groups of the member in the fewest groups suffices.
+        groups = []
+        member_groups = {}  # catalog index -> kept member sets containing it
+        for key in sorted(found, key=len, reverse=True):
+            candidates = min((member_groups.get(m, ()) for m in key), key=len)
+            if any(key <= existing for existing in candidates):
+                continue
+            groups.append(found[key])
+            for member in key:
+                member_groups.setdefault(member, []).append(key)
+
+        # Rank on combined magnitude; build response dicts for the top groups only
+        def rank(group):
+            combined = self._combined_magnitude(magnitudes[group[1]])
+            return (combined if combined is not None else 99.0, -len(group[1]))
+
+        ranked = sorted(groups, key=rank)
+        described = []
+        for seed_row, members, box in ranked[:limit]:
+            center_ra, center_dec = tangent_to_radec(
+                (box[0] + box[1]) / 2, (box[2] + box[3]) / 2, seed_row['ra'], seed_row['dec']
+            )
+            described.append(self._describe_group(
+                rows, magnitudes, members, center_ra, center_dec, box, frame_w, frame_h
+            ))
+        return described
+
+    def _grow_group(self, indices, xi, eta, frame_w, frame_h):
+        """Greedily add neighbours (nearest first) while the bounding box fits the frame"""
+        long_side, short_side = max(frame_w, frame_h), min(frame_w, frame_h)
+        # The box always holds the seed at the origin, so a neighbour further
+        # out than the frame allows can never join; drop those up front
+        ax, ay = np.abs(xi), np.abs(eta)
+        reachable = np.nonzero(
+            (np.maximum(ax, ay) <= long_side) & (np.minimum(ax, ay) <= short_side)
+        )[0]
+        order = reachable[np.argsort(xi[reachable] ** 2 + eta[reachable] ** 2, kind="stable")]
+
+        members = []
+        box = None
+        for k, x, y in zip(order.tolist(), xi[order].tolist(), eta[order].tolist()):
+            candidate = (x, x, y, y) if box is None else (
+                min(box[0], x), max(box[1], x), min(box[2], y), max(box[3], y)
+            )
+            width, height = candidate[1] - candidate[0], candidate[3] - candidate[2]
+            fits = (max(width, height) <= long_side and min(width, height) <= short_side)
+            if fits:
+                box = candidate
+                members.append(int(indices[k]))
+        return members, box
+
+    @staticmethod
+    def _combined_magnitude(magnitudes: np.ndarray) -> Optional[float]:
+        """Magnitude of the summed flux of the known magnitudes, None if there are none"""
+        known = magnitudes[~np.isnan(magnitudes)]
+        if not len(known):
+            return None
+        return round(float(-2.5 * np.log10(np.sum(10 ** (-0.4 * known)))), 2)
+
+    def _describe_group(self, rows, magnitudes, members, center_ra, center_dec, box, frame_w, frame_h) -> dict:
+        """Summarise a group of catalog indices as an API dict"""
+        combined = self._combined_magnitude(magnitudes[members])
+
+        width, height = box[1] - box[0], box[3] - box[2]
+        # Portrait when the group is taller than wide but would not fit in landscape
+        landscape = width <= frame_w and height <= frame_h
+        return {
+            "center_ra": round(center_ra, 4),
+            "center_dec": round(center_dec, 4),
+            "count": len(members),
+            "combined_magnitude": combined,
+            "extent": round(math.degrees(math.atan(max(width, height))) * 60, 1),  # arcmin
+            "orientation": "landscape" if landscape else "portrait",
+            "members": [
+                {key: row[key] for key in ("id", "name", "type", "magnitude")}
+                for row in (rows[i] for i in members)
+            ]
+        }
+
+    async def resolve_alias(self, designation: str) -> Optional[str]:
+        """Map any known designation or alias to its canonical object id"""
+        if not self.alias_index.loaded:
+            try:
+                await self.load_indexes()
+            except Exception as e:
+                logger.error(f"Failed to build alias index: {e}")
+                return None
+        return self.alias_index.resolve(designation)
+
+    async def search_objects(
+        self,
+        name: str,
+        limit: int = 20,
+        fuzzy: bool = False
+    ) -> List[DeepSkyObject]:
+        """
+        Search objects by name (local database only)
+
+        With fuzzy=True, candidates come from the trigram index ranked by
+        similarity, so misspellings like "Andromeda Galxy" still match.
+        """
+        if not fuzzy:
+            return await self.db.search_objects(name, limit)
+
+        if not self.trigram_index.loaded:
+            await self.load_indexes()
+
+        results = []
+        for object_id, _, _ in self.trigram_index.search(name, limit):
+            obj = await self.db.get_object_by_id(object_id)
+            if obj:
+                results.append(obj)
+        return results
+
+    async def autocomplete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        Complete a partial name or designation
+
+        Uses the in-memory prefix index when enabled (built lazily on first
+        use if startup did not build it), otherwise falls back to SQLite.
+        """
+        if not settings.ENABLE_SEARCH_INDEX:
+            objects = await self.db.search_objects(prefix, limit)
+            return [
+                {"id": obj.id, "name": obj.name, "match": obj.name, "magnitude": obj.magnitude}
+                for obj in objects
+            ]
+
+        if not self.prefix_index.loaded:
+            await self.load_indexes()
+        return self.prefix_index.complete(prefix, limit)
 
     async def get_objects_by_constellation(self, constellation: str) -> List[DeepSkyObject]:
         """Get all objects in a constellation"""
         return await self.db.get_objects_by_constellation(constellation)
 
-    async def get_objects_by_type(self, obj_type: str) -> List[DeepSkyObject]:
+    async def get_objects_by_type(self, obj_type: str) -> List[ObjectRecord]:
         """Get all objects of a specific type"""
         return await self.db.get_objects_by_type(obj_type)
 
@@ -99,6 +827,76 @@ class AstronomyService:
 
         return alt, az
 
+    def calculate_positions(
+        self,
+        xyz: np.ndarray,
+        observer_lat: float,
+        observer_lon: float,
+        timestamp: datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        calculate_position() for many targets at once
+
+        Args:
+            xyz: 目标的赤道单位向量 (N, 3)，如 spatial_index.xyz
+
+        Returns:
+            (altitude, azimuth) 数组 (度)
+        """
+        lst = math.radians(self._calculate_local_sidereal_time(observer_lon, timestamp))
+        lat = math.radians(observer_lat)
+        x, y, sin_dec = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+        # cos(dec)·cos(ha) 与 cos(dec)·sin(ha)，ha = lst - ra
+        cos_ha = x * math.cos(lst) + y * math.sin(lst)
+        sin_ha = x * math.sin(lst) - y * math.cos(lst)
+
+        sin_alt = np.clip(sin_dec * math.sin(lat) + cos_ha * math.cos(lat), -1.0, 1.0)
+        alt = np.degrees(np.arcsin(sin_alt))
+
+        cos_alt = np.sqrt(1.0 - sin_alt * sin_alt)
+        denominator = math.cos(lat) * cos_alt
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos_az = np.where(cos_alt > 0.0001, (sin_dec - math.sin(lat) * sin_alt) / denominator, 0.0)
+        az = np.degrees(np.arccos(np.clip(cos_az, -1.0, 1.0)))
+        az = np.where(sin_ha > 0, 360.0 - az, az)
+        return alt, az
+
+    def altaz_to_radec(
+        self,
+        altitude: float,
+        azimuth: float,
+        observer_lat: float,
+        observer_lon: float,
+        timestamp: datetime
+    ) -> Tuple[float, float]:
+        """
+        calculate_position() 的逆变换：地平坐标 -> 赤道坐标
+
+        Returns:
+            (ra, dec) (度)
+        """
+        lst = math.radians(self._calculate_local_sidereal_time(observer_lon, timestamp))
+        lat = math.radians(observer_lat)
+        alt, az = math.radians(altitude), math.radians(azimuth)
+
+        # 地平单位向量 (北, 东, 天顶)
+        north = math.cos(alt) * math.cos(az)
+        east = math.cos(alt) * math.sin(az)
+        up = math.sin(alt)
+
+        # 时角坐标: cos(dec)·cos(ha), cos(dec)·sin(ha), sin(dec)
+        cos_ha = up * math.cos(lat) - north * math.sin(lat)
+        sin_dec = up * math.sin(lat) + north * math.cos(lat)
+        sin_ha = -east
+
+        # ra = lst - ha
+        x = cos_ha * math.cos(lst) + sin_ha * math.sin(lst)
+        y = cos_ha * math.sin(lst) - sin_ha * math.cos(lst)
+        ra = math.degrees(math.atan2(y, x)) % 360.0
+        dec = math.degrees(math.asin(max(-1.0, min(1.0, sin_dec))))
+        return ra, dec
+
     def _calculate_local_sidereal_time(
         self,
         longitude: float,
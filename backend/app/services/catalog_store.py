@@ -0,0 +1,255 @@
+"""Versioned, memory-mapped binary column store of the catalog
+
+Layout under the store directory:
+
+    CURRENT                 name of the active version directory
+    <version>/manifest.json format, version, row count, column names
+    <version>/<col>.npy     numeric columns (float64, NaN for NULL), xyz (N, 3)
+    <version>/<col>.bin     UTF-8 string column data
+    <version>/<col>.idx.npy int64 offsets (N + 1) into <col>.bin
+
+Besides the positional columns the store holds each object's aliases
+(comma-separated, as GROUP_CONCAT returns them), so the name indexes can
+be built from it too. Objects saved after the import (SIMBAD cache) are
+read from SQLite and laid over the store; see OverlayRows.
+
+Everything is opened read-only with mmap, so loading is near-instant and
+every worker process shares the same physical pages through the OS page
+cache. A new version is written to its own directory and CURRENT is
+switched with an atomic rename; readers never see a partial store.
+"""
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.spatial_index import radec_to_xyz
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+NUMERIC_COLUMNS = ("ra", "dec", "magnitude", "size_major", "size_minor")
+STRING_COLUMNS = ("id", "name", "type", "constellation")
+SEARCH_COLUMNS = ("aliases",)  # Not part of sky rows; optional in older stores
+KEEP_VERSIONS = 2
+
+
+def columns_from_rows(
+    rows: Sequence[dict],
+    string_columns: Sequence[str] = STRING_COLUMNS
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """
+    Split sky rows into column arrays
+
+    Returns:
+        (numeric columns as float64 with NaN for NULL,
+         string columns as (UTF-8 bytes as uint8, int64 offsets of length N + 1))
+    """
+    numeric = {
+        column: np.array([r[column] if r[column] is not None else np.nan for r in rows], dtype=np.float64)
+        for column in NUMERIC_COLUMNS
+    }
+    strings = {}
+    for column in string_columns:
+        encoded = [(r[column] or "").encode("utf-8") for r in rows]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        strings[column] = (np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+    return numeric, strings
+
+
+def write_catalog_store(directory: str, rows: Iterable[dict], version: str,
+                        last_update: Optional[str] = None) -> Path:
+    """
+    Write rows (get_sky_rows() columns, plus "aliases" when present) as a
+    new store version and activate it
+
+    last_update is the catalog's latest objects.updated_at; a database
+    written after the store was (e.g. by the SIMBAD cache) no longer matches.
+
+    Returns:
+        Path of the version directory
+    """
+    rows = list(rows)
+    root = Path(directory)
+    target = root / version
+    tmp = root / f".{version}.tmp-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    string_columns = STRING_COLUMNS + tuple(c for c in SEARCH_COLUMNS if rows and c in rows[0])
+    numeric, strings = columns_from_rows(rows, string_columns)
+    for column, values in numeric.items():
+        np.save(tmp / f"{column}.npy", values)
+    np.save(tmp / "xyz.npy", radec_to_xyz(numeric["ra"], numeric["dec"]).reshape(-1, 3))
+    for column, (data, offsets) in strings.items():
+        (tmp / f"{column}.bin").write_bytes(data.tobytes())
+        np.save(tmp / f"{column}.idx.npy", offsets)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "count": len(rows),
+        "last_update": last_update,
+        "numeric": list(NUMERIC_COLUMNS),
+        "strings": list(string_columns)
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+
+    # Switch the active version atomically
+    pointer = root / f".CURRENT.tmp-{os.getpid()}"
+    pointer.write_text(version)
+    os.replace(pointer, root / "CURRENT")
+
+    _prune(root, keep=version)
+    return target
+
+
+def _prune(root: Path, keep: str) -> None:
+    """Delete all but the newest KEEP_VERSIONS version directories"""
+    versions = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    for path in versions[KEEP_VERSIONS:]:
+        if path.name != keep:
+            # Workers that still map old files keep their pages until they unmap
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class StringColumn(Sequence):
+    """Read-only string column over mmapped UTF-8 bytes and offsets"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._data[start:end]).decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        """Decode the whole column in one pass"""
+        raw = bytes(self._data)
+        offsets = self._offsets.tolist()
+        return [raw[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+class CatalogRows(Sequence):
+    """Sequence of row dicts built on access from column arrays"""
+
+    def __init__(self, count: int, numeric: Dict[str, np.ndarray], strings: Dict[str, StringColumn]):
+        self._count = count
+        self._numeric = numeric
+        self._strings = strings
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = {}
+        for column in STRING_COLUMNS:
+            value = self._strings[column][index]
+            row[column] = value if value or column in ("id", "name", "type") else None
+        for column in NUMERIC_COLUMNS:
+            value = float(self._numeric[column][index])
+            row[column] = None if np.isnan(value) else value
+        return row
+
+
+class OverlayRows(Sequence):
+    """Store rows minus replaced objects, followed by rows newer than the store"""
+
+    def __init__(self, base: Sequence[dict], kept: np.ndarray, extra: List[dict]):
+        self._base = base
+        self._kept = kept.tolist()
+        self._extra = extra
+
+    def __len__(self) -> int:
+        return len(self._kept) + len(self._extra)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < len(self._kept):
+            return self._base[self._kept[index]]
+        return self._extra[index - len(self._kept)]
+
+
+class CatalogStore:
+    """An opened, memory-mapped store version"""
+
+    def __init__(self, path: Path, manifest: dict):
+        self.path = path
+        self.version = manifest["version"]
+        self.count = manifest["count"]
+        self.last_update = manifest.get("last_update")
+        self.numeric: Dict[str, np.ndarray] = {
+            column: np.load(path / f"{column}.npy", mmap_mode="r") for column in manifest["numeric"]
+        }
+        self.xyz = np.load(path / "xyz.npy", mmap_mode="r")
+        self.strings: Dict[str, StringColumn] = {}
+        for column in manifest["strings"]:
+            data_path = path / f"{column}.bin"
+            data = (np.memmap(data_path, dtype=np.uint8, mode="r")
+                    if data_path.stat().st_size else np.empty(0, dtype=np.uint8))
+            self.strings[column] = StringColumn(data, np.load(path / f"{column}.idx.npy", mmap_mode="r"))
+        self.rows = CatalogRows(self.count, self.numeric, self.strings)
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["CatalogStore"]:
+        """Open the active version, or None when no usable store exists"""
+        root = Path(directory)
+        try:
+            version = (root / "CURRENT").read_text().strip()
+            path = root / version
+            manifest = json.loads((path / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != FORMAT_VERSION:
+            logger.warning(f"Catalog store {version} has unsupported format {manifest.get('format')}")
+            return None
+        return cls(path, manifest)
+
+    def column(self, name: str) -> np.ndarray:
+        """Numeric column (read-only view)"""
+        return self.numeric[name]
+
+    def strings_of(self, name: str) -> List[str]:
+        """Decode a whole string column"""
+        return self.strings[name].to_list()
+
+    def search_entries(self) -> Optional[List[tuple]]:
+        """
+        (id, name, magnitude, aliases) per object, like get_search_entries()
+
+        None for stores written without aliases.
+        """
+        if "aliases" not in self.strings:
+            return None
+        magnitudes = [None if np.isnan(m) else m for m in self.numeric["magnitude"].tolist()]
+        return [
+            (object_id, name, magnitude, aliases.split(",") if aliases else [])
+            for object_id, name, magnitude, aliases in zip(
+                self.strings_of("id"), self.strings_of("name"), magnitudes, self.strings_of("aliases")
+            )
+        ]
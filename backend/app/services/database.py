@@ -1,31 +1,240 @@
 """Local SQLite database service for deep sky objects"""
 import aiosqlite
+import asyncio
+import json
 import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List
+from app.config import settings
 from app.models.database import DeepSkyObject, ObservationalInfo, DatabaseStats
+from app.models.records import ObjectRecord, ObservationalRecord, TargetRecord
+from app.models.target import DeepSkyTarget
+from app.services.model_adapter import API_COLUMNS, ModelAdapter
+from app.services.search_index import normalize_designation
+
+
+OBJECTS_API_DDL = """CREATE TABLE IF NOT EXISTS objects_api (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_en TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    ra REAL NOT NULL,
+    dec REAL NOT NULL,
+    magnitude REAL NOT NULL,
+    size REAL NOT NULL,
+    constellation TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    description TEXT,
+    optimal_season TEXT NOT NULL,
+    optimal_fov_min INTEGER NOT NULL,
+    optimal_fov_max INTEGER NOT NULL,
+    tags TEXT NOT NULL
+)"""
+
+# sync_jobs columns added after its first release, with their definitions
+SYNC_JOB_COLUMNS = {
+    "owner": "TEXT",
+    "heartbeat": "REAL",
+    "active_seconds": "REAL NOT NULL DEFAULT 0"
+}
+
+# Saved observing locations, equipment and visible zones (shared by all workers).
+# They live in a user database next to the catalog file, which catalog swaps
+# never replace.
+USER_DB_FILE = "user.db"
+
+LOCATIONS_DDL = """CREATE TABLE IF NOT EXISTS locations (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    timezone TEXT NOT NULL,
+    country TEXT,
+    region TEXT,
+    is_default INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+)"""
+
+EQUIPMENT_DDL = """CREATE TABLE IF NOT EXISTS equipment (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sensor_size TEXT NOT NULL,
+    sensor_width REAL NOT NULL,
+    sensor_height REAL NOT NULL,
+    focal_length REAL NOT NULL,
+    fov_horizontal REAL NOT NULL,
+    fov_vertical REAL NOT NULL,
+    created_at REAL NOT NULL
+)"""
+
+VISIBLE_ZONES_DDL = """CREATE TABLE IF NOT EXISTS visible_zones (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    polygon TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL
+)"""
+
+# Seeded once, when the locations table is created
+DEFAULT_LOCATION = {
+    "id": "loc_1",
+    "name": "北京",
+    "latitude": 39.9042,
+    "longitude": 116.4074,
+    "timezone": "Asia/Shanghai",
+    "country": "CN",
+    "region": "Beijing",
+    "is_default": True
+}
+
+LOCATION_COLUMNS = ("id", "name", "latitude", "longitude", "timezone", "country", "region", "is_default")
+VISIBLE_ZONE_COLUMNS = ("id", "name", "polygon", "priority", "version")
+EQUIPMENT_COLUMNS = ("id", "name", "sensor_size", "sensor_width", "sensor_height",
+                     "focal_length", "fov_horizontal", "fov_vertical")
 
 logger = logging.getLogger(__name__)
 
+
+def _upsert_assignments(columns: tuple) -> str:
+    """SET clause updating every column but id from the conflicting insert"""
+    return ", ".join(f"{column} = excluded.{column}" for column in columns if column != "id")
+
+
 class DatabaseService:
     """Service for querying local SQLite database"""
 
-    def __init__(self, db_path: str = "app/data/deep_sky.db"):
+    def __init__(self, db_path: str = "app/data/deep_sky.db", user_db_path: Optional[str] = None):
         self.db_path = db_path
+        self.user_db_path = user_db_path or str(Path(db_path).with_name(USER_DB_FILE))
         self._conn = None
+        self._user_conn = None
+        self._file_id = None  # (st_dev, st_ino) of the file the connection opened
+        self._retiring = set()  # Closes of connections replaced by reopen()
+        self._write_lock = asyncio.Lock()
+        self._swap_pending = False  # A write moved to a new file the catalog has not reloaded
+        self._lookup_misses_ready = False
+        self._sync_jobs_ready = False
+        self._locations_ready = False
+        self._equipment_ready = False
+        self._visible_zones_ready = False
+        self._table_cache: Dict[str, tuple] = {}  # table -> (data_version, rows)
+        self.model_adapter = ModelAdapter()
 
     async def connect(self):
         """Establish database connection"""
         if self._conn is None:
-            self._conn = await aiosqlite.connect(self.db_path)
-            self._conn.row_factory = aiosqlite.Row
+            conn = await aiosqlite.connect(self.db_path)
+            conn.row_factory = aiosqlite.Row
+            file_id = self._stat_file()
+            await self._migrate_objects_api(conn)
+            self._conn, self._file_id = conn, file_id
         return self._conn
 
+    async def connect_user(self):
+        """Establish the user database connection (locations, equipment, zones)"""
+        if self._user_conn is None:
+            self._user_conn = await aiosqlite.connect(self.user_db_path)
+            self._user_conn.row_factory = aiosqlite.Row
+        return self._user_conn
+
     async def close(self):
-        """Close database connection"""
+        """Close database connections"""
+        for task in list(self._retiring):
+            task.cancel()
         if self._conn:
             await self._conn.close()
             self._conn = None
+        if self._user_conn:
+            await self._user_conn.close()
+            self._user_conn = None
+
+    def _stat_file(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def file_replaced(self) -> bool:
+        """Whether db_path now names a different file than the open connection (one stat call)"""
+        if self._conn is None:
+            return False
+        if self._swap_pending:
+            return True
+        current = self._stat_file()
+        return current is not None and current != self._file_id
+
+    async def reopen(self, grace: float = 5.0) -> None:
+        """
+        Switch to the file currently at db_path
+
+        New queries use the new connection immediately. The old connection
+        stays open for `grace` seconds so queries already running on it
+        finish against the old file, then it is closed.
+        """
+        old = self._conn
+        self._conn = None
+        self._swap_pending = False
+        self._lookup_misses_ready = False
+        self._sync_jobs_ready = False
+        await self.connect()
+
+        if old is not None:
+            task = asyncio.create_task(self._close_later(old, grace))
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+
+    async def _close_later(self, conn, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            await conn.close()
+
+    @asynccontextmanager
+    async def _writing(self, ensure=None):
+        """
+        Write transaction on the current catalog file, committed on exit
+
+        The importer holds the live file's write lock from its last copy of
+        API-owned rows through the rename, so once BEGIN IMMEDIATE succeeds
+        either nothing was swapped, or the file was already replaced and the
+        write must go to the new one. The catalog itself still reloads on
+        the next file_replaced() check.
+        """
+        async with self._write_lock:
+            conn = await self.connect()
+            if ensure:
+                await ensure(conn)
+            await conn.execute("BEGIN IMMEDIATE")
+            if self.file_replaced():
+                await conn.rollback()
+                await self.reopen(settings.CATALOG_SWAP_GRACE)
+                self._swap_pending = True
+                conn = await self.connect()
+                if ensure:
+                    await ensure(conn)
+                await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+
+    async def get_catalog_version(self) -> Optional[str]:
+        """Version stamped into the catalog by the importer, if any"""
+        conn = await self.connect()
+        try:
+            cursor = await conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'")
+        except aiosqlite.OperationalError:
+            return None
+        row = await cursor.fetchone()
+        return row['value'] if row else None
 
     async def get_object_by_id(self, object_id: str) -> Optional[DeepSkyObject]:
         """Get object by ID with aliases and observational info"""
@@ -122,8 +331,13 @@ class DatabaseService:
 
         return results
 
-    async def get_objects_by_type(self, obj_type: str) -> List[DeepSkyObject]:
-        """Get all objects of a specific type (optimized with JOIN)"""
+    async def get_objects_by_type(self, obj_type: str) -> List[ObjectRecord]:
+        """
+        Get all objects of a specific type (optimized with JOIN)
+
+        Returns slotted ObjectRecords rather than validated pydantic models;
+        call to_model() / model_dump() at the API boundary.
+        """
         conn = await self.connect()
 
         # Single query with JOIN to get all data at once
@@ -152,7 +366,7 @@ class DatabaseService:
                 # Create observational info
                 obs_info = None
                 if row['obs_notes']:
-                    obs_info = ObservationalInfo(
+                    obs_info = ObservationalRecord(
                         best_month=row['best_month'],
                         difficulty=row['difficulty'],
                         min_aperture=row['min_aperture'],
@@ -160,7 +374,7 @@ class DatabaseService:
                         notes=row['obs_notes']
                     )
 
-                obj = DeepSkyObject(
+                obj = ObjectRecord(
                     id=row['id'],
                     name=row['name'],
                     type=row['type'],
@@ -181,46 +395,578 @@ class DatabaseService:
 
         return results
 
+    async def get_search_entries(self, updated_since: Optional[str] = None) -> List[tuple]:
+        """
+        Get (id, name, magnitude, aliases) for every object, used to build name indexes
+
+        With updated_since, only objects written at or after that updated_at
+        timestamp (see get_last_update).
+        """
+        conn = await self.connect()
+
+        query = f"""
+            SELECT o.id, o.name, o.magnitude, GROUP_CONCAT(a.alias, ',') as aliases_str
+            FROM objects o
+            LEFT JOIN aliases a ON o.id = a.object_id
+            {"WHERE o.updated_at >= ?" if updated_since is not None else ""}
+            GROUP BY o.id
+        """
+        cursor = await conn.execute(query, (updated_since,) if updated_since is not None else ())
+        rows = await cursor.fetchall()
+
+        return [
+            (
+                row['id'],
+                row['name'],
+                row['magnitude'],
+                row['aliases_str'].split(',') if row['aliases_str'] else []
+            )
+            for row in rows
+        ]
+
+    async def get_data_version(self) -> int:
+        """
+        SQLite's PRAGMA data_version for this connection
+
+        It changes whenever another connection (e.g. another worker process)
+        commits to the database; this connection's own commits leave it alone.
+        """
+        conn = await self.connect()
+        cursor = await conn.execute("PRAGMA data_version")
+        return (await cursor.fetchone())[0]
+
+    async def get_last_update(self) -> Optional[str]:
+        """Latest objects.updated_at (INSERT OR REPLACE refreshes it on every save)"""
+        conn = await self.connect()
+        cursor = await conn.execute("SELECT MAX(updated_at) FROM objects")
+        return (await cursor.fetchone())[0]
+
+    async def count_objects(self) -> int:
+        """Number of objects in the catalog"""
+        conn = await self.connect()
+        cursor = await conn.execute("SELECT COUNT(*) FROM objects")
+        return (await cursor.fetchone())[0]
+
+    async def get_sky_rows(self, updated_since: Optional[str] = None) -> List[aiosqlite.Row]:
+        """
+        Get positional columns for every object, used to build the spatial index
+
+        With updated_since, only objects written at or after that updated_at.
+        """
+        conn = await self.connect()
+
+        query = """SELECT id, name, type, ra, dec, magnitude, size_major, size_minor, constellation
+            FROM objects"""
+        if updated_since is not None:
+            cursor = await conn.execute(query + " WHERE updated_at >= ?", (updated_since,))
+        else:
+            cursor = await conn.execute(query)
+        return await cursor.fetchall()
+
     async def save_object(self, obj: DeepSkyObject) -> None:
         """Insert or update object (used by SIMBAD cache)"""
-        conn = await self.connect()
+        await self.save_objects([obj])
+
+    async def save_objects(self, objs: List[DeepSkyObject]) -> None:
+        """Insert or update many objects in a single transaction"""
+        if not objs:
+            return
+        async with self._writing(self._ensure_lookup_misses) as conn:
+            ids = [(obj.id,) for obj in objs]
+
+            # Insert or update main objects
+            await conn.executemany(
+                """INSERT OR REPLACE INTO objects
+                (id, name, type, ra, dec, magnitude, size_major, size_minor, constellation, surface_brightness)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(obj.id, obj.name, obj.type, obj.ra, obj.dec, obj.magnitude,
+                  obj.size_major, obj.size_minor, obj.constellation, obj.surface_brightness)
+                 for obj in objs]
+            )
 
-        # Insert or update main object
+            # Replace aliases
+            await conn.executemany("DELETE FROM aliases WHERE object_id = ?", ids)
+            await conn.executemany(
+                "INSERT OR IGNORE INTO aliases (object_id, alias) VALUES (?, ?)",
+                [(obj.id, alias) for obj in objs for alias in obj.aliases]
+            )
+
+            # Insert observational info
+            await conn.executemany(
+                """INSERT OR REPLACE INTO observational_info
+                (object_id, best_month, difficulty, min_aperture, min_magnitude, notes)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                [(obj.id, obj.observational_info.best_month,
+                  obj.observational_info.difficulty,
+                  obj.observational_info.min_aperture,
+                  obj.observational_info.min_magnitude,
+                  obj.observational_info.notes)
+                 for obj in objs if obj.observational_info]
+            )
+
+            # Ready-to-serve API rows
+            api_rows = [self.model_adapter.to_api_row(obj) for obj in objs]
+            await conn.executemany(
+                f"INSERT OR REPLACE INTO objects_api ({', '.join(API_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(API_COLUMNS))})",
+                [tuple(row[c] for c in API_COLUMNS) for row in api_rows]
+            )
+
+            # The objects exist now, so recorded SIMBAD misses are stale
+            await conn.executemany(
+                "DELETE FROM lookup_misses WHERE query_key = ?",
+                [(normalize_designation(designation),)
+                 for obj in objs for designation in [obj.id] + list(obj.aliases)]
+            )
+
+    async def _migrate_objects_api(self, conn) -> None:
+        """
+        Create the denormalized API table and fill in any object missing a row
+
+        Runs when a catalog file is opened, before any query or write sees
+        the connection: catalogs imported before objects_api existed get
+        their rows here, so readers can trust the table to cover every object.
+        """
+        cursor = await conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'objects'"
+        )
+        if not await cursor.fetchone():
+            return  # Not a catalog (yet)
+        cursor = await conn.execute("PRAGMA table_info(objects_api)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if columns and columns != set(API_COLUMNS):
+            # Derived data in an older layout: rebuild it below
+            await conn.execute("DROP TABLE objects_api")
+        await conn.execute(OBJECTS_API_DDL)
         await conn.execute(
-            """INSERT OR REPLACE INTO objects
-            (id, name, type, ra, dec, magnitude, size_major, size_minor, constellation, surface_brightness)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (obj.id, obj.name, obj.type, obj.ra, obj.dec, obj.magnitude,
-             obj.size_major, obj.size_minor, obj.constellation, obj.surface_brightness)
+            "CREATE INDEX IF NOT EXISTS idx_objects_api_type ON objects_api(type)"
         )
+        await self._backfill_objects_api(conn)
 
-        # Delete existing aliases
-        await conn.execute(
-            "DELETE FROM aliases WHERE object_id = ?",
-            (obj.id,)
+    async def _backfill_objects_api(self, conn, chunk_size: int = 500) -> None:
+        """Write objects_api rows for objects that have none"""
+        cursor = await conn.execute(
+            "SELECT id FROM objects WHERE id NOT IN (SELECT id FROM objects_api)"
+        )
+        missing = [row[0] for row in await cursor.fetchall()]
+        if not missing:
+            return
+
+        logger.info(f"Materializing {len(missing)} objects_api rows")
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            marks = ", ".join("?" * len(chunk))
+            cursor = await conn.execute(
+                f"""
+                SELECT
+                    o.id, o.name, o.type, o.ra, o.dec, o.magnitude,
+                    o.size_major, o.size_minor, o.constellation, o.surface_brightness,
+                    oi.best_month, oi.difficulty, oi.min_aperture, oi.min_magnitude,
+                    oi.notes as obs_notes, oi.object_id as obs_id,
+                    GROUP_CONCAT(a.alias, ',') as aliases_str
+                FROM objects o
+                LEFT JOIN observational_info oi ON o.id = oi.object_id
+                LEFT JOIN aliases a ON o.id = a.object_id
+                WHERE o.id IN ({marks})
+                GROUP BY o.id
+                """,
+                chunk
+            )
+            api_rows = []
+            for row in await cursor.fetchall():
+                obj = ObjectRecord(
+                    id=row['id'], name=row['name'], type=row['type'], ra=row['ra'], dec=row['dec'],
+                    magnitude=row['magnitude'], size_major=row['size_major'],
+                    size_minor=row['size_minor'], constellation=row['constellation'],
+                    surface_brightness=row['surface_brightness'],
+                    aliases=row['aliases_str'].split(',') if row['aliases_str'] else [],
+                    observational_info=ObservationalRecord(
+                        best_month=row['best_month'], difficulty=row['difficulty'],
+                        min_aperture=row['min_aperture'], min_magnitude=row['min_magnitude'],
+                        notes=row['obs_notes']
+                    ) if row['obs_id'] else None
+                )
+                api_row = self.model_adapter.to_api_row(obj)
+                api_rows.append(tuple(api_row[c] for c in API_COLUMNS))
+            await conn.executemany(
+                f"INSERT OR REPLACE INTO objects_api ({', '.join(API_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(API_COLUMNS))})",
+                api_rows
+            )
+        await conn.commit()
+
+    async def get_api_targets(self, obj_type: str) -> List[DeepSkyTarget]:
+        """Ready-to-serve targets of one catalog type from objects_api"""
+        conn = await self.connect()
+
+        cursor = await conn.execute("SELECT * FROM objects_api WHERE type = ? ORDER BY id", (obj_type,))
+        rows = await cursor.fetchall()
+        return [self.model_adapter.from_api_row(row) for row in rows]
+
+    async def get_target_records(self, obj_type: str) -> List[TargetRecord]:
+        """Compact ranking records of one catalog type from objects_api"""
+        conn = await self.connect()
+
+        # Only the ranking columns: no JSON decoding or model for rows that are only ranked
+        cursor = await conn.execute(
+            "SELECT id, ra, dec, magnitude, size FROM objects_api WHERE type = ? ORDER BY id",
+            (obj_type,)
+        )
+        return [TargetRecord._make(row) for row in await cursor.fetchall()]
+
+    async def get_api_targets_by_ids(self, ids: List[str]) -> Dict[str, DeepSkyTarget]:
+        """Ready-to-serve targets for specific ids"""
+        conn = await self.connect()
+
+        marks = ", ".join("?" * len(ids))
+        cursor = await conn.execute(f"SELECT * FROM objects_api WHERE id IN ({marks})", ids)
+        rows = await cursor.fetchall()
+        return {row['id']: self.model_adapter.from_api_row(row) for row in rows}
+
+    async def _ensure_lookup_misses(self, conn) -> None:
+        """Create the SIMBAD negative cache table in databases built before it existed"""
+        if not self._lookup_misses_ready:
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS lookup_misses (
+                    query_key TEXT PRIMARY KEY,
+                    missed_at REAL NOT NULL
+                )"""
+            )
+            self._lookup_misses_ready = True
+
+    async def get_lookup_miss(self, query_key: str) -> Optional[float]:
+        """Get the UNIX time a SIMBAD lookup last found nothing, if recorded"""
+        conn = await self.connect()
+        await self._ensure_lookup_misses(conn)
+
+        cursor = await conn.execute(
+            "SELECT missed_at FROM lookup_misses WHERE query_key = ?",
+            (query_key,)
         )
+        row = await cursor.fetchone()
+        return row['missed_at'] if row else None
 
-        # Insert aliases
-        for alias in obj.aliases:
+    async def save_lookup_miss(self, query_key: str, missed_at: Optional[float] = None) -> None:
+        """Record that SIMBAD has no object for query_key"""
+        async with self._writing(self._ensure_lookup_misses) as conn:
             await conn.execute(
-                "INSERT INTO aliases (object_id, alias) VALUES (?, ?)",
-                (obj.id, alias)
+                "INSERT OR REPLACE INTO lookup_misses (query_key, missed_at) VALUES (?, ?)",
+                (query_key, missed_at if missed_at is not None else time.time())
             )
 
-        # Insert observational info
-        if obj.observational_info:
+    async def _ensure_sync_jobs(self, conn) -> None:
+        """Create the background sync job table in databases built before it existed"""
+        if not self._sync_jobs_ready:
             await conn.execute(
-                """INSERT OR REPLACE INTO observational_info
-                (object_id, best_month, difficulty, min_aperture, min_magnitude, notes)
-                VALUES (?, ?, ?, ?, ?, ?)""",
-                (obj.id, obj.observational_info.best_month,
-                 obj.observational_info.difficulty,
-                 obj.observational_info.min_aperture,
-                 obj.observational_info.min_magnitude,
-                 obj.observational_info.notes)
+                """CREATE TABLE IF NOT EXISTS sync_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    object_ids TEXT NOT NULL,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    synced TEXT NOT NULL DEFAULT '[]',
+                    failed TEXT NOT NULL DEFAULT '[]',
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner TEXT,
+                    heartbeat REAL,
+                    active_seconds REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            # Columns added after the table was first shipped
+            cursor = await conn.execute("PRAGMA table_info(sync_jobs)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            for column, ddl in SYNC_JOB_COLUMNS.items():
+                if column not in columns:
+                    await conn.execute(f"ALTER TABLE sync_jobs ADD COLUMN {column} {ddl}")
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sync_jobs_status ON sync_jobs(status)"
+            )
+            self._sync_jobs_ready = True
+
+    async def create_sync_job(self, job_id: str, object_ids: List[str], created_at: float) -> None:
+        """Persist a queued SIMBAD sync job"""
+        async with self._writing(self._ensure_sync_jobs) as conn:
+            await conn.execute(
+                "INSERT INTO sync_jobs (id, status, object_ids, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(object_ids), created_at)
             )
 
+    async def get_sync_job(self, job_id: str) -> Optional[dict]:
+        """Get a sync job with its id lists decoded"""
+        conn = await self.connect()
+        await self._ensure_sync_jobs(conn)
+
+        cursor = await conn.execute("SELECT * FROM sync_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        if not row:
+            return None
+
+        job = dict(row)
+        for column in ("object_ids", "synced", "failed"):
+            job[column] = json.loads(job[column])
+        return job
+
+    async def get_unfinished_sync_jobs(self) -> List[str]:
+        """Ids of queued or interrupted sync jobs, oldest first"""
+        conn = await self.connect()
+        await self._ensure_sync_jobs(conn)
+
+        cursor = await conn.execute(
+            "SELECT id FROM sync_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        )
+        return [row['id'] for row in await cursor.fetchall()]
+
+    async def claim_sync_job(self, job_id: str, owner: str, now: float, lease: float) -> bool:
+        """
+        Atomically take a job for one worker
+
+        A queued job can be claimed, and so can a running one whose owner
+        has not checkpointed for `lease` seconds (its process is gone).
+
+        Returns:
+            True if this owner now holds the job
+        """
+        async with self._writing(self._ensure_sync_jobs) as conn:
+            cursor = await conn.execute(
+                """UPDATE sync_jobs
+                   SET status = 'running', owner = ?, heartbeat = ?, started_at = COALESCE(started_at, ?)
+                   WHERE id = ? AND (
+                       status = 'queued'
+                       OR (status = 'running' AND (owner IS NULL OR heartbeat IS NULL OR heartbeat < ?))
+                   )""",
+                (owner, now, now, job_id, now - lease)
+            )
+        return cursor.rowcount == 1
+
+    async def update_sync_job(self, job_id: str, owner: Optional[str] = None, **fields) -> bool:
+        """
+        Update job columns (a checkpoint when processed/synced/failed are given)
+
+        With owner, only while that owner still holds the job.
+
+        Returns:
+            Whether the job was updated
+        """
+        values = {
+            column: json.dumps(value) if column in ("synced", "failed") else value
+            for column, value in fields.items()
+        }
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        query = f"UPDATE sync_jobs SET {assignments} WHERE id = ?"
+        params = (*values.values(), job_id)
+        if owner is not None:
+            query += " AND owner = ?"
+            params += (owner,)
+        async with self._writing(self._ensure_sync_jobs) as conn:
+            cursor = await conn.execute(query, params)
+        return cursor.rowcount == 1
+
+    async def _create_user_table(self, conn, table: str, ddl: str) -> bool:
+        """
+        Create a user table, moving in the rows earlier releases kept in the catalog file
+
+        Returns:
+            Whether the catalog file had the table
+        """
+        cursor = await conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        )
+        if await cursor.fetchone() is not None:
+            return True
+        await conn.execute(ddl)
+        await conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)"
+        )
+
+        catalog = await self.connect()
+        try:
+            cursor = await catalog.execute(f"SELECT * FROM {table}")
+        except aiosqlite.OperationalError:
+            return False
+        rows = [dict(row) for row in await cursor.fetchall()]
+        if rows:
+            cursor = await conn.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in await cursor.fetchall() if row[1] in rows[0]]
+            await conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [[row[c] for c in columns] for row in rows]
+            )
+            await conn.commit()
+            logger.info(f"Moved {len(rows)} saved {table} from the catalog to {self.user_db_path}")
+        return True
+
+    async def _ensure_locations(self, conn) -> None:
+        """Create the saved locations table, seeding the default location"""
+        if not self._locations_ready:
+            if not await self._create_user_table(conn, "locations", LOCATIONS_DDL):
+                await conn.execute(
+                    f"INSERT OR IGNORE INTO locations ({', '.join(LOCATION_COLUMNS)}, created_at) "
+                    f"VALUES ({', '.join('?' * len(LOCATION_COLUMNS))}, 0)",
+                    [DEFAULT_LOCATION[c] for c in LOCATION_COLUMNS]
+                )
+                await conn.commit()
+            self._locations_ready = True
+
+    async def _ensure_equipment(self, conn) -> None:
+        """Create the saved equipment table"""
+        if not self._equipment_ready:
+            await self._create_user_table(conn, "equipment", EQUIPMENT_DDL)
+            self._equipment_ready = True
+
+    async def _ensure_visible_zones(self, conn) -> None:
+        """Create the saved visible zones table"""
+        if not self._visible_zones_ready:
+            await self._create_user_table(conn, "visible_zones", VISIBLE_ZONES_DDL)
+            self._visible_zones_ready = True
+
+    async def _read_table(self, table: str, columns: tuple, decode=None) -> List[dict]:
+        """
+        All rows of a small user table, oldest first, through the in-process cache
+
+        The cached copy is reused while PRAGMA data_version is unchanged, i.e.
+        no other worker has committed since; this worker's own writes drop it.
+        decode(row) runs once per row when the table is (re)read.
+        """
+        conn = await self.connect_user()
+        cursor = await conn.execute("PRAGMA data_version")
+        data_version = (await cursor.fetchone())[0]
+        cached = self._table_cache.get(table)
+        if cached is not None and cached[0] == data_version:
+            return [dict(row) for row in cached[1]]
+
+        cursor = await conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} ORDER BY created_at, id"
+        )
+        rows = [dict(row) for row in await cursor.fetchall()]
+        if decode is not None:
+            for row in rows:
+                decode(row)
+        self._table_cache[table] = (data_version, rows)
+        return [dict(row) for row in rows]
+
+    async def list_locations(self) -> List[dict]:
+        """Saved observing locations"""
+        conn = await self.connect_user()
+        await self._ensure_locations(conn)
+
+        rows = await self._read_table("locations", LOCATION_COLUMNS)
+        for row in rows:
+            row["is_default"] = bool(row["is_default"])
+        return rows
+
+    async def save_location(self, location: dict) -> None:
+        """Insert a saved location, or update one keeping its created_at"""
+        conn = await self.connect_user()
+        await self._ensure_locations(conn)
+
+        await conn.execute(
+            f"INSERT INTO locations ({', '.join(LOCATION_COLUMNS)}, created_at) "
+            f"VALUES ({', '.join('?' * len(LOCATION_COLUMNS))}, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET {_upsert_assignments(LOCATION_COLUMNS)}",
+            [location.get(c) for c in LOCATION_COLUMNS[:-1]]
+            + [bool(location.get("is_default")), time.time()]
+        )
+        await conn.commit()
+        self._table_cache.pop("locations", None)
+
+    async def delete_location(self, location_id: str) -> bool:
+        """
+        Delete a saved location
+
+        Returns:
+            Whether the location existed
+        """
+        conn = await self.connect_user()
+        await self._ensure_locations(conn)
+
+        cursor = await conn.execute("DELETE FROM locations WHERE id = ?", (location_id,))
+        await conn.commit()
+        self._table_cache.pop("locations", None)
+        return cursor.rowcount == 1
+
+    async def list_equipment(self) -> List[dict]:
+        """Saved equipment configurations"""
+        conn = await self.connect_user()
+        await self._ensure_equipment(conn)
+
+        return await self._read_table("equipment", EQUIPMENT_COLUMNS)
+
+    async def save_equipment(self, equipment: dict) -> None:
+        """Insert a saved equipment configuration, or update one keeping its created_at"""
+        conn = await self.connect_user()
+        await self._ensure_equipment(conn)
+
+        await conn.execute(
+            f"INSERT INTO equipment ({', '.join(EQUIPMENT_COLUMNS)}, created_at) "
+            f"VALUES ({', '.join('?' * len(EQUIPMENT_COLUMNS))}, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET {_upsert_assignments(EQUIPMENT_COLUMNS)}",
+            [equipment.get(c) for c in EQUIPMENT_COLUMNS] + [time.time()]
+        )
+        await conn.commit()
+        self._table_cache.pop("equipment", None)
+
+    async def list_visible_zones(self) -> List[dict]:
+        """Saved visible zones with their polygons decoded"""
+        conn = await self.connect_user()
+        await self._ensure_visible_zones(conn)
+
+        def decode(row):
+            row["polygon"] = json.loads(row["polygon"])
+
+        return await self._read_table("visible_zones", VISIBLE_ZONE_COLUMNS, decode)
+
+    async def save_visible_zone(self, zone_id: str, name: str, polygon: List, priority: int) -> None:
+        """Insert a new visible zone at version 1"""
+        conn = await self.connect_user()
+        await self._ensure_visible_zones(conn)
+
+        await conn.execute(
+            """INSERT INTO visible_zones (id, name, polygon, priority, version, created_at)
+               VALUES (?, ?, ?, ?, 1, ?)""",
+            (zone_id, name, json.dumps(polygon), priority, time.time())
+        )
+        await conn.commit()
+        self._table_cache.pop("visible_zones", None)
+
+    async def update_visible_zone(self, zone_id: str, name: str, polygon: List,
+                                  priority: int) -> Optional[int]:
+        """
+        Replace a zone's contents and bump its version
+
+        Returns:
+            The new version, or None if the zone does not exist
+        """
+        conn = await self.connect_user()
+        await self._ensure_visible_zones(conn)
+
+        cursor = await conn.execute(
+            """UPDATE visible_zones SET name = ?, polygon = ?, priority = ?, version = version + 1
+               WHERE id = ? RETURNING version""",
+            (name, json.dumps(polygon), priority, zone_id)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        await conn.commit()
+        self._table_cache.pop("visible_zones", None)
+        return row[0] if row else None
+
+    async def delete_visible_zone(self, zone_id: str) -> bool:
+        """
+        Delete a saved visible zone
+
+        Returns:
+            Whether the zone existed
+        """
+        conn = await self.connect_user()
+        await self._ensure_visible_zones(conn)
+
+        cursor = await conn.execute("DELETE FROM visible_zones WHERE id = ?", (zone_id,))
         await conn.commit()
+        self._table_cache.pop("visible_zones", None)
+        return cursor.rowcount == 1
 
     async def get_statistics(self) -> DatabaseStats:
         """Get database statistics"""
@@ -1,13 +1,32 @@
 """Model adapter for converting between database and API models"""
+import json
+from typing import List, Union
 from app.models.database import DeepSkyObject, ObservationalInfo
+from app.models.records import ObjectRecord
 from app.models.target import DeepSkyTarget
 
+# Columns of the denormalized objects_api table, in insert order
+API_COLUMNS = (
+    "id", "type", "name", "name_en", "api_type", "ra", "dec", "magnitude", "size",
+    "constellation", "difficulty", "description", "optimal_season",
+    "optimal_fov_min", "optimal_fov_max", "tags"
+)
+
+# Database type -> API type enum
+TYPE_MAP = {
+    "GALAXY": "galaxy",
+    "NEBULA": "emission-nebula",
+    "CLUSTER": "cluster",
+    "PLANETARY": "planetary-nebula",
+    "STAR": "cluster"  # Treat stars as clusters for now
+}
+
 class ModelAdapter:
     """Adapter to convert DeepSkyObject to DeepSkyTarget"""
 
-    def to_target(self, obj: DeepSkyObject) -> DeepSkyTarget:
+    def to_target(self, obj: Union[DeepSkyObject, ObjectRecord]) -> DeepSkyTarget:
         """
-        Convert database model to API model
+        Convert database model (or slotted ObjectRecord) to API model
 
         Maps fields:
         - type: GALAXY -> galaxy, NEBULA -> emission-nebula, etc.
@@ -27,22 +46,10 @@ class ModelAdapter:
         if obj.observational_info:
             difficulty = self._map_difficulty(obj.observational_info.difficulty)
 
-        # Extract English name from aliases or use name
-        name_en = obj.name
-        # Try to find an English alias (prefer multi-word names over catalog numbers)
-        for alias in obj.aliases:
-            # Skip catalog designations (M, NGC, IC, etc.)
-            if alias[0].isalpha() and not any(alias.startswith(prefix) for prefix in ['M', 'NGC', 'IC', 'PGC']):
-                # Prefer multi-word names (likely English names)
-                if ' ' in alias:
-                    name_en = alias
-                    break
-        # If no multi-word English name found, use the original name
-
         return DeepSkyTarget(
             id=obj.id,
             name=obj.name,
-            name_en=name_en,
+            name_en=self._extract_name_en(obj),
             type=self._normalize_type(obj.type),
             ra=obj.ra,
             dec=obj.dec,
@@ -56,6 +63,62 @@ class ModelAdapter:
             tags=self._generate_tags(obj)
         )
 
+    def to_api_row(self, obj: DeepSkyObject) -> dict:
+        """
+        Materialize everything to_target() derives, for the objects_api table
+        """
+        target = self.to_target(obj)
+        return {
+            "id": target.id,
+            "type": obj.type,
+            "name": target.name,
+            "name_en": target.name_en,
+            "api_type": target.type,
+            "ra": target.ra,
+            "dec": target.dec,
+            "magnitude": target.magnitude,
+            "size": target.size,
+            "constellation": target.constellation,
+            "difficulty": target.difficulty,
+            "description": target.description,
+            "optimal_season": json.dumps(target.optimal_season),
+            "optimal_fov_min": target.optimal_fov["min"],
+            "optimal_fov_max": target.optimal_fov["max"],
+            "tags": json.dumps(target.tags)
+        }
+
+    def from_api_row(self, row) -> DeepSkyTarget:
+        """Build a DeepSkyTarget from an objects_api row"""
+        # Validated construction: with pydantic v2 it is faster than model_construct()
+        return DeepSkyTarget(
+            id=row["id"],
+            name=row["name"],
+            name_en=row["name_en"],
+            type=row["api_type"],
+            ra=row["ra"],
+            dec=row["dec"],
+            magnitude=row["magnitude"],
+            size=row["size"],
+            constellation=row["constellation"],
+            difficulty=row["difficulty"],
+            description=row["description"],
+            optimal_season=json.loads(row["optimal_season"]),
+            optimal_fov={"min": row["optimal_fov_min"], "max": row["optimal_fov_max"]},
+            tags=json.loads(row["tags"])
+        )
+
+    def _extract_name_en(self, obj: DeepSkyObject) -> str:
+        """Extract English name from aliases or use name"""
+        # Try to find an English alias (prefer multi-word names over catalog numbers)
+        for alias in obj.aliases:
+            # Skip catalog designations (M, NGC, IC, etc.)
+            if alias[0].isalpha() and not any(alias.startswith(prefix) for prefix in ['M', 'NGC', 'IC', 'PGC']):
+                # Prefer multi-word names (likely English names)
+                if ' ' in alias:
+                    return alias
+        # If no multi-word English name found, use the original name
+        return obj.name
+
     def _calculate_size(self, major: float = None, minor: float = None) -> float:
         """Calculate size from major/minor axes"""
         if major is None and minor is None:
@@ -66,14 +129,13 @@ class ModelAdapter:
 
     def _normalize_type(self, db_type: str) -> str:
         """Normalize database type to API type enum"""
-        type_map = {
-            "GALAXY": "galaxy",
-            "NEBULA": "emission-nebula",
-            "CLUSTER": "cluster",
-            "PLANETARY": "planetary-nebula",
-            "STAR": "cluster"  # Treat stars as clusters for now
-        }
-        return type_map.get(db_type, "galaxy")  # Default to galaxy
+        return TYPE_MAP.get(db_type, "galaxy")  # Default to galaxy
+
+    def db_types(self, types: List[str]) -> List[str]:
+        """Database types matching API types (galaxy, emission-nebula, ...) or database type names"""
+        wanted = {t.lower() for t in types}
+        return [db_type for db_type, api_type in TYPE_MAP.items()
+                if api_type in wanted or db_type.lower() in wanted]
 
     def _map_difficulty(self, difficulty: str = None) -> int:
         """Map difficulty string to integer (1-5)"""
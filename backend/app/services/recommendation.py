@@ -1,23 +1,25 @@
 """Recommendation engine service"""
-from typing import List, Optional
+import heapq
+from typing import List, Optional, Sequence, Union
 from datetime import datetime
 from app.services.visibility import VisibilityService
 from app.services.scoring import ScoringService
 from app.services.astronomy import AstronomyService
-from app.services.database import DatabaseService
+from app.models.records import TargetRecord
 from app.services.model_adapter import ModelAdapter
+from app.services.zones import CompiledZone, compile_zones
 from app.models.target import DeepSkyTarget, VisibleZone
-from app.models.database import DeepSkyObject as DBDeepSkyObject
 
 
 class RecommendationService:
     """Recommendation engine with real database support"""
 
-    def __init__(self):
-        self.visibility = VisibilityService()
+    def __init__(self, astronomy: Optional[AstronomyService] = None):
+        # Pass the app's shared AstronomyService so catalog reloads reach this one
+        self.astronomy = astronomy or AstronomyService()
+        self.visibility = VisibilityService(self.astronomy)
         self.scoring = ScoringService()
-        self.astronomy = AstronomyService()
-        self.db_service = DatabaseService()  # NEW: Real database
+        self.db_service = self.astronomy.db
         self.model_adapter = ModelAdapter()  # NEW: Model adapter
 
     async def generate_recommendations(
@@ -27,7 +29,7 @@ class RecommendationService:
         observer_lon: float,
         date: datetime,
         equipment: dict,
-        visible_zones: List[VisibleZone],
+        visible_zones: Sequence[Union[VisibleZone, CompiledZone]],
         filters: Optional[dict] = None,
         limit: int = 20
     ) -> List[dict]:
@@ -47,22 +49,22 @@ class RecommendationService:
         Returns:
             List of recommendations
         """
-        # Load all targets from real database
-        db_objects = await self._load_targets_from_db(filters)
+        # Compile the zones once rather than once per record
+        visible_zones = compile_zones(visible_zones)
 
-        recommendations = []
+        # Phase 1: rank compact (id, ra, dec, magnitude, size) records
+        records = await self._load_records(filters)
 
-        for db_obj in db_objects:
-            # Convert to API model
-            target = self.model_adapter.to_target(db_obj)
+        ranked = []
 
+        for record in records:
             # Apply filters
-            if filters and not self._apply_filters(target, db_obj, filters):
+            if filters and not self._apply_filters(record, filters):
                 continue
 
             # Calculate visibility windows
             windows = self.visibility.calculate_visibility_windows(
-                target.ra, target.dec,
+                record.ra, record.dec,
                 observer_lat, observer_lon,
                 date, visible_zones
             )
@@ -76,21 +78,34 @@ class RecommendationService:
             # Calculate score
             score_result = self.scoring.calculate_score(
                 max_altitude=best_window["max_altitude"],
-                magnitude=target.magnitude,
-                target_size=target.size,
+                magnitude=record.magnitude,
+                target_size=record.size,
                 fov_horizontal=equipment.get("fov_horizontal", 2.0),
                 fov_vertical=equipment.get("fov_vertical", 1.5),
                 duration_minutes=best_window["duration_minutes"]
             )
 
-            # Determine period
-            period = self._determine_period(best_window["start_time"])
+            ranked.append((score_result, record, windows, best_window))
+
+        # Sort by score (stable, so ties keep catalog order)
+        top = heapq.nlargest(limit, ranked, key=lambda r: r[0]["total_score"])
+
+        # Phase 2: full payloads for the final K only
+        targets = await self.db_service.get_api_targets_by_ids([record.id for _, record, _, _ in top])
+        now = datetime.now()
+
+        recommendations = []
+        for score_result, record, windows, best_window in top:
+            target = targets.get(record.id)
+            if target is None:
+                # Gone since ranking (stale objects_api row or catalog swap)
+                continue
 
             # Get current position
             current_alt, current_az = self.astronomy.calculate_position(
-                target.ra, target.dec,
+                record.ra, record.dec,
                 observer_lat, observer_lon,
-                datetime.now()
+                now
             )
 
             recommendations.append({
@@ -99,56 +114,110 @@ class RecommendationService:
                 "current_position": {
                     "altitude": current_alt,
                     "azimuth": current_az,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": now.isoformat()
                 },
                 "score": score_result["total_score"],
                 "score_breakdown": score_result["breakdown"],
-                "period": period
+                "period": self._determine_period(best_window["start_time"])
             })
 
-        # Sort by score
-        recommendations.sort(key=lambda r: r["score"], reverse=True)
+        return recommendations
+
+    async def recommend_groups(
+        self,
+        observer_lat: float,
+        observer_lon: float,
+        date: datetime,
+        equipment: dict,
+        visible_zones: Sequence[Union[VisibleZone, CompiledZone]],
+        filters: Optional[dict] = None,
+        min_count: int = 3,
+        limit: int = 10
+    ) -> List[dict]:
+        """
+        Rank groups of objects sharing one frame as composite targets
+
+        Each group is scored like a single target at its frame center, using
+        the combined magnitude and the group extent as the target size.
+        """
+        visible_zones = compile_zones(visible_zones)
+        fov_h = equipment.get("fov_horizontal", 2.0)
+        fov_v = equipment.get("fov_vertical", 1.5)
+        filters = filters or {}
+        types = filters.get("types") or []
+
+        groups = await self.astronomy.find_groups(
+            fov_h, fov_v,
+            min_count=min_count,
+            obj_types=types or None,
+            max_magnitude=filters.get("min_magnitude"),
+            limit=limit * 3
+        )
+
+        recommendations = []
+        for group in groups:
+            windows = self.visibility.calculate_visibility_windows(
+                group["center_ra"], group["center_dec"],
+                observer_lat, observer_lon,
+                date, visible_zones
+            )
+            if not windows:
+                continue
+
+            best_window = max(windows, key=lambda w: w["max_altitude"])
+            score_result = self.scoring.calculate_score(
+                max_altitude=best_window["max_altitude"],
+                magnitude=group["combined_magnitude"] if group["combined_magnitude"] is not None else 99.0,
+                target_size=group["extent"],
+                fov_horizontal=fov_h,
+                fov_vertical=fov_v,
+                duration_minutes=best_window["duration_minutes"]
+            )
+
+            recommendations.append({
+                "group": group,
+                "visibility_windows": windows,
+                "score": score_result["total_score"],
+                "score_breakdown": score_result["breakdown"],
+                "period": self._determine_period(best_window["start_time"])
+            })
 
+        recommendations.sort(key=lambda r: r["score"], reverse=True)
         return recommendations[:limit]
 
-    async def _load_targets_from_db(
-        self,
-        filters: Optional[dict] = None
-    ) -> List[DBDeepSkyObject]:
-        """Load targets from database with optional filters"""
+    async def _load_records(self, filters: Optional[dict]) -> List[TargetRecord]:
+        """Load compact ranking records, read from objects_api"""
         # TODO: For performance, implement proper pagination
         # For now, load a reasonable subset
 
         # If type filter specified, use optimized query
         if filters and "types" in filters:
-            all_objects = []
+            all_records = []
             for obj_type in filters["types"]:
-                objects = await self.db_service.get_objects_by_type(obj_type)
-                all_objects.extend(objects)
-            return all_objects[:1000]  # Limit to 1000 for performance
+                all_records.extend(await self.db_service.get_target_records(obj_type))
+            return all_records[:1000]  # Limit to 1000 for performance
 
         # If no filters, get a sample across different types
         # In production, this should use cursor-based pagination
-        sample_objects = []
+        sample_records = []
 
         # Get some galaxies, nebulae, and clusters
         for obj_type in ["GALAXY", "NEBULA", "CLUSTER"]:
-            objects = await self.db_service.get_objects_by_type(obj_type)
-            sample_objects.extend(objects[:500])  # 500 of each type
+            records = await self.db_service.get_target_records(obj_type)
+            sample_records.extend(records[:500])  # 500 of each type
 
-        return sample_objects
+        return sample_records
 
     def _apply_filters(
         self,
-        target: DeepSkyTarget,
-        db_obj: DBDeepSkyObject,
+        record: TargetRecord,
         filters: dict
     ) -> bool:
         """Apply filter conditions"""
         # Magnitude filter
         if "min_magnitude" in filters:
             mag_limit = filters["min_magnitude"]
-            if target.magnitude is not None and target.magnitude > mag_limit:
+            if record.magnitude is not None and record.magnitude > mag_limit:
                 return False
 
         # Type filter (already handled in database query)
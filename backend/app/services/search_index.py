@@ -0,0 +1,318 @@
+"""In-memory name indexes for interactive target search"""
+import bisect
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Prefixes up to this length match large slices of the catalog ("n", "ng"),
+# so their ranked completions are memoized.
+MEMO_PREFIX_LENGTH = 2
+
+# Fuzzy search tuning
+MIN_SIMILARITY = 0.35           # Dice coefficient threshold for a fuzzy hit
+MAX_POSTING_LENGTH = 2000       # Trigrams shared by more labels ("ngc") are skipped
+BULK_ADD_THRESHOLD = 32         # PrefixIndex.add_many merges instead of inserting above this
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_MESSIER = re.compile(r'^m\d+$')
+_DESIGNATION = re.compile(r'^([a-z]+)0*(\d+)([a-z]*)$')
+_WORD_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(text: str) -> str:
+    """Case-fold and strip separators ("NGC 224" → "ngc224")"""
+    return _NON_ALNUM.sub('', text.casefold()) if text else ''
+
+
+def normalize_designation(text: str) -> str:
+    """
+    Canonical form of a catalog designation
+
+    Catalog prefix plus number with leading zeros stripped, so "M 31",
+    "m31" and "M031" all map to "m31" and "NGC0224" to "ngc224". Text that
+    is not a designation falls back to normalize_name().
+    """
+    key = normalize_name(text)
+    match = _DESIGNATION.match(key)
+    if not match:
+        return key
+    prefix, number, suffix = match.groups()
+    return f"{prefix}{int(number)}{suffix}"
+
+
+class AliasIndex:
+    """Hash map from normalized designations and aliases to canonical object ids"""
+
+    def __init__(self):
+        self._ids = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def build(self, rows: Iterable[Tuple[str, str, Optional[float], List[str]]]) -> None:
+        """Rebuild from (object_id, name, magnitude, aliases) rows"""
+        rows = list(rows)
+        ids = {}
+        # Primary ids win over aliases that happen to collide with them
+        for object_id, _, _, _ in rows:
+            ids[normalize_designation(object_id)] = object_id
+        for object_id, name, _, aliases in rows:
+            for label in [name] + list(aliases or []):
+                key = normalize_designation(label)
+                if key:
+                    ids.setdefault(key, object_id)
+
+        self._ids = ids
+        self.loaded = True
+
+    def add(self, object_id: str, name: str, aliases: List[str]) -> None:
+        """Register a single object without a rebuild"""
+        self._ids[normalize_designation(object_id)] = object_id
+        for label in [name] + list(aliases or []):
+            key = normalize_designation(label)
+            if key:
+                self._ids.setdefault(key, object_id)
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Return the canonical object id for a designation or alias"""
+        return self._ids.get(normalize_designation(text))
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over object names and aliases
+
+    Keys are normalized names kept in one sorted list, so a prefix maps to a
+    contiguous slice found with two bisections. Completions in that slice are
+    ranked Messier objects first, then by magnitude (brightest first).
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._entries: List[Tuple[tuple, str, str, str]] = []  # (rank, id, name, match)
+        self._object_keys: Dict[str, List[str]] = {}  # object id -> its keys
+        self._memo = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self, rows: Iterable[Tuple[str, str, Optional[float], List[str]]]) -> None:
+        """Rebuild from (object_id, name, magnitude, aliases) rows"""
+        pairs = []
+        for object_id, name, magnitude, aliases in rows:
+            pairs.extend(self._make_entries(object_id, name, magnitude, aliases))
+        pairs.sort(key=lambda p: p[0])
+
+        self._keys = [key for key, _ in pairs]
+        self._entries = [entry for _, entry in pairs]
+        self._object_keys = {}
+        for key, entry in pairs:
+            self._object_keys.setdefault(entry[1], []).append(key)
+        self._memo = {}
+        self.loaded = True
+
+    def add(self, object_id: str, name: str, magnitude: Optional[float],
+            aliases: List[str]) -> None:
+        """Insert or replace a single object (e.g. a freshly cached SIMBAD result)"""
+        self.remove(object_id)
+        pairs = self._make_entries(object_id, name, magnitude, aliases)
+        for key, entry in pairs:
+            pos = bisect.bisect_right(self._keys, key)
+            self._keys.insert(pos, key)
+            self._entries.insert(pos, entry)
+        self._object_keys[object_id] = [key for key, _ in pairs]
+        self._memo = {}
+
+    def add_many(self, rows: Iterable[Tuple[str, str, Optional[float], List[str]]]) -> None:
+        """
+        Insert or replace many objects (a bulk sync) in one pass
+
+        The new keys are sorted and merged with the existing arrays, instead
+        of one insertion per key.
+        """
+        rows = list({row[0]: row for row in rows}.values())  # Last row per object wins
+        if len(rows) <= BULK_ADD_THRESHOLD:
+            for row in rows:
+                self.add(*row)
+            return
+
+        pairs = []
+        for object_id, name, magnitude, aliases in rows:
+            pairs.extend(self._make_entries(object_id, name, magnitude, aliases))
+        pairs.sort(key=lambda p: p[0])
+
+        existing = zip(self._keys, self._entries)
+        replaced = {row[0] for row in rows if row[0] in self._object_keys}
+        if replaced:
+            existing = ((key, entry) for key, entry in existing if entry[1] not in replaced)
+        # heapq.merge keeps existing entries ahead of equal new keys, like bisect_right
+        merged = list(heapq.merge(existing, pairs, key=lambda p: p[0]))
+
+        self._keys = [key for key, _ in merged]
+        self._entries = [entry for _, entry in merged]
+        for row in rows:
+            self._object_keys[row[0]] = []
+        for key, entry in pairs:
+            self._object_keys[entry[1]].append(key)
+        self._memo = {}
+
+    def remove(self, object_id: str) -> None:
+        """Drop every key that points at object_id"""
+        keys = self._object_keys.pop(object_id, None)
+        if not keys:
+            return
+        for key in keys:
+            lo = bisect.bisect_left(self._keys, key)
+            hi = bisect.bisect_right(self._keys, key, lo)
+            for pos in range(lo, hi):
+                if self._entries[pos][1] == object_id:
+                    del self._keys[pos]
+                    del self._entries[pos]
+                    break
+        self._memo = {}
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Return up to `limit` distinct objects whose name or alias starts with prefix"""
+        key = normalize_name(prefix)
+        if not key:
+            return []
+
+        memo_key = (key, limit)
+        if len(key) <= MEMO_PREFIX_LENGTH and memo_key in self._memo:
+            return self._memo[memo_key]
+
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + '￿', lo)
+
+        # Best-ranked entry per object; an object matches once even when
+        # several of its aliases share the prefix.
+        best = {}
+        for entry in self._entries[lo:hi]:
+            current = best.get(entry[1])
+            if current is None or entry[0] < current[0]:
+                best[entry[1]] = entry
+
+        top = heapq.nsmallest(limit, best.values(), key=lambda e: (e[0], e[1]))
+        results = [
+            {"id": object_id, "name": name, "match": match, "magnitude": rank[1]}
+            for rank, object_id, name, match in top
+        ]
+        for item in results:
+            if item["magnitude"] >= 99.0:
+                item["magnitude"] = None
+
+        if len(key) <= MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = results
+        return results
+
+    def _make_entries(self, object_id, name, magnitude, aliases):
+        """Build (key, entry) pairs for one object"""
+        labels = [object_id, name] + [a for a in (aliases or []) if a]
+        keys = {}
+        for label in labels:
+            key = normalize_name(label)
+            if key and key not in keys:
+                keys[key] = label
+
+        is_messier = any(_MESSIER.match(k) for k in keys)
+        rank = (0 if is_messier else 1, magnitude if magnitude is not None else 99.0)
+        return [(key, (rank, object_id, name, label)) for key, label in keys.items()]
+
+
+def trigrams(text: str) -> set:
+    """Padded character trigrams of each word ("m31" → {"  m", " m3", "m31", "31 "})"""
+    words = _WORD_SEPARATORS.sub(' ', text.casefold()).split() if text else []
+    grams = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Typo-tolerant matcher over names and aliases
+
+    Each label is split into trigrams held in an inverted index, so a query
+    only touches labels sharing at least one trigram with it instead of
+    comparing against the whole catalog. Candidates are ranked by the Dice
+    coefficient 2|A∩B| / (|A|+|B|).
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._labels: List[Optional[Tuple[str, str, int]]] = []  # (object_id, label, trigram count)
+        self._label_ids = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._label_ids.values())
+
+    def build(self, rows: Iterable[Tuple[str, str, Optional[float], List[str]]]) -> None:
+        """Rebuild from (object_id, name, magnitude, aliases) rows"""
+        self._postings = {}
+        self._labels = []
+        self._label_ids = {}
+        for object_id, name, _, aliases in rows:
+            self._add_labels(object_id, name, aliases)
+        self.loaded = True
+
+    def add(self, object_id: str, name: str, aliases: List[str]) -> None:
+        """Insert or replace a single object without a rebuild"""
+        # Replaced labels are tombstoned; postings are compacted on the next build()
+        for label_id in self._label_ids.pop(object_id, []):
+            self._labels[label_id] = None
+        self._add_labels(object_id, name, aliases)
+
+    def search(self, text: str, limit: int = 20,
+               min_similarity: float = MIN_SIMILARITY) -> List[Tuple[str, str, float]]:
+        """Return up to `limit` (object_id, matched label, similarity), best first"""
+        query = trigrams(text)
+        if not query:
+            return []
+
+        present = [g for g in query if g in self._postings]
+        selective = [g for g in present if len(self._postings[g]) <= MAX_POSTING_LENGTH]
+        # Fall back to every posting list when the query is made only of common trigrams
+        considered = selective or present
+        postings = [self._postings[g] for g in considered]
+        # Common trigrams left out of the lookup still count where a candidate has them
+        skipped = set(present) - set(considered)
+
+        shared = {}
+        for posting in postings:
+            for label_id in posting:
+                shared[label_id] = shared.get(label_id, 0) + 1
+
+        best = {}
+        for label_id, common in shared.items():
+            entry = self._labels[label_id]
+            if entry is None:
+                continue
+            object_id, label, size = entry
+            if skipped:
+                common += len(skipped & trigrams(label))
+            score = 2.0 * common / (len(query) + size)
+            if score >= min_similarity and score > best.get(object_id, (0.0, ''))[0]:
+                best[object_id] = (score, label)
+
+        top = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(object_id, label, round(score, 3)) for object_id, (score, label) in top]
+
+    def _add_labels(self, object_id, name, aliases):
+        """Index the id, name and aliases of one object"""
+        seen = set()
+        for label in [object_id, name] + list(aliases or []):
+            grams = trigrams(label)
+            key = frozenset(grams)
+            if not grams or key in seen:
+                continue
+            seen.add(key)
+
+            label_id = len(self._labels)
+            self._labels.append((object_id, label, len(grams)))
+            self._label_ids.setdefault(object_id, []).append(label_id)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(label_id)
@@ -0,0 +1,285 @@
+"""Catalog arrays shared between uvicorn worker processes
+
+With `uvicorn --workers N` every worker would otherwise hold its own copy
+of the sky columns and spatial index. In shared mode the first worker to
+need a catalog snapshot publishes its arrays into a named
+multiprocessing.shared_memory segment; the other workers attach to it
+read-only, so there is one physical copy per snapshot.
+
+Each snapshot gets its own segment, named after a key (catalog version and
+object count), so a replacement never writes into memory another worker
+is reading. A small control segment holds a generation counter and the
+name of the latest segment; a worker that sees the counter move reloads,
+and the publisher unlinks its old segment once it has switched (workers
+that still map it keep their pages until they switch too).
+
+Only the sky map arrays are shared: the spatial index, the numeric
+columns and the string columns. The name search indexes (AliasIndex,
+PrefixIndex, TrigramIndex) stay per worker. They are dicts and lists each
+worker updates in place as SIMBAD objects are cached, which a read-only
+segment cannot hold.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SKYCAT01"
+HEADER = struct.Struct("<8sqqq")  # magic, state, generation, manifest length
+CONTROL = struct.Struct("<qq64s")  # sequence, generation, latest segment name
+ALIGN = 64
+
+# Segment states
+BUILDING = 0
+READY = 1
+
+# Segments released while numpy views into them were still alive
+_retired: List[shared_memory.SharedMemory] = []
+
+
+def segment_name(prefix: str, key: str) -> str:
+    """Segment name for a snapshot key (short enough for macOS' 31 characters)"""
+    return f"{prefix}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _open(name: str, create: bool = False, size: int = 0, track: bool = True) -> shared_memory.SharedMemory:
+    """
+    Create or attach to a segment
+
+    Untracked segments are not unlinked by the resource tracker when this
+    process exits. Attached segments must be untracked, otherwise the first
+    worker to exit would remove them for everyone.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=track)
+    if track:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    # Older versions register every open. Skip that instead of unregistering
+    # afterwards: a tracker shared with the publisher keeps one entry per name,
+    # so unregistering would drop the publisher's own registration.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    finally:
+        resource_tracker.register = register
+
+
+def _close(shm: shared_memory.SharedMemory) -> None:
+    """Close a mapping, or keep it until views into it are gone"""
+    for retired in list(_retired):
+        try:
+            retired.close()
+            _retired.remove(retired)
+        except BufferError:
+            pass
+    try:
+        shm.close()
+    except BufferError:
+        _retired.append(shm)
+
+
+class SharedSegment:
+    """One published snapshot: a header, a JSON manifest and aligned arrays"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.name = shm.name.lstrip("/")
+        self.owner = owner
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self.meta: Dict = {}
+
+    @classmethod
+    def create(cls, name: str, arrays: Dict[str, np.ndarray], meta: Dict) -> "SharedSegment":
+        """Publish arrays under name; raises FileExistsError if already published"""
+        layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[key] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+        manifest = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+        data_start = -(-(HEADER.size + len(manifest)) // ALIGN) * ALIGN
+
+        shm = _open(name, create=True, size=max(1, data_start + offset))
+        buf = shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, BUILDING, 0, len(manifest))
+        buf[HEADER.size:HEADER.size + len(manifest)] = manifest
+        for key, array in arrays.items():
+            spec = layout[key]
+            np.ndarray(spec["shape"], dtype=spec["dtype"], buffer=buf,
+                       offset=data_start + spec["offset"])[...] = array
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> Optional["SharedSegment"]:
+        """Attach to a published segment, or None if there is none"""
+        try:
+            return cls(_open(name, track=False), owner=False)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Created but not sized yet
+            return None
+
+    def _header(self) -> Tuple[bytes, int, int, int]:
+        if self._shm.size < HEADER.size:
+            return b"", BUILDING, 0, 0
+        return HEADER.unpack_from(self._shm.buf, 0)
+
+    @property
+    def ready(self) -> bool:
+        magic, state, _, _ = self._header()
+        return magic == MAGIC and state == READY
+
+    @property
+    def generation(self) -> int:
+        return self._header()[2]
+
+    def mark_ready(self, generation: int) -> None:
+        """Make the segment visible to readers"""
+        HEADER.pack_into(self._shm.buf, 0, MAGIC, READY, generation, self._header()[3])
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Read-only numpy views into the segment"""
+        if self._arrays is None:
+            _, _, _, manifest_size = self._header()
+            manifest = json.loads(bytes(self._shm.buf[HEADER.size:HEADER.size + manifest_size]))
+            data_start = -(-(HEADER.size + manifest_size) // ALIGN) * ALIGN
+            arrays = {}
+            for key, spec in manifest["arrays"].items():
+                view = np.ndarray(spec["shape"], dtype=spec["dtype"], buffer=self._shm.buf,
+                                  offset=data_start + spec["offset"])
+                view.flags.writeable = False
+                arrays[key] = view
+            self.meta = manifest["meta"]
+            self._arrays = arrays
+        return self._arrays
+
+    def release(self) -> None:
+        """Stop using the segment; the publisher also removes its name"""
+        self._arrays = None
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        _close(self._shm)
+
+
+class ControlBlock:
+    """Generation counter and latest segment name, updated under a sequence lock"""
+
+    def __init__(self, prefix: str):
+        try:
+            # Never unlinked: it is tiny and reused across restarts
+            self._shm = _open(prefix, create=True, size=CONTROL.size, track=False)
+        except FileExistsError:
+            self._shm = _open(prefix, track=False)
+
+    def read(self) -> Tuple[int, str]:
+        """(generation, latest segment name)"""
+        for _ in range(1000):
+            seq, generation, name = CONTROL.unpack_from(self._shm.buf, 0)
+            if seq % 2 == 0 and CONTROL.unpack_from(self._shm.buf, 0)[0] == seq:
+                break
+        # After a writer died mid-update the last read is as good as any
+        return generation, name.rstrip(b"\0").decode("ascii")
+
+    def advance(self, name: str) -> int:
+        """Announce a new segment and return its generation"""
+        seq, generation, _ = CONTROL.unpack_from(self._shm.buf, 0)
+        generation += 1
+        struct.pack_into("<q", self._shm.buf, 0, seq + 1)
+        CONTROL.pack_into(self._shm.buf, 0, seq + 1, generation, name.encode("ascii"))
+        struct.pack_into("<q", self._shm.buf, 0, seq + 2)
+        return generation
+
+    def close(self) -> None:
+        _close(self._shm)
+
+
+class SharedCatalog:
+    """A worker's handle on the shared catalog snapshots"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.segment: Optional[SharedSegment] = None
+        self._control: Optional[ControlBlock] = None
+        self._seen = 0  # Last control generation this worker acted on
+
+    @property
+    def control(self) -> ControlBlock:
+        if self._control is None:
+            self._control = ControlBlock(self.prefix)
+        return self._control
+
+    async def acquire(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[Tuple[Dict[str, np.ndarray], Dict]]],
+        timeout: float
+    ) -> SharedSegment:
+        """
+        Attach to the snapshot for key, publishing it first if nobody has
+
+        build() returns (arrays, meta) and only runs in the publishing
+        worker. Raises TimeoutError if another worker started publishing but
+        never finished.
+        """
+        name = segment_name(self.prefix, key)
+        if self.segment is not None and self.segment.name == name:
+            return self.segment
+
+        deadline = time.monotonic() + timeout
+        while True:
+            segment = SharedSegment.attach(name)
+            if segment is None:
+                arrays, meta = await build()
+                try:
+                    segment = SharedSegment.create(name, arrays, meta)
+                except FileExistsError:
+                    continue  # Another worker won the race
+                segment.mark_ready(self.control.advance(name))
+                logger.info(f"Published shared catalog {name} (generation {segment.generation})")
+            if segment.ready:
+                break
+            segment.release()
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Shared catalog {name} was never completed")
+            await asyncio.sleep(0.05)
+
+        previous, self.segment = self.segment, segment
+        self._seen = max(self._seen, segment.generation)
+        if previous is not None:
+            previous.release()
+        return segment
+
+    def stale(self) -> bool:
+        """Whether another worker published a different snapshot since the last check"""
+        if self.segment is None:
+            return False
+        generation, name = self.control.read()
+        if generation == self._seen:
+            return False
+        self._seen = generation
+        return name != self.segment.name
+
+    def close(self) -> None:
+        """Release the current snapshot (unlinking it if this worker published it)"""
+        if self.segment is not None:
+            self.segment.release()
+            self.segment = None
+        if self._control is not None:
+            self._control.close()
+            self._control = None
@@ -1,20 +1,135 @@
 """SIMBAD TAP API service for fallback queries"""
+import asyncio
 import httpx
 import logging
 import re
+import time
 from typing import Optional, List, Dict
 from app.models.database import DeepSkyObject, ObservationalInfo
+from app.services.tap_cache import TAPResponseCache
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+class SIMBADUnavailableError(Exception):
+    """SIMBAD could not be queried (timeout, HTTP or network error)"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed: requests pass. After `threshold` consecutive failures the breaker
+    opens and requests fail fast. Once `reset_timeout` seconds have passed it
+    half-opens and lets a single probe through; the probe's outcome closes
+    or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """Forget a probe that was abandoned before it finished"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"SIMBAD: circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
 class SIMBADService:
     """Service for querying SIMBAD TAP API"""
 
     BASE_URL = "https://simbad.u-strasbg.fr/simbad/sim-tap"
-    TIMEOUT = 10.0  # seconds
 
-    async def query_object(self, object_id: str) -> Optional[DeepSkyObject]:
-        """Query SIMBAD for single object by ID"""
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        timeout: float = None,
+        cache: Optional[TAPResponseCache] = None
+    ):
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout if timeout is not None else settings.SIMBAD_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self.breaker = CircuitBreaker(
+            settings.SIMBAD_BREAKER_THRESHOLD,
+            settings.SIMBAD_BREAKER_RESET_TIMEOUT
+        )
+
+    async def start(self) -> httpx.AsyncClient:
+        """Open the pooled keep-alive client (idempotent)"""
+        loop = asyncio.get_running_loop()
+        # Pooled connections belong to the event loop that opened them
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client_loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.SIMBAD_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SIMBAD_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.SIMBAD_KEEPALIVE_EXPIRY
+                )
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    async def query_object(
+        self,
+        object_id: str,
+        raise_on_error: bool = False
+    ) -> Optional[DeepSkyObject]:
+        """
+        Query SIMBAD for single object by ID
+
+        Returns None when SIMBAD has no such object. Transport failures also
+        return None unless raise_on_error is set, in which case they raise
+        SIMBADUnavailableError so callers can tell "absent" from "unknown".
+        """
         logger.info(f"SIMBAD: Querying object {object_id}")
 
         # Parse ID to extract number
@@ -36,6 +151,9 @@ class SIMBADService:
         # Execute TAP query
         response = await self._execute_tap_query(query)
 
+        if response is None and raise_on_error:
+            raise SIMBADUnavailableError(f"SIMBAD query for {object_id} failed")
+
         if not response or not response.get('data'):
             logger.warning(f"SIMBAD: Object {object_id} not found")
             return None
@@ -44,35 +162,69 @@ class SIMBADService:
         row = response['data'][0]
         return self._parse_simbad_row(object_id, row)
 
-    async def query_objects_batch(self, object_ids: List[str]) -> List[DeepSkyObject]:
-        """Batch query multiple objects efficiently"""
+    async def query_objects_batch(
+        self,
+        object_ids: List[str],
+        raise_on_error: bool = False
+    ) -> List[DeepSkyObject]:
+        """
+        Batch query multiple objects in one ADQL request
+
+        Ids are matched through the ident table, trying the common SIMBAD
+        spellings of each designation ("M31" → "M 31", "M  31"). Returned
+        objects keep the id they were requested under.
+        """
         if not object_ids:
             return []
 
         logger.info(f"SIMBAD: Batch querying {len(object_ids)} objects")
 
+        spellings = {}
+        for obj_id in object_ids:
+            for ident in self._identifier_spellings(obj_id):
+                spellings.setdefault(ident, obj_id)
+
         # Build IN clause
-        ids_str = ", ".join([f"'{obj_id}'" for obj_id in object_ids])
+        ids_str = ", ".join("'" + ident.replace("'", "''") + "'" for ident in spellings)
         query = f"""
-            SELECT oid, main_id, ra, dec, galdim_majaxis, galdim_minaxis, V, all_types
-            FROM basic
-            WHERE oid IN ({ids_str})
+            SELECT ident.id AS ident, basic.oid, main_id, ra, dec,
+                   galdim_majaxis, galdim_minaxis, V, all_types
+            FROM ident JOIN basic ON ident.oidref = basic.oid
+            WHERE ident.id IN ({ids_str})
         """
 
         response = await self._execute_tap_query(query)
 
+        if response is None and raise_on_error:
+            raise SIMBADUnavailableError(f"SIMBAD batch query for {len(object_ids)} objects failed")
+
         if not response or not response.get('data'):
             logger.warning("SIMBAD: Batch query returned no results")
             return []
 
-        results = []
+        results = {}
         for row in response['data']:
-            obj_id = row['oid']
+            ident = row.get('ident')
+            if isinstance(ident, bytes):
+                ident = ident.decode('utf-8')
+            obj_id = spellings.get(ident)
+            if obj_id is None or obj_id in results:
+                continue
             obj = self._parse_simbad_row(obj_id, row)
             if obj:
-                results.append(obj)
+                results[obj_id] = obj
 
-        return results
+        return list(results.values())
+
+    def _identifier_spellings(self, object_id: str) -> List[str]:
+        """Spellings SIMBAD may store a designation under (M31 → M 31, M  31, ...)"""
+        spellings = [object_id.strip()]
+        match = re.match(r'^([A-Za-z]+)\s*0*(\d+)\s*([A-Za-z]*)$', object_id.strip())
+        if match:
+            prefix, number, suffix = match.group(1).upper(), match.group(2), match.group(3)
+            for width in (len(number), 3, 4, 5):
+                spellings.append(f"{prefix} {number:>{width}}{suffix}")
+        return list(dict.fromkeys(spellings))
 
     async def _execute_tap_query(self, adql: str) -> Optional[Dict]:
         """Execute ADQL query via TAP sync endpoint"""
@@ -83,25 +235,49 @@ class SIMBADService:
             'format': 'json'
         }
 
+        if self.cache is not None:
+            cached = await self.cache.get(adql)
+            if cached is not None:
+                logger.debug("SIMBAD: TAP cache hit")
+                return cached
+
+        # Fail fast instead of waiting out the timeout while SIMBAD is down
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow():
+            logger.warning("SIMBAD: circuit open, skipping query")
+            return None
+
         try:
-            async with httpx.AsyncClient(timeout=self.TIMEOUT) as client:
-                resp = await client.post(
-                    f"{self.BASE_URL}/sync",
-                    data=params
-                )
-                resp.raise_for_status()
-                return resp.json()
+            # Reuse pooled connections instead of paying TCP/TLS setup per query
+            client = await self.start()
+            resp = await client.post("/sync", data=params, timeout=self.timeout)
+            resp.raise_for_status()
+            result = resp.json()
 
+        except asyncio.CancelledError:
+            # Abandoned, not failed (client gone, lookup budget spent): a
+            # cancelled half-open probe must not block all later probes
+            if probe:
+                self.breaker.release_probe()
+            raise
         except httpx.TimeoutException:
             logger.error(f"SIMBAD: Request timeout")
+            self.breaker.record_failure()
             return None
         except httpx.HTTPError as e:
             logger.error(f"SIMBAD: HTTP error {e}")
+            self.breaker.record_failure()
             return None
         except Exception as e:
             logger.error(f"SIMBAD: Unexpected error {e}")
+            self.breaker.record_failure()
             return None
 
+        self.breaker.record_success()
+        if self.cache is not None:
+            await self.cache.put(adql, result)
+        return result
+
     def _extract_number(self, object_id: str) -> int:
         """Extract number from object ID (M31 → 31, NGC224 → 224)"""
         match = re.search(r'\d+', object_id)
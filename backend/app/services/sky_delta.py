@@ -0,0 +1,128 @@
+"""Snapshot tokens and deltas between consecutive sky map views
+
+A snapshot token is the view a sky map response was computed for (catalog
+version, location, timestamp, type filter, level of detail and viewport)
+as URL-safe base64 JSON. It holds no positions: a later request passing it
+back recomputes that view with sky_view() and diffs it against the new
+one, so any worker can answer it and nothing is stored between requests.
+A token for another catalog version is stale and answered in full.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.viewport import Viewport
+
+TOKEN_FORMAT = 1
+POSITION_DECIMALS = 2  # As the sky map rounds altitude and azimuth
+
+Position = Tuple[str, float, float]  # (id, altitude, azimuth)
+
+
+def encode_snapshot(view: dict) -> str:
+    """Token for a view dict (see decode_snapshot for its keys)"""
+    payload = json.dumps({"f": TOKEN_FORMAT, **view}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _finite(value, name: str) -> float:
+    """A token value that must be a finite number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"Snapshot token has an invalid {name}")
+    return float(value)
+
+
+def decode_snapshot(token: str) -> dict:
+    """
+    The view a token was issued for: version, latitude, longitude,
+    timestamp, obj_types, magnitude_limit, max_targets, unknown_magnitude
+    and viewport (Viewport.bounds, or None)
+
+    Tokens come back from clients, so every field is checked as a request
+    field would be, and max_targets is capped at SKYMAP_MAX_TARGETS.
+
+    Raises:
+        ValueError: if the token is malformed, from another format or
+            holds an invalid view
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        view = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed snapshot token: {e}")
+    if not isinstance(view, dict) or view.pop("f", None) != TOKEN_FORMAT:
+        raise ValueError("Unsupported snapshot token")
+    missing = {"version", "latitude", "longitude", "timestamp", "obj_types", "magnitude_limit",
+               "max_targets", "unknown_magnitude", "viewport"} - view.keys()
+    if missing:
+        raise ValueError(f"Snapshot token lacks {', '.join(sorted(missing))}")
+
+    if not isinstance(view["version"], str):
+        raise ValueError("Snapshot token has an invalid version")
+    for key in ("latitude", "longitude", "magnitude_limit", "unknown_magnitude"):
+        view[key] = _finite(view[key], key)
+    if not -90.0 <= view["latitude"] <= 90.0:
+        raise ValueError("Snapshot token has an invalid latitude")
+    try:
+        datetime.fromisoformat(view["timestamp"])
+    except (TypeError, ValueError):
+        raise ValueError("Snapshot token has an invalid timestamp")
+    obj_types = view["obj_types"]
+    if obj_types is not None and not (
+        isinstance(obj_types, list) and all(isinstance(t, str) for t in obj_types)
+    ):
+        raise ValueError("Snapshot token has invalid obj_types")
+    max_targets = view["max_targets"]
+    if isinstance(max_targets, bool) or not isinstance(max_targets, int) or max_targets < 1:
+        raise ValueError("Snapshot token has an invalid max_targets")
+    view["max_targets"] = min(max_targets, settings.SKYMAP_MAX_TARGETS)
+    if view["viewport"] is not None:
+        bounds = view["viewport"]
+        if not isinstance(bounds, list) or len(bounds) != 4:
+            raise ValueError("Snapshot token has an invalid viewport")
+        view["viewport"] = [_finite(value, "viewport") for value in bounds]
+        Viewport(*view["viewport"])  # Raises ValueError for an inverted altitude range
+    return view
+
+
+def view_viewport(view: dict) -> Optional[Viewport]:
+    """The Viewport a view dict was computed with, margin included"""
+    bounds = view["viewport"]
+    return Viewport(*bounds) if bounds is not None else None
+
+
+def compact_positions(rows: Sequence[dict]) -> List[Position]:
+    """(id, altitude, azimuth) of sky_view() rows, rounded as the map shows them"""
+    return [
+        (row["id"], round(row["altitude"], POSITION_DECIMALS), round(row["azimuth"], POSITION_DECIMALS))
+        for row in rows
+    ]
+
+
+def diff_positions(
+    previous: Sequence[Position],
+    current: Sequence[Position]
+) -> Tuple[List[Position], List[str], List[Position]]:
+    """
+    Changes from one view to the next
+
+    Returns:
+        (entered, left, moved): positions of objects new to the view, ids
+        of objects no longer in it, and new positions of remaining objects
+        whose rounded position changed; entered and moved keep the current
+        view's order
+    """
+    before: Dict[str, Tuple[float, float]] = {object_id: (alt, az) for object_id, alt, az in previous}
+    entered, moved = [], []
+    for position in current:
+        old = before.pop(position[0], None)
+        if old is None:
+            entered.append(position)
+        elif old != position[1:]:
+            moved.append(position)
+    left = list(before)  # Previous order, minus every object still in view
+    return entered, left, moved
@@ -0,0 +1,174 @@
+"""In-memory spatial index over RA/Dec for positional queries"""
+import math
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+# Grid cell edge on the unit cube, expressed as an angle on the sky
+CELL_SIZE_DEG = 2.0
+# Above this many grid cells a vectorized scan of every object is cheaper
+MAX_QUERY_CELLS = 4096
+
+
+def radec_to_xyz(ra, dec) -> np.ndarray:
+    """Convert RA/Dec in degrees (scalars or arrays) to unit vectors"""
+    ra_rad = np.radians(np.asarray(ra, dtype=np.float64))
+    dec_rad = np.radians(np.asarray(dec, dtype=np.float64))
+    cos_dec = np.cos(dec_rad)
+    return np.stack(
+        [cos_dec * np.cos(ra_rad), cos_dec * np.sin(ra_rad), np.sin(dec_rad)],
+        axis=-1
+    )
+
+
+def chord_to_degrees(chord) -> np.ndarray:
+    """Angular separation for a chord length between unit vectors"""
+    return np.degrees(2.0 * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0)))
+
+
+def degrees_to_chord(angle: float) -> float:
+    """Chord length between unit vectors separated by angle degrees"""
+    return 2.0 * math.sin(math.radians(min(angle, 180.0)) / 2.0)
+
+
+def gnomonic_projection(xyz: np.ndarray, ra: float, dec: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Project unit vectors onto the tangent plane at (ra, dec)
+
+    Returns:
+        (xi, eta, cos_c): standard coordinates toward east and north, and the
+        cosine of the angular distance from the tangent point (<= 0 means the
+        point lies on the far hemisphere and has no projection)
+    """
+    ra_rad, dec_rad = math.radians(ra), math.radians(dec)
+    center = np.array([
+        math.cos(dec_rad) * math.cos(ra_rad),
+        math.cos(dec_rad) * math.sin(ra_rad),
+        math.sin(dec_rad)
+    ])
+    east = np.array([-math.sin(ra_rad), math.cos(ra_rad), 0.0])
+    north = np.array([
+        -math.sin(dec_rad) * math.cos(ra_rad),
+        -math.sin(dec_rad) * math.sin(ra_rad),
+        math.cos(dec_rad)
+    ])
+
+    cos_c = xyz @ center
+    safe = np.where(cos_c > 0, cos_c, 1.0)
+    return (xyz @ east) / safe, (xyz @ north) / safe, cos_c
+
+
+def tangent_to_radec(xi: float, eta: float, ra: float, dec: float) -> Tuple[float, float]:
+    """Inverse of gnomonic_projection for a single tangent-plane point"""
+    ra_rad, dec_rad = math.radians(ra), math.radians(dec)
+    x = math.cos(dec_rad) * math.cos(ra_rad) - xi * math.sin(ra_rad) - eta * math.sin(dec_rad) * math.cos(ra_rad)
+    y = math.cos(dec_rad) * math.sin(ra_rad) + xi * math.cos(ra_rad) - eta * math.sin(dec_rad) * math.sin(ra_rad)
+    z = math.sin(dec_rad) + eta * math.cos(dec_rad)
+    return (
+        math.degrees(math.atan2(y, x)) % 360.0,
+        math.degrees(math.atan2(z, math.hypot(x, y)))
+    )
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the 3D unit vectors of catalog positions
+
+    Working on unit vectors instead of (ra, dec) avoids the RA wrap at
+    0°/360° and the convergence of meridians at the poles: a cone on the sky
+    is a ball around its center vector, so candidates come from the grid
+    cells overlapping the ball's bounding cube and are then tested exactly.
+    """
+
+    def __init__(self, cell_size_deg: float = CELL_SIZE_DEG):
+        self._cell = degrees_to_chord(cell_size_deg)
+        self._grid = int(math.ceil(2.0 / self._cell)) + 1
+        self.xyz = np.empty((0, 3))
+        self._order = np.empty(0, dtype=np.int64)
+        # Occupied cells: sorted keys and their [start, end) span in _order
+        self._keys = np.empty(0, dtype=np.int64)
+        self._starts = np.empty(0, dtype=np.int64)
+        self._ends = np.empty(0, dtype=np.int64)
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.xyz)
+
+    def build(self, ra: Sequence[float], dec: Sequence[float]) -> None:
+        """Index positions; query results are indices into these sequences"""
+        self.build_xyz(radec_to_xyz(ra, dec).reshape(-1, 3))
+
+    def build_xyz(self, xyz: np.ndarray) -> None:
+        """Index precomputed unit vectors (may be a read-only memory map)"""
+        self.xyz = xyz
+
+        keys = self._cell_keys(self.xyz)
+        self._order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._order]
+        self._keys, self._starts = np.unique(sorted_keys, return_index=True)
+        self._ends = np.append(self._starts[1:], len(sorted_keys))
+        self.loaded = True
+
+    def export_arrays(self) -> Dict[str, np.ndarray]:
+        """Everything a built index consists of, e.g. to publish in shared memory"""
+        return {
+            "xyz": self.xyz, "order": self._order,
+            "cell_keys": self._keys, "cell_starts": self._starts, "cell_ends": self._ends
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Adopt arrays from export_arrays() without rebuilding (views are not copied)"""
+        self.xyz = arrays["xyz"]
+        self._order = arrays["order"]
+        self._keys = arrays["cell_keys"]
+        self._starts = arrays["cell_starts"]
+        self._ends = arrays["cell_ends"]
+        self.loaded = True
+
+    def query_cone(self, ra: float, dec: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find every indexed position within radius degrees of (ra, dec)
+
+        Returns:
+            (indices, separations in degrees), sorted by separation
+        """
+        if not len(self.xyz):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        center = radec_to_xyz(ra, dec)
+        chord = degrees_to_chord(radius)
+        candidates = self._candidates(center, chord)
+
+        distances = np.linalg.norm(self.xyz[candidates] - center, axis=1)
+        inside = distances <= chord
+        indices = candidates[inside]
+        separations = chord_to_degrees(distances[inside])
+
+        order = np.argsort(separations, kind="stable")
+        return indices[order], separations[order]
+
+    def _candidates(self, center: np.ndarray, chord: float) -> np.ndarray:
+        """Indices of objects in grid cells overlapping the query ball"""
+        lo = np.clip(np.floor((center - chord + 1.0) / self._cell), 0, self._grid - 1).astype(int)
+        hi = np.clip(np.floor((center + chord + 1.0) / self._cell), 0, self._grid - 1).astype(int)
+        if np.prod(hi - lo + 1) > MAX_QUERY_CELLS:
+            return np.arange(len(self.xyz))
+
+        cx = np.arange(lo[0], hi[0] + 1)[:, None, None]
+        cy = np.arange(lo[1], hi[1] + 1)[None, :, None]
+        cz = np.arange(lo[2], hi[2] + 1)[None, None, :]
+        keys = ((cx * self._grid + cy) * self._grid + cz).ravel()
+
+        # Occupied cells among the query cells
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        cells = pos[self._keys[pos] == keys]
+        slices = [
+            self._order[start:end]
+            for start, end in zip(self._starts[cells].tolist(), self._ends[cells].tolist())
+        ]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def _cell_keys(self, xyz: np.ndarray) -> np.ndarray:
+        """Flattened grid cell key for each unit vector"""
+        cells = np.clip(np.floor((xyz + 1.0) / self._cell), 0, self._grid - 1).astype(np.int64)
+        return (cells[:, 0] * self._grid + cells[:, 1]) * self._grid + cells[:, 2]
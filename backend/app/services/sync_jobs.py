@@ -0,0 +1,215 @@
+"""Background SIMBAD sync jobs persisted in SQLite"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class SyncJobQueue:
+    """
+    In-process worker for long SIMBAD syncs
+
+    Jobs are stored in the sync_jobs table and processed one at a time in
+    checkpoints of SIMBAD_BATCH_SIZE * SIMBAD_SYNC_CONCURRENCY ids. Each
+    checkpoint is written back before the next starts, so a job interrupted
+    by a restart resumes from its last checkpoint instead of from scratch.
+
+    With several uvicorn workers every worker sees the unfinished jobs at
+    startup; a worker runs a job only after claiming it in the database,
+    and renews the claim at each checkpoint. While the SIMBAD circuit
+    breaker is open the job pauses instead of failing its ids.
+    """
+
+    def __init__(self, astronomy_service):
+        self.astronomy = astronomy_service
+        self.db = astronomy_service.db
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._retries: List[asyncio.TimerHandle] = []
+
+    async def start(self) -> None:
+        """Start the worker and re-enqueue jobs left unfinished by a previous run"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        for job_id in await self.db.get_unfinished_sync_jobs():
+            logger.info(f"Resuming SIMBAD sync job {job_id}")
+            self._queue.put_nowait(job_id)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker; running jobs resume from their checkpoint on next start"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        for handle in self._retries:
+            handle.cancel()
+        self._retries = []
+        self._worker = None
+        self._queue = None
+
+    async def submit(self, object_ids: List[str]) -> dict:
+        """Persist a new job and hand it to the worker"""
+        job_id = uuid.uuid4().hex
+        ids = list(dict.fromkeys(object_ids))
+        await self.db.create_sync_job(job_id, ids, time.time())
+        if self._queue is None:
+            await self.start()
+        self._queue.put_nowait(job_id)
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Job status with throughput (objects/s) and ETA (seconds)"""
+        job = await self.db.get_sync_job(job_id)
+        if job is None:
+            return None
+
+        total = len(job["object_ids"])
+        processed = job["processed"]
+        throughput = None
+        eta = None
+        # Time spent processing, so restarts and SIMBAD outages do not count
+        active = job["active_seconds"]
+        if processed and active > 0:
+            rate = processed / active
+            throughput = round(rate, 2)
+            if job["status"] in (QUEUED, RUNNING):
+                eta = round((total - processed) / rate, 1)
+
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": total,
+            "processed": processed,
+            "synced": job["synced"],
+            "failed": job["failed"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "throughput": throughput,
+            "eta_seconds": eta
+        }
+
+    async def _run(self) -> None:
+        """Worker loop: process queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"SIMBAD sync job {job_id} failed: {e}")
+                await self.db.update_sync_job(
+                    job_id, owner=self.owner, status=FAILED, error=str(e), finished_at=time.time()
+                )
+
+    def _retry_later(self, job_id: str, delay: float) -> None:
+        """Put a job back on the queue after delay seconds"""
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        self._retries = [h for h in self._retries if not h.cancelled() and h.when() > loop.time()]
+        self._retries.append(loop.call_later(delay, queue.put_nowait, job_id))
+
+    async def _process(self, job_id: str) -> None:
+        """Claim one job and run it from its last checkpoint"""
+        lease = settings.SYNC_JOB_LEASE
+        if not await self.db.claim_sync_job(job_id, self.owner, time.time(), lease):
+            job = await self.db.get_sync_job(job_id)
+            if job is not None and job["status"] == RUNNING:
+                # Another worker holds it; take over if its claim lapses
+                self._retry_later(job_id, lease)
+            return
+
+        job = await self.db.get_sync_job(job_id)
+        ids = job["object_ids"]
+        processed = job["processed"]
+        synced = list(job["synced"])
+        failed = list(job["failed"])
+        active = job["active_seconds"]
+
+        checkpoint = max(1, settings.SIMBAD_BATCH_SIZE) * max(1, settings.SIMBAD_SYNC_CONCURRENCY)
+        max_rate = settings.SYNC_JOB_MAX_RATE
+
+        while processed < len(ids):
+            chunk = ids[processed:processed + checkpoint]
+            chunk_synced, chunk_failed, chunk_active = await self._sync_chunk(job_id, chunk)
+            synced.extend(chunk_synced)
+            failed.extend(chunk_failed)
+            processed += len(chunk)
+            active += chunk_active
+
+            # Rate limit: a checkpoint of n ids takes at least n / max_rate seconds
+            if max_rate > 0 and processed < len(ids):
+                delay = len(chunk) / max_rate - chunk_active
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    active += delay
+
+            if not await self.db.update_sync_job(
+                job_id, owner=self.owner, processed=processed, synced=synced, failed=failed,
+                active_seconds=active, heartbeat=time.time()
+            ):
+                logger.warning(f"SIMBAD sync job {job_id} was taken over by another worker")
+                return
+            logger.info(f"SIMBAD sync job {job_id}: {processed}/{len(ids)}")
+
+        await self.db.update_sync_job(
+            job_id, owner=self.owner, status=COMPLETED, finished_at=time.time()
+        )
+
+    async def _sync_chunk(self, job_id: str, chunk: List[str]) -> Tuple[List[str], List[str], float]:
+        """
+        Sync one checkpoint's ids, retrying those SIMBAD could not be asked about
+
+        Ids of batches that failed while the circuit breaker opened are not
+        counted as failed: the job waits for the breaker to let requests
+        through again and retries them.
+
+        Returns:
+            (synced ids, failed ids, seconds spent querying)
+        """
+        breaker = self.astronomy.simbad.breaker
+        found = set()
+        pending = chunk
+        active = 0.0
+        while True:
+            await self._wait_for_simbad(job_id)
+            started = time.monotonic()
+            chunk_synced, pending = await self.astronomy.sync_objects(pending)
+            active += time.monotonic() - started
+            found.update(chunk_synced)
+            if not pending or breaker.state == breaker.CLOSED:
+                break
+            logger.warning(f"SIMBAD sync job {job_id}: SIMBAD unavailable, pausing {len(pending)} ids")
+            # Half-open with another request probing: do not spin until it settles
+            await asyncio.sleep(min(1.0, breaker.reset_timeout))
+
+        return [i for i in chunk if i in found], [i for i in chunk if i not in found], active
+
+    async def _wait_for_simbad(self, job_id: str) -> None:
+        """Sleep while the SIMBAD circuit breaker is open, keeping the job's claim"""
+        breaker = self.astronomy.simbad.breaker
+        while breaker.state == breaker.OPEN:
+            remaining = breaker.reset_timeout - (time.monotonic() - breaker.opened_at)
+            await asyncio.sleep(min(max(remaining, 0.05), settings.SYNC_JOB_LEASE / 2))
+            await self.db.update_sync_job(job_id, owner=self.owner, heartbeat=time.time())
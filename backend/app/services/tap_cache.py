@@ -0,0 +1,137 @@
+"""Content-addressed on-disk cache of raw SIMBAD TAP responses"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_adql(adql: str) -> str:
+    """Collapse whitespace so formatting differences share a cache entry"""
+    return " ".join(adql.split())
+
+
+class TAPResponseCache:
+    """
+    Cache of TAP JSON responses keyed by the SHA-256 of the normalized ADQL
+
+    Entries live in <directory>/<key[:2]>/<key>.json and record when they
+    were fetched, which drives TTL expiry (ttl <= 0 never expires, e.g. to
+    replay recorded responses offline). Empty responses (nothing found) use
+    negative_ttl instead, so an object SIMBAD gains later is not hidden for
+    as long as a real result is kept. A hit touches the file's mtime, so
+    once the directory exceeds max_bytes the least recently used entries are
+    evicted first.
+    """
+
+    def __init__(self, directory: str, ttl: float, max_bytes: int, negative_ttl: Optional[float] = None):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # Bytes on disk, scanned on first write
+
+    @classmethod
+    def from_settings(cls) -> Optional["TAPResponseCache"]:
+        """Cache configured by CACHE_DIR / CACHE_TTL, or None when ENABLE_CACHE is off"""
+        if not settings.ENABLE_CACHE:
+            return None
+        return cls(settings.CACHE_DIR, settings.CACHE_TTL, settings.CACHE_MAX_SIZE_MB * 1024 * 1024,
+                   negative_ttl=settings.NEGATIVE_CACHE_TTL)
+
+    def key(self, adql: str) -> str:
+        return hashlib.sha256(normalize_adql(adql).encode("utf-8")).hexdigest()
+
+    def path(self, adql: str) -> Path:
+        key = self.key(adql)
+        return self.directory / key[:2] / f"{key}.json"
+
+    async def get(self, adql: str) -> Optional[Dict]:
+        """Cached response for adql, or None when missing or expired"""
+        return await asyncio.to_thread(self._read, self.path(adql))
+
+    async def put(self, adql: str, response: Dict) -> None:
+        """Store a response and evict least recently used entries over max_bytes"""
+        entry = {"query": normalize_adql(adql), "fetched_at": time.time(), "response": response}
+        await asyncio.to_thread(self._write, self.path(adql), entry)
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"TAP cache: unreadable entry {path.name}: {e}")
+            return None
+
+        ttl = self.ttl if entry["response"].get("data") else self.negative_ttl
+        if ttl > 0 and time.time() - entry["fetched_at"] > ttl:
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry["response"]
+
+    def _write(self, path: Path, entry: Dict) -> None:
+        data = json.dumps(entry).encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            # Write then rename so readers never see a partial entry
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"TAP cache: failed to write {path.name}: {e}")
+            return
+
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += len(data) - previous
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        return [p for p in self.directory.glob("*/*.json") if p.is_file()]
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self._entries())
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under 90% of max_bytes"""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort(key=lambda e: e[0])
+
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            evicted += 1
+
+        self._size = size
+        logger.info(f"TAP cache: evicted {evicted} entries, {size} bytes remain")
@@ -0,0 +1,99 @@
+"""Alt/az viewports for culling sky map requests
+
+A viewport is a box in horizontal coordinates: an azimuth range (which may
+wrap through north, e.g. 350°..20°) and an altitude range. Boxes that
+reach the zenith cover every azimuth. bounding_cap() gives a spherical cap
+containing the box, which AstronomyService turns into an RA/Dec cone for
+the spatial index, so only objects near the view are positioned at all.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class Viewport:
+    """An alt/az box (degrees), margin already included"""
+
+    __slots__ = ("az_min", "az_span", "alt_min", "alt_max")
+
+    def __init__(self, az_min: float, az_max: float, alt_min: float, alt_max: float, margin: float = 0.0):
+        if alt_min > alt_max:
+            raise ValueError("alt_min must not exceed alt_max")
+        self.alt_min = max(alt_min - margin, -90.0)
+        self.alt_max = min(alt_max + margin, 90.0)
+
+        span = (az_max - az_min) % 360.0
+        if (span == 0.0 and az_max != az_min) or span + 2 * margin >= 360.0 or self.alt_max >= 90.0:
+            # Every azimuth: a full ring, or a box reaching the zenith
+            self.az_min, self.az_span = 0.0, 360.0
+        else:
+            self.az_min, self.az_span = (az_min - margin) % 360.0, span + 2 * margin
+
+    @classmethod
+    def from_request(cls, viewport: dict, margin: float) -> "Viewport":
+        """
+        Parse {azimuth, altitude, width, height} (center and extent) or
+        {az_min, az_max, alt_min, alt_max} (bounding box)
+
+        Raises:
+            ValueError: if neither form is complete or the values are invalid
+        """
+        try:
+            if "azimuth" in viewport:
+                azimuth, altitude = float(viewport["azimuth"]), float(viewport["altitude"])
+                width, height = float(viewport["width"]), float(viewport["height"])
+                if width <= 0 or height <= 0:
+                    raise ValueError("width and height must be positive")
+                if width >= 360.0:
+                    azimuth, width = 180.0, 360.0  # az_min 0, az_max 360: every azimuth
+                return cls(azimuth - width / 2, azimuth + width / 2,
+                           altitude - height / 2, altitude + height / 2, margin)
+            return cls(float(viewport["az_min"]), float(viewport["az_max"]),
+                       float(viewport["alt_min"]), float(viewport["alt_max"]), margin)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Incomplete viewport: {e}")
+
+    @property
+    def full_azimuth(self) -> bool:
+        return self.az_span >= 360.0
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(az_min, az_max, alt_min, alt_max), which rebuild this box without a margin"""
+        return self.az_min, self.az_min + self.az_span, self.alt_min, self.alt_max
+
+    @property
+    def extent(self) -> float:
+        """Larger side of the box (degrees of azimuth or altitude)"""
+        return max(min(self.az_span, 360.0), self.alt_max - self.alt_min)
+
+    def contains_many(self, az: np.ndarray, alt: np.ndarray) -> np.ndarray:
+        """Whether each (azimuth, altitude) lies in the box"""
+        inside = (alt >= self.alt_min) & (alt <= self.alt_max)
+        if not self.full_azimuth:
+            inside &= (az - self.az_min) % 360.0 <= self.az_span
+        return inside
+
+    def bounding_cap(self) -> Optional[Tuple[float, float, float]]:
+        """
+        (altitude, azimuth, radius) of a cap containing the box, or None
+        when it would cover (nearly) the whole sky
+
+        Any point of the box is within half its altitude range of the center
+        row, then within half its azimuth span along its own altitude circle,
+        so their sum bounds the distance from the center.
+        """
+        if self.full_azimuth:
+            # A polar cap around the zenith down to alt_min
+            radius = 90.0 - self.alt_min
+            return (90.0, 0.0, radius) if radius < 180.0 else None
+        center_alt = (self.alt_min + self.alt_max) / 2
+        center_az = (self.az_min + self.az_span / 2) % 360.0
+        # Altitude circles are longest nearest the horizon
+        if self.alt_min <= 0.0 <= self.alt_max:
+            widest = 0.0
+        else:
+            widest = min(abs(self.alt_min), abs(self.alt_max))
+        radius = (self.alt_max - self.alt_min) / 2 + self.az_span / 2 * math.cos(math.radians(widest))
+        return (center_alt, center_az, radius) if radius < 180.0 else None
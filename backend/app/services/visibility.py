@@ -1,15 +1,16 @@
 """Visibility calculation service"""
-from typing import List
+from typing import List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timedelta
 from app.services.astronomy import AstronomyService
+from app.services.zones import CompiledZone, compile_zones
 from app.models.target import VisibleZone
 
 
 class VisibilityService:
     """可见性计算服务"""
 
-    def __init__(self):
-        self.astronomy = AstronomyService()
+    def __init__(self, astronomy: Optional[AstronomyService] = None):
+        self.astronomy = astronomy or AstronomyService()
 
     def calculate_visibility_windows(
         self,
@@ -18,7 +19,7 @@ class VisibilityService:
         observer_lat: float,
         observer_lon: float,
         date: datetime,
-        visible_zones: List[VisibleZone],
+        visible_zones: Sequence[Union[VisibleZone, CompiledZone]],
         min_altitude: float = 15.0
     ) -> List[dict]:
         """
@@ -30,7 +31,7 @@ class VisibilityService:
             observer_lat: 观测者纬度
             observer_lon: 观测者经度
             date: 观测日期
-            visible_zones: 可视区域列表
+            visible_zones: 可视区域列表 (已编译的区域可直接复用)
             min_altitude: 最小高度角
 
         Returns:
@@ -41,13 +42,18 @@ class VisibilityService:
         # 生成时间样本 (每5分钟)
         samples = self._generate_time_samples(date, interval_minutes=5)
 
-        for zone in visible_zones:
-            zone_windows = self._calculate_windows_for_zone(
+        # 每个样本的位置只算一次，所有区域共用
+        positions = [
+            (time, *self.astronomy.calculate_position(
                 target_ra, target_dec,
                 observer_lat, observer_lon,
-                samples, zone,
-                min_altitude
-            )
+                time
+            ))
+            for time in samples
+        ]
+
+        for zone in compile_zones(visible_zones):
+            zone_windows = self._calculate_windows_for_zone(positions, zone, min_altitude)
             windows.extend(zone_windows)
 
         return windows
@@ -72,12 +78,8 @@ class VisibilityService:
 
     def _calculate_windows_for_zone(
         self,
-        target_ra: float,
-        target_dec: float,
-        observer_lat: float,
-        observer_lon: float,
-        time_samples: List[datetime],
-        zone: VisibleZone,
+        positions: List[Tuple[datetime, float, float]],
+        zone: CompiledZone,
         min_altitude: float
     ) -> List[dict]:
         """计算单个区域的可见窗口"""
@@ -87,21 +89,9 @@ class VisibilityService:
         max_altitude = 0
         max_altitude_time = None
 
-        for time in time_samples:
-            # 计算当前位置
-            alt, az = self.astronomy.calculate_position(
-                target_ra, target_dec,
-                observer_lat, observer_lon,
-                time
-            )
-
-            # 判断是否在区域内且高度足够
-            is_in_zone = self._point_in_polygon(
-                (az, alt), zone.polygon
-            )
-            meets_altitude = alt >= min_altitude
-
-            if is_in_zone and meets_altitude:
+        for time, alt, az in positions:
+            # 判断高度是否足够且在区域内
+            if alt >= min_altitude and zone.contains(az, alt):
                 if not in_window:
                     window_start = time
                     in_window = True
@@ -127,25 +117,3 @@ class VisibilityService:
                     max_altitude = 0
 
         return windows
-
-    def _point_in_polygon(
-        self,
-        point: tuple,
-        polygon: List[tuple]
-    ) -> bool:
-        """射线法判断点是否在多边形内"""
-        x, y = point
-        inside = False
-
-        for i in range(len(polygon)):
-            j = (i - 1) % len(polygon)
-            xi, yi = polygon[i]
-            xj, yj = polygon[j]
-
-            intersect = ((yi > y) != (yj > y)) and \
-                        (x < (xj - xi) * (y - yi) / (yj - yi + 0.0001) + xi)
-
-            if intersect:
-                inside = not inside
-
-        return inside
@@ -0,0 +1,241 @@
+"""Visible zones compiled for fast point-in-polygon tests
+
+A zone polygon is given as [azimuth, altitude] vertices. Compiling it once
+precomputes its edges (as tuples for single points and numpy arrays for
+batches), its bounding box and, for polygons with many edges, a coarse
+raster over the bounding box. Raster cells are inside, outside or
+boundary (touched by an edge's bounding box); only points in boundary
+cells fall back to the ray cast, so the raster never changes an answer.
+
+Saved zones are compiled once per (id, version) by ZoneService, which
+also saves them, so its compiled cache follows every change.
+"""
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.models.target import VisibleZone
+
+RASTER_MIN_EDGES = 8  # Fewer edges are cheaper to ray cast than to rasterize
+RASTER_RESOLUTION = 1.0  # Degrees per raster cell
+
+# Raster cell states
+OUTSIDE = 0
+INSIDE = 1
+BOUNDARY = 2
+
+
+class CompiledZone:
+    """A visible zone with precomputed edges, bounding box and optional raster"""
+
+    __slots__ = ("id", "name", "priority", "version", "polygon", "edges",
+                 "xi", "yi", "xj", "yj", "bbox", "raster")
+
+    def __init__(self, id: str, name: str, polygon: Sequence[Sequence[float]],
+                 priority: int = 1, version: int = 0):
+        self.id = id
+        self.name = name
+        self.priority = priority
+        self.version = version
+        self.polygon = [(float(x), float(y)) for x, y in polygon]
+
+        # Edge i runs from vertex i - 1 to vertex i, as in a ray cast loop
+        previous = self.polygon[-1:] + self.polygon[:-1]
+        self.edges: List[Tuple[float, float, float, float]] = [
+            (xi, yi, xj, yj) for (xi, yi), (xj, yj) in zip(self.polygon, previous)
+        ]
+        edges = np.array(self.edges, dtype=np.float64).reshape(-1, 4)
+        self.xi, self.yi, self.xj, self.yj = edges.T
+
+        xs = [x for x, _ in self.polygon]
+        ys = [y for _, y in self.polygon]
+        self.bbox = (min(xs), max(xs), min(ys), max(ys))  # az_min, az_max, alt_min, alt_max
+        self.raster: Optional[np.ndarray] = (
+            self._rasterize() if len(self.edges) >= RASTER_MIN_EDGES else None
+        )
+
+    @classmethod
+    def from_model(cls, zone: VisibleZone, version: int = 0) -> "CompiledZone":
+        return cls(zone.id, zone.name, zone.polygon, zone.priority, version)
+
+    def __repr__(self) -> str:
+        return f"CompiledZone(id={self.id!r}, version={self.version})"
+
+    @property
+    def azimuth_range(self) -> Tuple[float, float]:
+        return self.bbox[0], self.bbox[1]
+
+    @property
+    def altitude_range(self) -> Tuple[float, float]:
+        return self.bbox[2], self.bbox[3]
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """(row, column) of the raster cell containing a point in the bounding box"""
+        return (int((y - self.bbox[2]) // RASTER_RESOLUTION),
+                int((x - self.bbox[0]) // RASTER_RESOLUTION))
+
+    def _rasterize(self) -> np.ndarray:
+        x_min, x_max, y_min, y_max = self.bbox
+        columns = int((x_max - x_min) // RASTER_RESOLUTION) + 1
+        rows = int((y_max - y_min) // RASTER_RESOLUTION) + 1
+        raster = np.full((rows, columns), OUTSIDE, dtype=np.uint8)
+
+        boundary = np.zeros((rows, columns), dtype=bool)
+        for xi, yi, xj, yj in self.edges:
+            r0, c0 = self._cell(min(xi, xj), min(yi, yj))
+            r1, c1 = self._cell(max(xi, xj), max(yi, yj))
+            boundary[r0:r1 + 1, c0:c1 + 1] = True
+
+        # No edge crosses a non-boundary cell, so its center decides it
+        r, c = np.nonzero(~boundary)
+        centers_x = x_min + (c + 0.5) * RASTER_RESOLUTION
+        centers_y = y_min + (r + 0.5) * RASTER_RESOLUTION
+        raster[r, c] = np.where(self._ray_cast_many(centers_x, centers_y), INSIDE, OUTSIDE)
+        raster[boundary] = BOUNDARY
+        return raster
+
+    def contains(self, x: float, y: float) -> bool:
+        """Whether (azimuth, altitude) lies inside the zone"""
+        x_min, x_max, y_min, y_max = self.bbox
+        if x < x_min or x > x_max or y < y_min or y > y_max:
+            return False
+        if self.raster is not None:
+            state = self.raster[self._cell(x, y)]
+            if state != BOUNDARY:
+                return state == INSIDE
+
+        inside = False
+        for xi, yi, xj, yj in self.edges:
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+        return inside
+
+    def contains_many(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Vectorized contains() over arrays of azimuths and altitudes"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        x_min, x_max, y_min, y_max = self.bbox
+        result = np.zeros(x.shape, dtype=bool)
+        candidates = np.flatnonzero((x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max))
+        if self.raster is not None and len(candidates):
+            rows = ((y[candidates] - y_min) // RASTER_RESOLUTION).astype(np.intp)
+            columns = ((x[candidates] - x_min) // RASTER_RESOLUTION).astype(np.intp)
+            states = self.raster[rows, columns]
+            result[candidates[states == INSIDE]] = True
+            candidates = candidates[states == BOUNDARY]
+        if len(candidates):
+            result[candidates] = self._ray_cast_many(x[candidates], y[candidates])
+        return result
+
+    def _ray_cast_many(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Even-odd ray cast of points (N,) against all edges at once"""
+        x = x[:, None]
+        y = y[:, None]
+        spans = (self.yi > y) != (self.yj > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = (self.xj - self.xi) * (y - self.yi) / (self.yj - self.yi) + self.xi
+        return (np.count_nonzero(spans & (x < crossing), axis=1) % 2).astype(bool)
+
+
+def compile_zones(zones: Sequence) -> List[CompiledZone]:
+    """Compile VisibleZone models, passing already compiled zones through"""
+    return [zone if isinstance(zone, CompiledZone) else CompiledZone.from_model(zone) for zone in zones]
+
+
+class ZoneService:
+    """Saved visible zones, each compiled once per version"""
+
+    def __init__(self, db):
+        self.db = db
+        self._compiled: Dict[str, CompiledZone] = {}
+
+    async def list_zones(self) -> List[CompiledZone]:
+        """All saved zones, compiled"""
+        rows = await self.db.list_visible_zones()
+        zones = [self._compile(row) for row in rows]
+        # Forget zones deleted since the last call
+        live = {zone.id for zone in zones}
+        for zone_id in [z for z in self._compiled if z not in live]:
+            del self._compiled[zone_id]
+        return zones
+
+    async def get_zones(self, zone_ids: Sequence[str]) -> List[CompiledZone]:
+        """
+        Compiled zones in the requested order
+
+        Raises:
+            KeyError: with the first id that is not a saved zone
+        """
+        zones = {zone.id: zone for zone in await self.list_zones()}
+        for zone_id in zone_ids:
+            if zone_id not in zones:
+                raise KeyError(zone_id)
+        return [zones[zone_id] for zone_id in zone_ids]
+
+    async def resolve_zones(self, visible_zones: List[dict],
+                            zone_ids: Optional[List[str]] = None) -> List[CompiledZone]:
+        """
+        Compiled zones for a compute request: inline polygons, then saved zones
+
+        Raises:
+            ValueError: for an invalid inline zone (e.g. fewer than three vertices)
+            KeyError: with the first id that is not a saved zone
+        """
+        try:
+            zones = [
+                CompiledZone.from_model(VisibleZone(
+                    id=zone.get("id", f"zone_{i}"),
+                    name=zone.get("name", f"Zone {i}"),
+                    polygon=zone["polygon"],
+                    priority=zone.get("priority", 1)
+                ))
+                for i, zone in enumerate(visible_zones)
+            ]
+        except (KeyError, ValidationError) as e:
+            raise ValueError(str(e))
+        if zone_ids:
+            zones.extend(await self.get_zones(zone_ids))
+        return zones
+
+    async def create_zone(self, name: str, polygon: List, priority: int) -> CompiledZone:
+        """Save a new zone"""
+        zone_id = f"zone_{uuid.uuid4().hex[:8]}"
+        await self.db.save_visible_zone(zone_id, name, polygon, priority)
+        return self._compile({"id": zone_id, "name": name, "polygon": polygon,
+                              "priority": priority, "version": 1})
+
+    async def update_zone(self, zone_id: str, name: str, polygon: List,
+                          priority: int) -> Optional[CompiledZone]:
+        """Replace a saved zone (bumping its version), or None if it does not exist"""
+        version = await self.db.update_visible_zone(zone_id, name, polygon, priority)
+        if version is None:
+            return None
+        return self._compile({"id": zone_id, "name": name, "polygon": polygon,
+                              "priority": priority, "version": version})
+
+    async def delete_zone(self, zone_id: str) -> bool:
+        """Delete a saved zone; False if it does not exist"""
+        self._compiled.pop(zone_id, None)
+        return await self.db.delete_visible_zone(zone_id)
+
+    def _compile(self, row: dict) -> CompiledZone:
+        compiled = self._compiled.get(row["id"])
+        if compiled is None or compiled.version != row["version"]:
+            compiled = CompiledZone(row["id"], row["name"], row["polygon"], row["priority"], row["version"])
+            self._compiled[row["id"]] = compiled
+        return compiled
+
+
+def zone_payload(zone: CompiledZone) -> dict:
+    """API representation of a zone (VisibleZoneResponse fields plus version)"""
+    return {
+        "id": zone.id,
+        "name": zone.name,
+        "polygon": [list(vertex) for vertex in zone.polygon],
+        "priority": zone.priority,
+        "version": zone.version,
+        "azimuth_range": list(zone.azimuth_range),
+        "altitude_range": list(zone.altitude_range)
+    }
@@ -1,6 +1,9 @@
 """Test configuration"""
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
+from app.api import deps
 from app.main import app
 
 
@@ -10,6 +13,23 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture
+def user_db(tmp_path, monkeypatch):
+    """Point the API's saved locations, equipment and zones at a temporary user.db"""
+    service = deps.db_service
+    monkeypatch.setattr(service, "user_db_path", str(tmp_path / "user.db"))
+    monkeypatch.setattr(service, "_user_conn", None)
+    for flag in ("_locations_ready", "_equipment_ready", "_visible_zones_ready"):
+        monkeypatch.setattr(service, flag, False)
+    monkeypatch.setattr(service, "_table_cache", {})
+    monkeypatch.setattr(deps.zone_service, "_compiled", {})
+    yield service
+
+    if service._user_conn is not None:
+        asyncio.run(service._user_conn.close())
+        service._user_conn = None
+
+
 @pytest.fixture
 def sample_location():
     """Sample location fixture"""
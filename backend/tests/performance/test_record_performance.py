@@ -0,0 +1,113 @@
+"""Performance tests for service-layer object records vs pydantic models"""
+import sqlite3
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from app.models.database import DeepSkyObject, ObservationalInfo
+from app.models.records import ObjectRecord, ObservationalRecord
+from app.services import database
+from app.services.database import DatabaseService
+from app.services.model_adapter import ModelAdapter
+
+ROWS = 5000
+SCHEMA_PATH = Path(__file__).parent.parent.parent / "app" / "data" / "schema.sql"
+
+
+def _rows():
+    return [
+        dict(id=f"NGC{i}", name=f"NGC {i}", type="GALAXY", ra=float(i % 360), dec=10.0,
+             magnitude=10.5, size_major=3.2, size_minor=1.1, constellation="And",
+             surface_brightness=13.0)
+        for i in range(ROWS)
+    ]
+
+
+def _hydrate(rows, object_cls, info_cls):
+    return [
+        object_cls(**row, aliases=[row["id"], "UGC 1", "Some Galaxy"],
+                   observational_info=info_cls(best_month=3, difficulty="EASY",
+                                               min_aperture=100.0, notes="GALAXY"))
+        for row in rows
+    ]
+
+
+def _measure(object_cls, info_cls):
+    rows = _rows()
+    tracemalloc.start()
+    objs = _hydrate(rows, object_cls, info_cls)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, objs
+
+
+def test_record_hydration_smaller():
+    """Test slotted records use less than half the memory of pydantic models"""
+    model_memory, models = _measure(DeepSkyObject, ObservationalInfo)
+    record_memory, records = _measure(ObjectRecord, ObservationalRecord)
+
+    print(f"pydantic: {model_memory / ROWS:.0f}B per object")
+    print(f"slotted:  {record_memory / ROWS:.0f}B per object")
+
+    assert record_memory < model_memory / 2
+
+    # Both convert to the same API payload
+    adapter = ModelAdapter()
+    assert adapter.to_target(records[0]) == adapter.to_target(models[0])
+    assert records[0].model_dump() == models[0].model_dump()
+
+
+async def _load_by_type(service):
+    start = time.perf_counter()
+    await service.get_objects_by_type("GALAXY")
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    objs = await service.get_objects_by_type("GALAXY")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, memory, objs
+
+
+@pytest.mark.asyncio
+async def test_objects_by_type_records_vs_models(tmp_path, monkeypatch):
+    """Test get_objects_by_type with records against the same query building pydantic models"""
+    db_path = tmp_path / "objects.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(SCHEMA_PATH.read_text())
+        for obj in _hydrate(_rows(), dict, dict):
+            info = obj.pop("observational_info")
+            aliases = obj.pop("aliases")
+            conn.execute(
+                f"INSERT INTO objects ({', '.join(obj)}) VALUES ({', '.join('?' * len(obj))})",
+                tuple(obj.values())
+            )
+            conn.executemany("INSERT INTO aliases (object_id, alias) VALUES (?, ?)",
+                             [(obj["id"], alias) for alias in aliases])
+            conn.execute(
+                "INSERT INTO observational_info (object_id, best_month, difficulty, min_aperture, notes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (obj["id"], info["best_month"], info["difficulty"], info["min_aperture"], info["notes"])
+            )
+    conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        await service.connect()
+        record_time, record_memory, records = await _load_by_type(service)
+
+        # The same path as it was before records: validated pydantic models per row
+        monkeypatch.setattr(database, "ObjectRecord", DeepSkyObject)
+        monkeypatch.setattr(database, "ObservationalRecord", ObservationalInfo)
+        model_time, model_memory, models = await _load_by_type(service)
+    finally:
+        await service.close()
+
+    print(f"pydantic: {model_time * 1e3:.1f}ms, {model_memory / ROWS:.0f}B per object")
+    print(f"slotted:  {record_time * 1e3:.1f}ms, {record_memory / ROWS:.0f}B per object")
+
+    assert len(records) == len(models) == ROWS
+    assert record_memory < model_memory
+    assert records[0].model_dump() == models[0].model_dump()
@@ -0,0 +1,72 @@
+"""Performance tests for SIMBAD TAP queries against a local stub server"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.simbad import SIMBADService
+
+QUERIES = 50
+
+STUB_RESPONSE = json.dumps({
+    "data": [{
+        "oid": "M31", "main_id": "M  31", "ra": 10.684708, "dec": 41.268750,
+        "galdim_majaxis": 190.0, "galdim_minaxis": 60.0, "V": 3.4, "all_types": "G"
+    }]
+}).encode()
+
+
+class StubTAPHandler(BaseHTTPRequestHandler):
+    """Minimal TAP /sync endpoint supporting HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_tap_url():
+    """Run a stub TAP server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTAPHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_vs_client_per_query(stub_tap_url):
+    """Test the pooled client is no slower than opening a client per query"""
+    params = {"request": "doQuery", "lang": "adql", "query": "SELECT 1", "format": "json"}
+
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.post(f"{stub_tap_url}/sync", data=params)
+            resp.raise_for_status()
+    per_query_elapsed = time.perf_counter() - start
+
+    service = SIMBADService(base_url=stub_tap_url, timeout=10.0)
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        assert await service.query_object("M31") is not None
+    pooled_elapsed = time.perf_counter() - start
+    await service.close()
+
+    print(f"\nClient per query: {per_query_elapsed / QUERIES * 1000:.2f}ms/query")
+    print(f"Pooled client:    {pooled_elapsed / QUERIES * 1000:.2f}ms/query")
+    assert pooled_elapsed < per_query_elapsed
@@ -1,6 +1,10 @@
 """Test equipment API"""
+import pytest
 from fastapi.testclient import TestClient
 
+# Saved rows go to a temporary user.db, never the real one
+pytestmark = pytest.mark.usefixtures("user_db")
+
 
 def test_get_presets(client: TestClient):
     """Test getting equipment presets"""
@@ -50,3 +54,20 @@ def test_create_equipment(client: TestClient):
     assert data["success"] is True
     assert "id" in data["data"]
     assert data["data"]["name"] == "我的设备"
+
+
+def test_list_equipment(client: TestClient):
+    """Test saved equipment is listed"""
+    equipment_data = {
+        "name": "APS-C+50mm",
+        "sensor_size": "aps-c",
+        "sensor_width": 23.6,
+        "sensor_height": 15.6,
+        "focal_length": 50
+    }
+    equipment_id = client.post("/api/v1/equipment", json=equipment_data).json()["data"]["id"]
+
+    response = client.get("/api/v1/equipment")
+    assert response.status_code == 200
+    saved = {eq["id"]: eq for eq in response.json()["data"]}
+    assert saved[equipment_id]["focal_length"] == 50
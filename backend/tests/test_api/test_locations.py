@@ -1,6 +1,10 @@
 """Test locations API"""
+import pytest
 from fastapi.testclient import TestClient
 
+# Saved rows go to a temporary user.db, never the real one
+pytestmark = pytest.mark.usefixtures("user_db")
+
 
 def test_geolocate(client: TestClient):
     """Test automatic geolocation"""
@@ -42,6 +46,24 @@ def test_create_location(client: TestClient):
     assert "id" in data["data"]
 
 
+def test_delete_location(client: TestClient):
+    """Test a saved location is listed until it is deleted"""
+    location_data = {
+        "name": "待删除",
+        "latitude": 30.0,
+        "longitude": 120.0,
+        "timezone": "Asia/Shanghai"
+    }
+    location_id = client.post("/api/v1/locations", json=location_data).json()["data"]["id"]
+    ids = [loc["id"] for loc in client.get("/api/v1/locations").json()["data"]]
+    assert location_id in ids
+
+    assert client.delete(f"/api/v1/locations/{location_id}").status_code == 200
+    ids = [loc["id"] for loc in client.get("/api/v1/locations").json()["data"]]
+    assert location_id not in ids
+    assert client.delete(f"/api/v1/locations/{location_id}").status_code == 404
+
+
 def test_validate_location(client: TestClient):
     """Test location validation"""
     location_data = {
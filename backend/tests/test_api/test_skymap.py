@@ -2,6 +2,9 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from fastapi import HTTPException
+from app.api.skymap import _level_of_detail, _target_metadata
+from app.config import settings
 
 client = TestClient(app)
 
@@ -107,3 +110,121 @@ async def test_skymap_timeline_multiple_targets():
     # At least some time points should have targets visible
     visible_entries = [t for t in timeline if len(t["targets"]) > 0]
     assert len(visible_entries) > 0
+
+
+def test_level_of_detail_follows_zoom():
+    """Test the magnitude limit loosens one magnitude per zoom doubling"""
+    base = settings.SKYMAP_BASE_MAGNITUDE
+    assert _level_of_detail({}) == (180.0, base, settings.SKYMAP_MAX_TARGETS)
+    assert _level_of_detail({"zoom": 4})[:2] == (45.0, base + 2)
+    assert _level_of_detail({"fov": 22.5})[1] == base + 3
+    assert _level_of_detail({"fov": 10, "magnitude_limit": 6})[1] == 6.0
+    assert _level_of_detail({"max_targets": 10 ** 6})[2] == settings.SKYMAP_MAX_TARGETS
+
+
+def test_level_of_detail_rejects_non_numeric_values():
+    """Test malformed zoom, fov and magnitude_limit are client errors, not server errors"""
+    for field, value in [("zoom", "far"), ("fov", [10]), ("magnitude_limit", "nan")]:
+        with pytest.raises(HTTPException) as error:
+            _level_of_detail({field: value})
+        assert error.value.status_code == 400
+
+    response = client.post(
+        "/api/v1/sky-map/data",
+        json={"timestamp": "2025-01-28T22:00:00", "include_targets": True, "zoom": "far"}
+    )
+    assert response.status_code == 400
+
+
+def test_skymap_truncated_only_when_capped():
+    """Test a view that exactly fits max_targets is not reported as truncated"""
+    request = {
+        "location": {"latitude": 39.9, "longitude": 116.4},
+        "timestamp": "2025-01-28T22:00:00",
+        "include_targets": True,
+        "magnitude_limit": 9,
+        "viewport": {"azimuth": 90, "altitude": 30, "width": 60, "height": 40}
+    }
+    data = client.post("/api/v1/sky-map/data", json=request).json()["data"]
+    count = len(data["targets"])
+    assert 1 < count < settings.SKYMAP_MAX_TARGETS and not data["lod"]["truncated"]
+
+    exact = client.post("/api/v1/sky-map/data", json={**request, "max_targets": count}).json()["data"]
+    assert len(exact["targets"]) == count and not exact["lod"]["truncated"]
+    capped = client.post("/api/v1/sky-map/data", json={**request, "max_targets": count - 1}).json()["data"]
+    assert len(capped["targets"]) == count - 1 and capped["lod"]["truncated"]
+
+
+def test_unknown_magnitude_shown_as_ranked():
+    """Test objects without a magnitude display the magnitude they were ranked with"""
+    metadata = _target_metadata({"name": "IC 999", "type": "GALAXY", "magnitude": None})
+    assert metadata["magnitude"] == settings.SKYMAP_UNKNOWN_MAGNITUDE
+
+
+def test_skymap_rejects_incomplete_viewport():
+    """Test a viewport without its extent is a client error"""
+    response = client.post(
+        "/api/v1/sky-map/data",
+        json={
+            "location": {"latitude": 39.9, "longitude": 116.4},
+            "timestamp": "2025-01-28T22:00:00",
+            "include_targets": True,
+            "viewport": {"azimuth": 180, "altitude": 30}
+        }
+    )
+    assert response.status_code == 400
+
+
+def test_skymap_delta_between_timestamps():
+    """Test a delta applied to the previous view reproduces the full response"""
+    request = {
+        "location": {"latitude": 39.9, "longitude": 116.4},
+        "timestamp": "2025-01-28T22:00:00",
+        "include_targets": True,
+        "viewport": {"azimuth": 90, "altitude": 30, "width": 60, "height": 40}
+    }
+    first = client.post("/api/v1/sky-map/data", json={**request, "delta": True}).json()["data"]
+    assert first["delta"]["full"] is True
+    assert set(first["metadata"]) == {p[0] for p in first["delta"]["entered"]}
+    shown = {p[0]: tuple(p[1:]) for p in first["delta"]["entered"]}
+
+    later = {**request, "timestamp": "2025-01-28T23:00:00"}
+    delta = client.post(
+        "/api/v1/sky-map/data",
+        json={**later, "since": first["snapshot"], "catalog_version": first["catalog_version"]}
+    ).json()["data"]
+    assert delta["delta"]["full"] is False
+    assert "metadata" not in delta
+    assert delta["delta"]["left"] and delta["delta"]["entered"]
+    for object_id in delta["delta"]["left"]:
+        del shown[object_id]
+    for p in delta["delta"]["entered"] + delta["delta"]["moved"]:
+        shown[p[0]] = tuple(p[1:])
+
+    full = client.post("/api/v1/sky-map/data", json=later).json()["data"]
+    assert shown == {t["id"]: (t["altitude"], t["azimuth"]) for t in full["targets"]}
+
+
+def test_skymap_stale_or_invalid_snapshot():
+    """Test tokens from another catalog version start over, garbage is a client error"""
+    request = {"timestamp": "2025-01-28T22:00:00", "include_targets": True, "max_targets": 5}
+    response = client.post("/api/v1/sky-map/data", json={**request, "since": "garbage"})
+    assert response.status_code == 400
+
+    from app.services.sky_delta import decode_snapshot, encode_snapshot
+    snapshot = client.post("/api/v1/sky-map/data", json=request).json()["data"]["snapshot"]
+    stale = encode_snapshot({**decode_snapshot(snapshot), "version": "stale"})
+    data = client.post("/api/v1/sky-map/data", json={**request, "since": stale}).json()["data"]
+    assert data["delta"]["full"] is True and len(data["delta"]["entered"]) == 5
+
+    # Decodes, but names a view that cannot be computed
+    broken = encode_snapshot({**decode_snapshot(snapshot), "timestamp": "yesterday"})
+    assert client.post("/api/v1/sky-map/data", json={**request, "since": broken}).status_code == 400
+
+
+def test_skymap_catalog_is_versioned():
+    """Test the catalog endpoint sends metadata once per version"""
+    data = client.get("/api/v1/sky-map/catalog").json()["data"]
+    assert data["objects"]["NGC0224"]["type"] == "galaxy"
+    cached = client.get("/api/v1/sky-map/catalog", params={"version": data["version"]}).json()["data"]
+    assert cached["not_modified"] is True and cached["objects"] is None
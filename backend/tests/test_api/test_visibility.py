@@ -78,3 +78,42 @@ async def test_calculate_visibility_windows():
     data = response.json()
     assert data["success"] is True
     assert "windows" in data["data"]
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("user_db")
+async def test_calculate_visibility_windows_with_saved_zone():
+    """Test visibility windows for a saved zone referenced by id"""
+    zone = client.post(
+        "/api/v1/visible-zones",
+        # M31 (dec 41.3°) never reaches azimuth 90-270° from 39.9°N; on January evenings it is in the northwest
+        json={"name": "Northwest", "polygon": [[270, 15], [360, 15], [360, 90], [270, 90]]}
+    ).json()["data"]
+
+    response = client.post(
+        "/api/v1/visibility/windows",
+        json={
+            "target_id": "NGC0224",
+            "location": {"latitude": 39.9, "longitude": 116.4},
+            "date": "2025-01-28",
+            "zone_ids": [zone["id"]]
+        }
+    )
+    client.delete(f"/api/v1/visible-zones/{zone['id']}")
+    assert response.status_code == 200
+    windows = response.json()["data"]["windows"]
+    assert windows and all(w["zone_id"] == zone["id"] for w in windows)
+
+
+def test_calculate_visibility_windows_rejects_degenerate_zone():
+    """Test an inline polygon with fewer than three vertices is a client error"""
+    for polygon in ([], [[0, 0], [1, 1]]):
+        response = client.post(
+            "/api/v1/visibility/windows",
+            json={
+                "target_id": "NGC0224",
+                "location": {"latitude": 39.9, "longitude": 116.4},
+                "date": "2025-01-28",
+                "visible_zones": [{"id": "zone_0", "name": "Zone 0", "polygon": polygon}]
+            }
+        )
+        assert response.status_code == 400
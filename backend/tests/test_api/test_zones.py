@@ -0,0 +1,54 @@
+"""Test visible zones API"""
+import pytest
+from fastapi.testclient import TestClient
+
+# Saved rows go to a temporary user.db, never the real one
+pytestmark = pytest.mark.usefixtures("user_db")
+
+
+ZONE = {
+    "name": "东侧空地",
+    "polygon": [[90, 20], [120, 20], [120, 60], [90, 60]],
+    "priority": 1
+}
+
+
+def test_zone_crud(client: TestClient):
+    """Test saving, listing, updating and deleting a zone"""
+    response = client.post("/api/v1/visible-zones", json=ZONE)
+    assert response.status_code == 200
+    zone = response.json()["data"]
+    assert zone["version"] == 1
+    assert zone["azimuth_range"] == [90, 120] and zone["altitude_range"] == [20, 60]
+
+    listed = {z["id"]: z for z in client.get("/api/v1/visible-zones").json()["data"]}
+    assert listed[zone["id"]]["polygon"] == ZONE["polygon"]
+
+    response = client.put(f"/api/v1/visible-zones/{zone['id']}", json={**ZONE, "name": "东侧"})
+    assert response.json()["data"]["version"] == 2
+    listed = {z["id"]: z for z in client.get("/api/v1/visible-zones").json()["data"]}
+    assert listed[zone["id"]]["name"] == "东侧"
+
+    assert client.delete(f"/api/v1/visible-zones/{zone['id']}").status_code == 200
+    assert client.delete(f"/api/v1/visible-zones/{zone['id']}").status_code == 404
+    assert client.put(f"/api/v1/visible-zones/{zone['id']}", json=ZONE).status_code == 404
+
+
+def test_zone_needs_three_vertices(client: TestClient):
+    """Test a polygon with fewer than three vertices is rejected"""
+    response = client.post("/api/v1/visible-zones", json={**ZONE, "polygon": [[0, 0], [1, 1]]})
+    assert response.status_code == 422
+
+
+def test_unknown_zone_id_is_rejected(client: TestClient):
+    """Test compute endpoints report zone ids that are not saved"""
+    response = client.post(
+        "/api/v1/recommendations",
+        json={
+            "location": {"latitude": 39.9, "longitude": 116.4},
+            "date": "2025-01-28",
+            "equipment": {"fov_horizontal": 10.0, "fov_vertical": 7.0},
+            "zone_ids": ["zone_missing"]
+        }
+    )
+    assert response.status_code == 404
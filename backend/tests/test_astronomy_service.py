@@ -1,6 +1,25 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.astronomy import AstronomyService
+from app.services.search_index import normalize_designation
+from app.services.simbad import SIMBADUnavailableError
+
+
+@pytest.fixture(autouse=True)
+def no_catalog_store(tmp_path, monkeypatch):
+    """Keep an imported column store out of tests that mock the database"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CATALOG_STORE_DIR", str(tmp_path / "no-store"))
+
+
+def _pin_catalog_state(service, version="v1", count=0, last_update=None):
+    """Answer the catalog key queries without touching the real database"""
+    service.db.get_catalog_version = AsyncMock(return_value=version)
+    service.db.count_objects = AsyncMock(return_value=count)
+    service.db.get_last_update = AsyncMock(return_value=last_update)
+
 
 @pytest.mark.asyncio
 async def test_get_object_from_local_db():
@@ -29,10 +48,16 @@ async def test_get_object_with_simbad_fallback():
 
     # Mock database to return None
     service.db.get_object_by_id = AsyncMock(return_value=None)
+    service.db.get_search_entries = AsyncMock(return_value=[])
+    service.db.get_lookup_miss = AsyncMock(return_value=None)
+    service.db.save_lookup_miss = AsyncMock()
 
     # Mock SIMBAD to return object
     mock_obj = MagicMock()
     mock_obj.id = "IC999"
+    mock_obj.name = "IC 999"
+    mock_obj.magnitude = None
+    mock_obj.aliases = ["IC999"]
     service.simbad.query_object = AsyncMock(return_value=mock_obj)
 
     # Mock database save
@@ -43,7 +68,7 @@ async def test_get_object_with_simbad_fallback():
     assert obj is not None
     assert obj.id == "IC999"
     # Verify SIMBAD was called and result was cached
-    service.simbad.query_object.assert_called_once_with("IC999")
+    service.simbad.query_object.assert_called_once_with("IC999", raise_on_error=True)
     service.db.save_object.assert_called_once_with(mock_obj)
 
 @pytest.mark.asyncio
@@ -52,6 +77,9 @@ async def test_get_object_not_found():
     service = AstronomyService()
 
     service.db.get_object_by_id = AsyncMock(return_value=None)
+    service.db.get_search_entries = AsyncMock(return_value=[])
+    service.db.get_lookup_miss = AsyncMock(return_value=None)
+    service.db.save_lookup_miss = AsyncMock()
     service.simbad.query_object = AsyncMock(return_value=None)
 
     obj = await service.get_object("UNKNOWN")
@@ -104,3 +132,478 @@ async def test_get_statistics():
 
     assert stats.total_objects == 13318
     service.db.get_statistics.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_autocomplete_builds_index_lazily():
+    """Test autocomplete builds the prefix index once and serves from memory"""
+    service = AstronomyService()
+
+    service.db.get_search_entries = AsyncMock(return_value=[
+        ("NGC0224", "Andromeda Galaxy", 3.4, ["M31", "NGC224"]),
+    ])
+
+    first = await service.autocomplete("andro")
+    second = await service.autocomplete("m3")
+
+    assert first[0]["id"] == "NGC0224"
+    assert second[0]["id"] == "NGC0224"
+    service.db.get_search_entries.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_object_resolves_alias_locally():
+    """Test alias spellings resolve to the canonical id without SIMBAD"""
+    service = AstronomyService()
+
+    mock_obj = MagicMock()
+    mock_obj.id = "NGC0224"
+
+    async def get_by_id(object_id):
+        return mock_obj if object_id == "NGC0224" else None
+
+    service.db.get_object_by_id = AsyncMock(side_effect=get_by_id)
+    service.db.get_search_entries = AsyncMock(return_value=[
+        ("NGC0224", "Andromeda Galaxy", 3.4, ["M31", "NGC224"]),
+    ])
+    service.simbad.query_object = AsyncMock()
+
+    for query in ["M 31", "m31", "M031", "NGC 224", "andromeda galaxy"]:
+        obj = await service.get_object(query)
+        assert obj is not None and obj.id == "NGC0224", query
+
+    service.simbad.query_object.assert_not_called()
+    service.db.get_search_entries.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_objects_in_rotated_frame():
+    """Test frame membership follows rotation and object extent"""
+    service = AstronomyService()
+
+    def row(object_id, ra, dec, size=None):
+        return {"id": object_id, "name": object_id, "type": "GALAXY", "ra": ra, "dec": dec,
+                "magnitude": 9.0, "size_major": size, "size_minor": None,
+                "constellation": "Leo"}
+
+    _pin_catalog_state(service)
+    service.db.get_sky_rows = AsyncMock(return_value=[
+        row("CENTER", 170.0, 13.0),
+        row("EAST", 172.5, 13.0),       # 2.4° east: inside a 6°-wide frame
+        row("NORTH", 170.0, 15.5),      # 2.5° north: outside a 3°-tall frame
+        row("EDGE", 170.0, 15.2, 120),  # 2.2° north, 1° radius disc reaching into the frame
+        row("FAR", 200.0, 13.0),
+    ])
+
+    ids = {r["id"] for r in await service.objects_in_frame(170.0, 13.0, 6.0, 3.0)}
+    assert ids == {"CENTER", "EAST", "EDGE"}
+
+    # Rotated 90°: the long side now runs north-south
+    rotated = {r["id"]: r for r in await service.objects_in_frame(170.0, 13.0, 6.0, 3.0, 90.0)}
+    assert set(rotated) == {"CENTER", "NORTH", "EDGE"}
+    assert rotated["CENTER"]["fully_inside"] is True
+    assert rotated["EDGE"]["fully_inside"] is False
+
+@pytest.mark.asyncio
+async def test_find_groups_in_one_frame():
+    """Test nearby objects are grouped and ranked by combined brightness"""
+    service = AstronomyService()
+
+    def row(object_id, ra, dec, magnitude):
+        return {"id": object_id, "name": object_id, "type": "GALAXY", "ra": ra, "dec": dec,
+                "magnitude": magnitude, "size_major": 5.0, "size_minor": 3.0,
+                "constellation": None}
+
+    _pin_catalog_state(service)
+    service.db.get_sky_rows = AsyncMock(return_value=[
+        # Leo Triplet, ~0.6° across
+        row("M65", 169.73, 13.09, 9.3), row("M66", 170.06, 12.99, 8.9),
+        row("NGC3628", 170.07, 13.59, 9.5),
+        # Faint pair-plus-one elsewhere, spread across the RA wrap
+        row("A", 359.9, 0.0, 12.0), row("B", 0.1, 0.1, 12.5), row("C", 0.2, -0.1, 13.0),
+        # Isolated object
+        row("LONE", 90.0, 45.0, 5.0),
+    ])
+
+    groups = await service.find_groups(1.5, 1.0, min_count=3)
+
+    assert [sorted(m["id"] for m in g["members"]) for g in groups] == [
+        ["M65", "M66", "NGC3628"], ["A", "B", "C"]
+    ]
+    assert groups[0]["combined_magnitude"] < 8.9
+    assert 169.7 < groups[0]["center_ra"] < 170.1
+
+    # Type filters take a set of types
+    assert await service.find_groups(1.5, 1.0, min_count=3, obj_types=["NEBULA"]) == []
+    assert await service.find_groups(1.5, 1.0, min_count=3, obj_types=["NEBULA", "GALAXY"]) == groups
+
+    # A frame too small for the triplet splits it
+    assert await service.find_groups(0.3, 0.2, min_count=3) == []
+
+@pytest.mark.asyncio
+async def test_sky_view_keeps_brightest_above_horizon():
+    """Test the whole catalog is positioned at once and bright objects survive the cap"""
+    from datetime import datetime
+    service = AstronomyService()
+
+    def row(object_id, dec, magnitude, obj_type="GALAXY"):
+        return {"id": object_id, "name": object_id, "type": obj_type, "ra": 10.0, "dec": dec,
+                "magnitude": magnitude, "size_major": None, "size_minor": None,
+                "constellation": None}
+
+    _pin_catalog_state(service)
+    service.db.get_sky_rows = AsyncMock(return_value=[
+        row("FAINT", 50.0, 12.0), row("NOMAG", 60.0, None), row("BELOW", -10.0, 1.0),
+        row("NEB", 30.0, 8.0, "NEBULA"), row("BRIGHT", 40.0, 3.0),
+    ])
+    when = datetime(2025, 1, 28, 22, 0)
+
+    # From the north pole an object's altitude is its declination
+    view = await service.sky_view(90.0, 0.0, when)
+    assert [r["id"] for r in view] == ["BRIGHT", "NEB", "FAINT", "NOMAG"]
+    assert view[0]["altitude"] == pytest.approx(40.0)
+    assert view[0]["azimuth"] == pytest.approx(service.calculate_position(10.0, 40.0, 90.0, 0.0, when)[1])
+
+    assert [r["id"] for r in await service.sky_view(90.0, 0.0, when, max_count=2)] == ["BRIGHT", "NEB"]
+    limited = await service.sky_view(90.0, 0.0, when, magnitude_limit=10.0, unknown_magnitude=9.0)
+    assert [r["id"] for r in limited] == ["BRIGHT", "NEB", "NOMAG"]
+    galaxies = await service.sky_view(90.0, 0.0, when, obj_types=["GALAXY"])
+    assert "NEB" not in {r["id"] for r in galaxies}
+
+@pytest.mark.asyncio
+async def test_sky_view_culls_to_viewport():
+    """Test the RA/Dec prefilter returns exactly the objects a full scan finds in the box"""
+    import numpy as np
+    from datetime import datetime
+    from app.services.viewport import Viewport
+    service = AstronomyService()
+
+    rng = np.random.default_rng(5)
+    ra = rng.uniform(0, 360, 4000)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 4000)))
+    _pin_catalog_state(service)
+    service.db.get_sky_rows = AsyncMock(return_value=[
+        {"id": f"OBJ{i}", "name": f"OBJ{i}", "type": "GALAXY", "ra": float(r), "dec": float(d),
+         "magnitude": float(i % 15), "size_major": None, "size_minor": None, "constellation": None}
+        for i, (r, d) in enumerate(zip(ra, dec))
+    ])
+    when = datetime(2025, 1, 28, 22, 0)
+
+    everything = await service.sky_view(39.9, 116.4, when)
+    for box in [(350, 30, 10, 40), (120, 200, 50, 85), (0, 0, 60, 90)]:
+        viewport = Viewport(*box, margin=5)
+        culled = await service.sky_view(39.9, 116.4, when, viewport=viewport)
+        expected = [r for r in everything
+                    if viewport.contains_many(np.array([r["azimuth"]]), np.array([r["altitude"]]))[0]]
+        assert culled and [r["id"] for r in culled] == [r["id"] for r in expected]
+
+
+def _service_with_local_miss():
+    """AstronomyService whose local database knows nothing"""
+    service = AstronomyService()
+    service.db.get_object_by_id = AsyncMock(return_value=None)
+    service.db.get_search_entries = AsyncMock(return_value=[])
+    service.db.get_lookup_miss = AsyncMock(return_value=None)
+    service.db.save_lookup_miss = AsyncMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_skips_repeat_simbad_lookups():
+    """Test a SIMBAD miss is remembered and persisted"""
+    service = _service_with_local_miss()
+    service.simbad.query_object = AsyncMock(return_value=None)
+
+    assert await service.get_object("NGC 99999") is None
+    assert await service.get_object("ngc99999") is None
+
+    service.simbad.query_object.assert_called_once()
+    service.db.save_lookup_miss.assert_called_once()
+    assert service.db.save_lookup_miss.call_args[0][0] == "ngc99999"
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_loaded_from_database():
+    """Test misses persisted by an earlier process are honoured"""
+    service = _service_with_local_miss()
+    service.db.get_lookup_miss = AsyncMock(return_value=time.time())
+    service.simbad.query_object = AsyncMock()
+
+    assert await service.get_object("TYPO42") is None
+    service.simbad.query_object.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_transient_simbad_error_is_not_cached():
+    """Test timeouts do not poison the negative cache"""
+    service = _service_with_local_miss()
+    service.simbad.query_object = AsyncMock(side_effect=SIMBADUnavailableError("timeout"))
+
+    assert await service.get_object("IC999") is None
+    assert await service.get_object("IC999") is None
+
+    assert service.simbad.query_object.call_count == 2
+    service.db.save_lookup_miss.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_simbad_query():
+    """Test single-flight coalescing of identical lookups"""
+    service = _service_with_local_miss()
+    service.db.save_object = AsyncMock()
+
+    mock_obj = MagicMock()
+    mock_obj.id = "IC999"
+    mock_obj.name = "IC 999"
+    mock_obj.magnitude = None
+    mock_obj.aliases = []
+
+    async def slow_query(object_id, raise_on_error=False):
+        await asyncio.sleep(0.05)
+        return mock_obj
+
+    service.simbad.query_object = AsyncMock(side_effect=slow_query)
+
+    results = await asyncio.gather(*[service.get_object("IC999") for _ in range(10)])
+
+    assert all(r is mock_obj for r in results)
+    service.simbad.query_object.assert_called_once()
+    service.db.save_object.assert_called_once()
+    assert service._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_simbad_lookup_is_deferred(monkeypatch):
+    """Test lookups past the latency budget return None and cache in the background"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "SIMBAD_LOOKUP_BUDGET", 0.01)
+
+    service = _service_with_local_miss()
+    service.db.save_object = AsyncMock()
+
+    mock_obj = MagicMock()
+    mock_obj.id = "IC999"
+    mock_obj.name = "IC 999"
+    mock_obj.magnitude = None
+    mock_obj.aliases = []
+
+    async def slow_query(object_id, raise_on_error=False):
+        await asyncio.sleep(0.1)
+        return mock_obj
+
+    service.simbad.query_object = AsyncMock(side_effect=slow_query)
+
+    assert await service.get_object("IC999") is None
+    lookup = service._inflight[normalize_designation("IC999")]
+    assert await lookup is mock_obj
+
+    service.db.save_object.assert_called_once_with(mock_obj)
+    assert service._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_sync_objects_batches_concurrently(monkeypatch):
+    """Test sync splits ids into bounded concurrent batches and saves once"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "SIMBAD_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "SIMBAD_SYNC_CONCURRENCY", 2)
+
+    service = AstronomyService()
+    service.db.save_objects = AsyncMock()
+
+    running = 0
+    peak = 0
+
+    async def query_batch(batch, raise_on_error=False):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if "BAD1" in batch:
+            raise SIMBADUnavailableError("timeout")
+        objs = []
+        for object_id in batch:
+            if object_id != "MISSING":
+                obj = MagicMock()
+                obj.id = object_id
+                obj.name = object_id
+                obj.magnitude = None
+                obj.aliases = []
+                objs.append(obj)
+        return objs
+
+    service.simbad.query_objects_batch = AsyncMock(side_effect=query_batch)
+
+    ids = ["IC1", "IC2", "IC3", "MISSING", "BAD1", "IC4", "IC1"]
+    synced, failed = await service.sync_objects(ids)
+
+    assert synced == ["IC1", "IC2", "IC3"]
+    assert failed == ["MISSING", "BAD1", "IC4"]
+    assert service.simbad.query_objects_batch.call_count == 3
+    assert peak == 2
+    service.db.save_objects.assert_called_once()
+    assert len(service.db.save_objects.call_args[0][0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_reload_catalog_rebuilds_loaded_indexes():
+    """Test a swapped catalog refreshes only snapshots that were in use"""
+    service = AstronomyService()
+    service.db.reopen = AsyncMock()
+    service.db.get_data_version = AsyncMock(return_value=1)
+    service.db.get_last_update = AsyncMock(return_value="2026-01-01 00:00:00")
+    service.db.get_catalog_version = AsyncMock(return_value="v2")
+    service.db.get_search_entries = AsyncMock(return_value=[("M42", "Orion Nebula", 4.0, [])])
+    service.db.get_sky_rows = AsyncMock()
+    service.prefix_index.loaded = True
+    service._misses["ic999"] = time.time()
+
+    await service.reload_catalog()
+
+    service.db.reopen.assert_called_once()
+    assert service.alias_index.resolve("M 42") == "M42"
+    service.db.get_sky_rows.assert_not_called()
+    assert service._misses == {}
+
+
+@pytest.mark.asyncio
+async def test_spatial_index_maps_matching_catalog_store(tmp_path, monkeypatch):
+    """Test the importer's column store replaces SQLite only when it matches the catalog"""
+    from app.config import settings
+    from app.services.catalog_store import write_catalog_store
+
+    def row(object_id, ra, dec, object_type, size=None):
+        return {"id": object_id, "name": object_id, "type": object_type, "ra": ra, "dec": dec,
+                "magnitude": None if size else 9.0, "size_major": size, "size_minor": None,
+                "constellation": "Leo" if size else None}
+
+    rows = [row("M65", 169.73, 13.09, "GALAXY", 8.0), row("M66", 170.06, 12.99, "GALAXY"),
+            row("NGC3632", 170.3, 13.0, "NEBULA")]
+    write_catalog_store(str(tmp_path), rows, "v1")
+    monkeypatch.setattr(settings, "CATALOG_STORE_DIR", str(tmp_path))
+
+    service = AstronomyService()
+    _pin_catalog_state(service, count=3)
+    service.db.get_sky_rows = AsyncMock(return_value=rows)
+
+    mapped = await service.cone_search(170.0, 13.0, 1.0, obj_type="GALAXY")
+    service.db.get_sky_rows.assert_not_called()
+    assert [{k: v for k, v in r.items() if k != "separation"} for r in mapped] == rows[1::-1]
+    assert service._sky_radii.tolist() == [8.0 / 120.0, 0.0, 0.0]
+
+    # A SIMBAD-cached object makes the store stale
+    service.db.count_objects = AsyncMock(return_value=4)
+    await service.load_spatial_index()
+    service.db.get_sky_rows.assert_called_once()
+    assert await service.cone_search(170.0, 13.0, 1.0, obj_type="GALAXY") == mapped
+
+
+@pytest.mark.asyncio
+async def test_catalog_store_overlays_newer_objects(tmp_path, monkeypatch):
+    """Test objects saved after the import are laid over the store instead of disabling it"""
+    from app.config import settings
+    from app.services.catalog_store import write_catalog_store
+
+    def row(object_id, ra, dec, aliases=None):
+        sky = {"id": object_id, "name": object_id, "type": "GALAXY", "ra": ra, "dec": dec,
+               "magnitude": 9.0, "size_major": None, "size_minor": None, "constellation": None}
+        return sky if aliases is None else {**sky, "aliases": aliases}
+
+    write_catalog_store(str(tmp_path), [row("M65", 169.73, 13.09, "NGC3623"),
+                                        row("M66", 170.06, 12.99, "NGC3627,Arp 16")],
+                        "v1", last_update="2026-01-01 00:00:00")
+    monkeypatch.setattr(settings, "CATALOG_STORE_DIR", str(tmp_path))
+
+    newer = [row("M66", 10.0, -5.0), row("IC999", 170.1, 13.1)]
+    service = AstronomyService()
+    _pin_catalog_state(service, count=3, last_update="2026-01-02 00:00:00")
+    service.db.get_sky_rows = AsyncMock(return_value=newer)
+    service.db.get_search_entries = AsyncMock(return_value=[("IC999", "IC 999", 12.0, ["Tiny"])])
+
+    found = await service.cone_search(170.0, 13.0, 1.0)
+    service.db.get_sky_rows.assert_called_once_with(updated_since="2026-01-01 00:00:00")
+    assert sorted(r["id"] for r in found) == ["IC999", "M65"]
+    assert len(service._sky_rows) == 3 and service._sky_rows[1]["ra"] == 10.0
+
+    await service.load_indexes()
+    service.db.get_search_entries.assert_called_once_with(updated_since="2026-01-01 00:00:00")
+    assert service.alias_index.resolve("NGC 3627") == "M66"
+    assert service.alias_index.resolve("Tiny") == "IC999"
+
+
+@pytest.mark.asyncio
+async def test_refresh_external_changes_from_other_worker(tmp_path):
+    """Test objects saved through another connection refresh this worker's caches"""
+    import sqlite3
+    from pathlib import Path
+    from app.models.database import DeepSkyObject
+    from app.services.database import DatabaseService
+
+    db_path = tmp_path / "shared.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript((Path(__file__).parent.parent / "app" / "data" / "schema.sql").read_text())
+
+    service, other = AstronomyService(), AstronomyService()
+    service.db, other.db = DatabaseService(str(db_path)), DatabaseService(str(db_path))
+    try:
+        await service.load_indexes()
+        service.spatial_index.loaded = True
+        service._misses[normalize_designation("M 31")] = time.time()
+        assert await service.refresh_external_changes() == []  # Baseline
+
+        # This worker's own writes leave data_version alone
+        await service.cache_object(DeepSkyObject(id="IC999", name="IC 999", type="GALAXY", ra=1.0, dec=2.0))
+        service.spatial_index.loaded = True
+        assert await service.refresh_external_changes() == []
+
+        await other.db.save_object(DeepSkyObject(
+            id="NGC224", name="Andromeda Galaxy", type="GALAXY", ra=10.68, dec=41.27, aliases=["M 31"]
+        ))
+        assert "NGC224" in await service.refresh_external_changes()
+        assert service.alias_index.resolve("M31") == "NGC224"
+        assert normalize_designation("M 31") not in service._misses
+        assert service.spatial_index.loaded is False
+
+        # Unchanged since: only the pragma is read
+        service.db.get_search_entries = AsyncMock()
+        assert await service.refresh_external_changes() == []
+        service.db.get_search_entries.assert_not_called()
+    finally:
+        await service.db.close()
+        await other.db.close()
+
+
+@pytest.mark.asyncio
+async def test_catalog_swap_reaches_every_router(tmp_path, monkeypatch):
+    """Test routes other than /targets read the catalog file swapped in by the importer"""
+    import os
+    import sqlite3
+    from pathlib import Path
+    from app.api import deps, recommendations, skymap, visibility
+    from app.config import settings
+
+    db_path = tmp_path / "deep_sky.db"
+    schema = (Path(__file__).parent.parent / "app" / "data" / "schema.sql").read_text()
+    for path, object_id in [(db_path, "M31"), (tmp_path / "new.db", "M42")]:
+        with sqlite3.connect(path) as conn:
+            conn.executescript(schema)
+            conn.execute(
+                "INSERT INTO objects (id, name, type, ra, dec) VALUES (?, ?, 'GALAXY', 1, 2)",
+                (object_id, object_id)
+            )
+        conn.close()
+
+    monkeypatch.setattr(settings, "CATALOG_SWAP_GRACE", 0)
+    monkeypatch.setattr(deps.db_service, "db_path", str(db_path))
+    monkeypatch.setattr(deps.db_service, "_conn", None)
+    monkeypatch.setattr(deps.db_service, "_file_id", None)
+    try:
+        assert await skymap.db_service.get_object_by_id("M31") is not None
+
+        os.replace(tmp_path / "new.db", db_path)
+        await deps.astronomy_service.reload_catalog()
+
+        recommender = recommendations.recommendation_service
+        assert visibility.visibility_service.astronomy is deps.astronomy_service
+        assert await recommender.db_service.get_object_by_id("M42") is not None
+        assert await visibility.db_service.get_object_by_id("M31") is None
+    finally:
+        await deps.db_service.close()
@@ -1,6 +1,15 @@
+import asyncio
+import os
+import sqlite3
+from pathlib import Path
+
 import pytest
 from app.services.database import DatabaseService
+from app.services.search_index import normalize_designation
 from app.models.database import DeepSkyObject
+from app.services.model_adapter import ModelAdapter
+
+SCHEMA_PATH = Path(__file__).parent.parent / "app" / "data" / "schema.sql"
 
 @pytest.mark.asyncio
 async def test_get_object_by_id():
@@ -25,3 +34,250 @@ async def test_get_statistics():
     service = DatabaseService("app/data/deep_sky.db")
     stats = await service.get_statistics()
     assert stats.total_objects > 10000
+
+@pytest.mark.asyncio
+async def test_lookup_misses_round_trip(tmp_path):
+    service = DatabaseService(str(tmp_path / "misses.db"))
+    try:
+        assert await service.get_lookup_miss("ngc99999") is None
+
+        await service.save_lookup_miss("ngc99999", 1234.5)
+        assert await service.get_lookup_miss("ngc99999") == 1234.5
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_locations_shared_between_workers(tmp_path):
+    """Test a location saved by one worker is served by another's cache"""
+    db_path = str(tmp_path / "app.db")
+    first, second = DatabaseService(db_path), DatabaseService(db_path)
+    try:
+        assert [loc["id"] for loc in await second.list_locations()] == ["loc_1"]
+        assert (await second.list_locations())[0]["is_default"] is True
+
+        await first.save_location({"id": "loc_a", "name": "Dark site", "latitude": 40.0,
+                                   "longitude": 116.0, "timezone": "Asia/Shanghai"})
+        assert [loc["id"] for loc in await second.list_locations()] == ["loc_1", "loc_a"]
+
+        assert await second.delete_location("loc_1")
+        assert not await second.delete_location("loc_1")
+        assert [loc["id"] for loc in await first.list_locations()] == ["loc_a"]
+        assert [loc["id"] for loc in await second.list_locations()] == ["loc_a"]
+
+        # The default is seeded only once, not again after it was deleted
+        second._locations_ready = False
+        assert [loc["id"] for loc in await second.list_locations()] == ["loc_a"]
+
+        await second.save_equipment({"id": "eq_a", "name": "FF 200", "sensor_size": "full-frame",
+                                     "sensor_width": 36.0, "sensor_height": 24.0, "focal_length": 200,
+                                     "fov_horizontal": 10.29, "fov_vertical": 6.87})
+        assert [eq["id"] for eq in await first.list_equipment()] == ["eq_a"]
+    finally:
+        await first.close()
+        await second.close()
+
+
+@pytest.mark.asyncio
+async def test_saved_locations_survive_catalog_swap(tmp_path):
+    """Test user tables move out of the catalog file and writes outlive a swap"""
+    db_path = tmp_path / "deep_sky.db"
+    for path in (db_path, tmp_path / "new.db"):
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA_PATH.read_text())
+        conn.close()
+    # Saved as an earlier release did, inside the catalog
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""CREATE TABLE locations (id TEXT PRIMARY KEY, name TEXT NOT NULL,
+            latitude REAL NOT NULL, longitude REAL NOT NULL, timezone TEXT NOT NULL, country TEXT,
+            region TEXT, is_default INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)""")
+        conn.execute("""INSERT INTO locations (id, name, latitude, longitude, timezone, created_at)
+            VALUES ('loc_a', 'Dark site', 40.0, 116.0, 'Asia/Shanghai', 1.0)""")
+    conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        assert [loc["id"] for loc in await service.list_locations()] == ["loc_a"]
+        assert service.user_db_path == str(tmp_path / "user.db")
+
+        await service.save_location({"id": "loc_b", "name": "Hill", "latitude": 41.0,
+                                     "longitude": 117.0, "timezone": "Asia/Shanghai"})
+        os.replace(tmp_path / "new.db", db_path)
+        await service.reopen(grace=0)
+        await service.save_location({"id": "loc_c", "name": "Coast", "latitude": 39.0,
+                                     "longitude": 119.0, "timezone": "Asia/Shanghai"})
+
+        assert [loc["id"] for loc in await service.list_locations()] == ["loc_a", "loc_b", "loc_c"]
+    finally:
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_updates_keep_created_at(tmp_path):
+    """Test saving an existing location or equipment keeps its place in the list"""
+    service = DatabaseService(str(tmp_path / "app.db"))
+    try:
+        site = {"id": "loc_a", "name": "Dark site", "latitude": 40.0,
+                "longitude": 116.0, "timezone": "Asia/Shanghai"}
+        await service.save_location(site)
+        await service.save_location({**site, "name": "Dark site renamed"})
+        assert [loc["name"] for loc in await service.list_locations()] == ["北京", "Dark site renamed"]
+        await service.save_location({**site, "id": "loc_b", "name": "Later"})
+        await service.save_location({**site, "latitude": 41.0})
+        assert [loc["id"] for loc in await service.list_locations()] == ["loc_1", "loc_a", "loc_b"]
+
+        lens = {"id": "eq_a", "name": "FF 200", "sensor_size": "full-frame",
+                "sensor_width": 36.0, "sensor_height": 24.0, "focal_length": 200,
+                "fov_horizontal": 10.29, "fov_vertical": 6.87}
+        await service.save_equipment(lens)
+        await service.save_equipment({**lens, "id": "eq_b"})
+        await service.save_equipment({**lens, "focal_length": 300})
+        equipment = await service.list_equipment()
+        assert [eq["id"] for eq in equipment] == ["eq_a", "eq_b"]
+        assert equipment[0]["focal_length"] == 300
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_save_objects_single_transaction(tmp_path):
+    db_path = tmp_path / "objects.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(SCHEMA_PATH.read_text())
+
+    service = DatabaseService(str(db_path))
+    try:
+        await service.save_lookup_miss("ic999")
+        await service.save_lookup_miss(normalize_designation("Arp 999"))
+        await service.save_objects([
+            DeepSkyObject(id="IC999", name="IC 999", type="GALAXY", ra=1.0, dec=2.0,
+                          aliases=["IC999", "IC999", "IC 999"]),
+            DeepSkyObject(id="IC998", name="IC 998", type="NEBULA", ra=3.0, dec=4.0,
+                          aliases=["Arp 999"]),
+        ])
+
+        obj = await service.get_object_by_id("IC999")
+        assert obj.name == "IC 999"
+        assert sorted(obj.aliases) == ["IC 999", "IC999"]
+        assert await service.get_object_by_id("IC998") is not None
+        assert await service.get_lookup_miss("ic999") is None
+        assert await service.get_lookup_miss(normalize_designation("Arp 999")) is None
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_reopen_after_file_swap(tmp_path):
+    db_path = tmp_path / "deep_sky.db"
+    for path, object_id in [(db_path, "M31"), (tmp_path / "new.db", "M42")]:
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA_PATH.read_text())
+            conn.execute(
+                "INSERT INTO objects (id, name, type, ra, dec) VALUES (?, ?, 'GALAXY', 1, 2)",
+                (object_id, object_id)
+            )
+        conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        assert await service.get_object_by_id("M31") is not None
+        old_conn = service._conn
+        assert not service.file_replaced()
+
+        os.replace(tmp_path / "new.db", db_path)
+        assert service.file_replaced()
+
+        await service.reopen(grace=0)
+        assert not service.file_replaced()
+        assert await service.get_object_by_id("M31") is None
+        assert await service.get_object_by_id("M42") is not None
+
+        await asyncio.sleep(0.05)
+        assert old_conn._connection is None
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_write_after_swap_lands_in_new_file(tmp_path):
+    """Test a write racing a swap goes to the renamed-in file, and the catalog still reloads"""
+    db_path = tmp_path / "deep_sky.db"
+    for path in [db_path, tmp_path / "new.db"]:
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA_PATH.read_text())
+        conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        await service.get_lookup_miss("m31")
+        os.replace(tmp_path / "new.db", db_path)
+
+        await service.save_lookup_miss("ic999", 1.0)
+        assert service.file_replaced()  # The watcher still sees the swap
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT missed_at FROM lookup_misses WHERE query_key = 'ic999'").fetchone() == (1.0,)
+        conn.close()
+
+        await service.reopen(grace=0)
+        assert not service.file_replaced()
+        assert await service.get_lookup_miss("ic999") == 1.0
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_save_objects_materializes_api_rows(tmp_path):
+    db_path = tmp_path / "objects.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(SCHEMA_PATH.read_text())
+    conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        assert await service.get_api_targets("GALAXY") == []
+
+        obj = DeepSkyObject(id="IC999", name="IC 999", type="GALAXY", ra=1.0, dec=2.0,
+                            magnitude=12.5, aliases=["Tiny Galaxy"])
+        await service.save_objects([obj])
+
+        targets = await service.get_api_targets("GALAXY")
+        assert [t.model_dump() for t in targets] == [ModelAdapter().to_target(obj).model_dump()]
+        assert await service.get_api_targets("NEBULA") == []
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_objects_api_backfilled_for_older_catalog(tmp_path):
+    """Test a catalog imported before objects_api keeps every object after one SIMBAD save"""
+    db_path = tmp_path / "objects.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(SCHEMA_PATH.read_text())
+        # Pre-materialization layout, with no rows for the imported objects
+        conn.execute("DROP TABLE objects_api")
+        conn.execute("CREATE TABLE objects_api (id TEXT PRIMARY KEY, type TEXT NOT NULL, x REAL NOT NULL)")
+        for i in range(6):
+            conn.execute(
+                "INSERT INTO objects (id, name, type, ra, dec, magnitude) VALUES (?, ?, 'GALAXY', ?, 10, 11)",
+                (f"NGC{i}", f"NGC {i}", float(i))
+            )
+        conn.execute(
+            "INSERT INTO observational_info (object_id, difficulty, notes) VALUES ('NGC0', 'EASY', 'Bright')"
+        )
+    conn.close()
+
+    service = DatabaseService(str(db_path))
+    try:
+        # Migrated when the file is opened, not inside a save
+        await service.connect()
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM objects_api").fetchone()[0] == 6
+        conn.close()
+
+        await service.save_objects([
+            DeepSkyObject(id="IC999", name="IC 999", type="GALAXY", ra=1.0, dec=2.0)
+        ])
+
+        records = await service.get_target_records("GALAXY")
+        assert [r.id for r in records] == ["IC999"] + [f"NGC{i}" for i in range(6)]
+        targets = await service.get_api_targets_by_ids(["NGC0"])
+        expected = ModelAdapter().to_target(await service.get_object_by_id("NGC0"))
+        assert targets["NGC0"].model_dump() == expected.model_dump()
+        assert targets["NGC0"].difficulty == 1
+    finally:
+        await service.close()
@@ -0,0 +1,207 @@
+"""Test incremental OpenNGC import"""
+import importlib.util
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).parent.parent.parent / "scripts" / "import_openngc.py"
+HEADER = "Name;Type;RA;Dec;Const;MajAx;MinAx;B-Mag;V-Mag;SurfBr;M;NGC;IC;Identifiers;Common names"
+
+
+@pytest.fixture
+def importer():
+    spec = importlib.util.spec_from_file_location("import_openngc", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_csv(path, rows):
+    path.write_text("\n".join([HEADER] + rows) + "\n", encoding="utf-8")
+    return path
+
+
+M31 = "NGC0224;G;00:42:44.35;+41:16:08.6;And;177.83;69.66;4.29;3.44;23.63;031;;;UGC 454;Andromeda Galaxy"
+M42 = "NGC1976;Cl+N;05:35:16.48;-05:23:22.8;Ori;90.00;60.00;4.00;;;042;;;LBN 974;Great Orion Nebula"
+M1 = "NGC1952;SNR;05:34:31.94;+22:00:52.2;Tau;8.00;4.00;8.40;;;001;;;SH 2-244;Crab Nebula"
+
+
+def test_incremental_import_only_touches_changes(importer, tmp_path):
+    """Test re-imports upsert changed rows and keep SIMBAD-cached rows"""
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31, M42])
+    addendum = _write_csv(tmp_path / "addendum.csv", [])
+
+    importer.main(["--ngc", str(ngc), "--addendum", str(addendum), "--db", str(db_path)])
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO objects (id, name, type, ra, dec) VALUES ('IC999', 'IC 999', 'GALAXY', 1, 2)"
+    )
+    conn.commit()
+
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31.replace(";3.44;", ";3.40;"), M1])
+    data = importer.load_csv(ngc)
+    diff = importer.import_incremental(conn, data)
+
+    assert diff == {
+        "added": ["NGC1952"], "changed": ["NGC0224"],
+        "unchanged": [], "removed": ["NGC1976"],
+        "materialized": ["NGC1952", "NGC0224", "IC999"]
+    }
+    assert conn.execute("SELECT magnitude FROM objects_api WHERE id = 'NGC0224'").fetchone()[0] == 3.40
+    assert conn.execute("SELECT magnitude FROM objects WHERE id = 'NGC0224'").fetchone()[0] == 3.40
+    assert conn.execute("SELECT COUNT(*) FROM objects WHERE id = 'NGC1976'").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM objects WHERE id = 'IC999'").fetchone()[0] == 1
+
+    # Nothing changed: nothing written
+    diff = importer.import_incremental(conn, data)
+    assert diff["added"] == diff["changed"] == diff["materialized"] == []
+    assert sorted(diff["unchanged"]) == ["NGC0224", "NGC1952"]
+
+    diff = importer.import_incremental(conn, data, prune=True)
+    assert conn.execute("SELECT COUNT(*) FROM objects WHERE id = 'NGC1976'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM aliases WHERE object_id = 'NGC1976'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM objects_api WHERE id = 'NGC1976'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM objects WHERE id = 'IC999'").fetchone()[0] == 1
+    conn.close()
+
+
+def test_rebuild_is_swapped_in_atomically(importer, tmp_path):
+    """Test each import replaces the database file only when something changed"""
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31])
+    addendum = _write_csv(tmp_path / "addendum.csv", [])
+    args = ["--ngc", str(ngc), "--addendum", str(addendum), "--db", str(db_path)]
+
+    importer.main(args)
+    first = db_path.stat().st_ino
+
+    importer.main(args)
+    assert db_path.stat().st_ino == first
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO lookup_misses (query_key, missed_at) VALUES ('ic999', 1.0)")
+    # Saved locations as an earlier release kept them, inside the catalog
+    conn.execute("CREATE TABLE locations (id TEXT PRIMARY KEY, name TEXT NOT NULL, created_at REAL NOT NULL)")
+    conn.execute("INSERT INTO locations (id, name, created_at) VALUES ('loc_a', 'Dark site', 1.0)")
+    conn.commit()
+    version = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()[0]
+    conn.close()
+
+    importer.main(args + ["--full"])
+    assert db_path.stat().st_ino != first
+    assert not list(tmp_path.glob("*.tmp-*"))
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()[0] != version
+    assert conn.execute("SELECT COUNT(*) FROM lookup_misses").fetchone()[0] == 1
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'locations'").fetchone()
+    conn.close()
+
+    # Moved to the user database, which the swap never replaces
+    conn = sqlite3.connect(tmp_path / "user.db")
+    assert conn.execute("SELECT id, name FROM locations").fetchall() == [("loc_a", "Dark site")]
+    conn.close()
+
+
+def test_api_writes_during_import_survive_swap(importer, tmp_path, monkeypatch):
+    """Test rows the API writes after the backup is taken are carried into the new file"""
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31, M42])
+    addendum = _write_csv(tmp_path / "addendum.csv", [])
+    args = ["--ngc", str(ngc), "--addendum", str(addendum), "--db", str(db_path)]
+    importer.main(args)
+
+    import_incremental = importer.import_incremental
+
+    def import_while_api_writes(conn, data, prune=False):
+        diff = import_incremental(conn, data, prune)
+        live = sqlite3.connect(db_path)
+        live.execute("INSERT INTO lookup_misses (query_key, missed_at) VALUES ('ic999', 1.0)")
+        live.execute("INSERT INTO objects (id, name, type, ra, dec) VALUES ('IC998', 'IC 998', 'GALAXY', 1, 2)")
+        live.execute("INSERT INTO aliases (object_id, alias) VALUES ('IC998', 'Arp 998')")
+        live.commit()
+        live.close()
+        return diff
+
+    monkeypatch.setattr(importer, "import_incremental", import_while_api_writes)
+    _write_csv(ngc, [M31.replace(";3.44;", ";3.40;")])
+    importer.main(args + ["--prune"])
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM lookup_misses WHERE query_key = 'ic999'").fetchone()[0] == 1
+    assert conn.execute("SELECT alias FROM aliases WHERE object_id = 'IC998'").fetchall() == [("Arp 998",)]
+    # Pruned catalog objects are not mistaken for cached ones
+    assert conn.execute("SELECT COUNT(*) FROM objects WHERE id = 'NGC1976'").fetchone()[0] == 0
+    conn.close()
+
+
+def test_invalid_rebuild_leaves_live_database(importer, tmp_path):
+    """Test a rebuild that fails validation never replaces the live file"""
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31])
+    empty = _write_csv(tmp_path / "empty.csv", [])
+
+    importer.main(["--ngc", str(ngc), "--addendum", str(empty), "--db", str(db_path)])
+    inode = db_path.stat().st_ino
+
+    with pytest.raises(RuntimeError):
+        importer.main(["--ngc", str(empty), "--addendum", str(empty), "--db", str(db_path), "--full"])
+
+    assert db_path.stat().st_ino == inode
+    assert not list(tmp_path.glob("*.tmp-*"))
+
+
+def test_api_rows_match_model_adapter(importer, tmp_path):
+    """Test imported objects_api rows serve the same target ModelAdapter builds"""
+    from app.services.database import DatabaseService
+    from app.services.model_adapter import ModelAdapter
+    import asyncio
+
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31, M42])
+    addendum = _write_csv(tmp_path / "addendum.csv", [])
+    importer.main(["--ngc", str(ngc), "--addendum", str(addendum), "--db", str(db_path)])
+
+    async def load():
+        service = DatabaseService(str(db_path))
+        try:
+            return await service.get_api_targets("GALAXY"), await service.get_object_by_id("NGC0224")
+        finally:
+            await service.close()
+
+    targets, obj = asyncio.run(load())
+    assert [t.model_dump() for t in targets] == [ModelAdapter().to_target(obj).model_dump()]
+
+
+def test_import_emits_memory_mapped_store(importer, tmp_path):
+    """Test the column store carries the catalog version and the sky rows"""
+    from app.services.catalog_store import CatalogStore
+
+    db_path = tmp_path / "deep_sky.db"
+    ngc = _write_csv(tmp_path / "NGC.csv", [M31, M42])
+    addendum = _write_csv(tmp_path / "addendum.csv", [])
+    args = ["--ngc", str(ngc), "--addendum", str(addendum), "--db", str(db_path)]
+    importer.main(args)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    version = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()[0]
+    rows = [dict(r) for r in conn.execute(
+        "SELECT id, name, type, ra, dec, magnitude, size_major, size_minor, constellation FROM objects"
+    )]
+    conn.close()
+
+    store = CatalogStore.open(str(tmp_path / "catalog"))
+    assert store.version == version
+    assert list(store.rows) == rows
+    assert not store.xyz.flags.writeable
+    entries = {entry[0]: entry for entry in store.search_entries()}
+    assert "M31" in entries["NGC0224"][3]
+
+    # A missing store is regenerated even when the catalog is unchanged
+    (tmp_path / "catalog" / "CURRENT").unlink()
+    importer.main(args)
+    assert CatalogStore.open(str(tmp_path / "catalog")).version == version
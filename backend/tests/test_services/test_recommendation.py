@@ -0,0 +1,78 @@
+"""Test recommendation ranking pipeline"""
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.target import DeepSkyTarget
+from app.models.records import TargetRecord
+from app.services.recommendation import RecommendationService
+
+
+def _target(object_id):
+    return DeepSkyTarget(
+        id=object_id, name=object_id, name_en=object_id, type="galaxy",
+        ra=10.0, dec=20.0, magnitude=8.0, size=10.0, constellation="And", difficulty=2
+    )
+
+
+@pytest.mark.asyncio
+async def test_payloads_built_only_for_top_k():
+    """Test candidates are ranked on records and only the top K are hydrated"""
+    service = RecommendationService()
+    records = [TargetRecord(f"NGC{i}", float(i), 20.0, 8.0, 10.0) for i in range(50)]
+    service.db_service.get_target_records = AsyncMock(side_effect=[records, [], []])
+    service.db_service.get_api_targets_by_ids = AsyncMock(
+        side_effect=lambda ids: {i: _target(i) for i in ids}
+    )
+
+    window = {"start_time": "2026-10-20T20:00:00", "max_altitude": 60.0, "duration_minutes": 120}
+    service.visibility.calculate_visibility_windows = MagicMock(return_value=[window])
+    service.scoring.calculate_score = MagicMock(
+        side_effect=[{"total_score": i % 7, "breakdown": {}} for i in range(50)]
+    )
+    service.astronomy.calculate_position = MagicMock(return_value=(45.0, 180.0))
+
+    recs = await service.generate_recommendations(
+        None, 39.9, 116.4, datetime(2026, 10, 20), {}, [], limit=3
+    )
+
+    assert [r["target"]["id"] for r in recs] == ["NGC6", "NGC13", "NGC20"]
+    assert [r["score"] for r in recs] == [6, 6, 6]
+    service.db_service.get_api_targets_by_ids.assert_called_once_with(["NGC6", "NGC13", "NGC20"])
+    assert service.astronomy.calculate_position.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_ranked_target_missing_from_hydration_is_skipped():
+    """Test a ranked record without an API row is dropped instead of failing"""
+    service = RecommendationService()
+    records = [TargetRecord(f"NGC{i}", float(i), 20.0, 8.0, 10.0) for i in range(3)]
+    service.db_service.get_target_records = AsyncMock(side_effect=[records, [], []])
+    service.db_service.get_api_targets_by_ids = AsyncMock(
+        side_effect=lambda ids: {i: _target(i) for i in ids if i != "NGC1"}
+    )
+
+    window = {"start_time": "2026-10-20T20:00:00", "max_altitude": 60.0, "duration_minutes": 120}
+    service.visibility.calculate_visibility_windows = MagicMock(return_value=[window])
+    service.scoring.calculate_score = MagicMock(return_value={"total_score": 50, "breakdown": {}})
+    service.astronomy.calculate_position = MagicMock(return_value=(45.0, 180.0))
+
+    recs = await service.generate_recommendations(
+        None, 39.9, 116.4, datetime(2026, 10, 20), {}, [], limit=3
+    )
+
+    assert [r["target"]["id"] for r in recs] == ["NGC0", "NGC2"]
+
+
+@pytest.mark.asyncio
+async def test_group_search_filters_by_requested_types():
+    """Test every requested type reaches the group search, not just a single one"""
+    service = RecommendationService()
+    service.astronomy.find_groups = AsyncMock(return_value=[])
+
+    await service.recommend_groups(
+        39.9, 116.4, datetime(2026, 10, 20), {}, [], filters={"types": ["GALAXY", "NEBULA"]}
+    )
+
+    assert service.astronomy.find_groups.call_args.kwargs["obj_types"] == ["GALAXY", "NEBULA"]
@@ -0,0 +1,165 @@
+"""Test in-memory search indexes"""
+from app.services import search_index
+from app.services.search_index import (
+    AliasIndex,
+    PrefixIndex,
+    TrigramIndex,
+    normalize_designation,
+    normalize_name,
+)
+
+
+ROWS = [
+    ("NGC0224", "Andromeda Galaxy", 3.4, ["M31", "NGC224", "UGC454"]),
+    ("NGC0221", "NGC0221", 8.1, ["M32", "NGC221"]),
+    ("NGC2244", "NGC2244", 4.8, ["NGC2244"]),
+    ("NGC2240", "NGC2240", None, []),
+    ("IC0434", "Horsehead Nebula", 6.8, ["B33"]),
+]
+
+
+def _build():
+    index = PrefixIndex()
+    index.build(ROWS)
+    return index
+
+
+def test_normalize_name():
+    """Test separators and case are ignored"""
+    assert normalize_name("NGC 224") == "ngc224"
+    assert normalize_name("Andromeda Galaxy") == "andromedagalaxy"
+    assert normalize_name("") == ""
+
+
+def test_complete_by_designation():
+    """Test designation prefixes with and without spaces"""
+    index = _build()
+
+    ids = [c["id"] for c in index.complete("NGC 224")]
+    assert ids[0] == "NGC0224"
+    assert "NGC2244" in ids
+
+    assert index.complete("m3")[0]["id"] == "NGC0224"
+
+
+def test_complete_ranking_and_dedup():
+    """Test Messier objects rank first, then brightness, one hit per object"""
+    index = _build()
+
+    results = index.complete("ngc", limit=10)
+    ids = [c["id"] for c in results]
+    assert len(ids) == len(set(ids))
+    assert ids[:2] == ["NGC0224", "NGC0221"]
+    assert ids[-1] == "NGC2240"
+    assert results[-1]["magnitude"] is None
+
+
+def test_complete_by_common_name():
+    """Test completing common names"""
+    index = _build()
+
+    results = index.complete("horse")
+    assert [c["id"] for c in results] == ["IC0434"]
+    assert results[0]["match"] == "Horsehead Nebula"
+    assert index.complete("xyz") == []
+    assert index.complete("  ") == []
+
+
+def test_incremental_add_replaces_entries():
+    """Test cached SIMBAD objects become searchable without a rebuild"""
+    index = _build()
+    assert index.complete("ic9") == []
+    # Warm the memo for a short prefix, which add() must invalidate
+    index.complete("ic")
+
+    index.add("IC999", "IC 999", 12.0, ["IC999"])
+    assert [c["id"] for c in index.complete("ic9")] == ["IC999"]
+    assert "IC999" in [c["id"] for c in index.complete("ic")]
+
+    index.add("IC999", "IC 999", 12.0, ["Renamed"])
+    assert index.complete("ic9")[0]["id"] == "IC999"
+    assert index.complete("renamed")[0]["id"] == "IC999"
+
+
+def test_bulk_add_matches_rebuild():
+    """Test a bulk sync merged into the index equals building from all rows"""
+    synced = [(f"IC{i:04d}", f"IC {i}", 10.0 + i % 5, [f"X{i}"]) for i in range(100)]
+    # Replaces an existing object too
+    synced.append(("NGC2240", "NGC2240", 9.0, ["Renamed"]))
+
+    index = _build()
+    index.complete("ic")
+    index.add_many(synced)
+
+    expected = PrefixIndex()
+    expected.build([row for row in ROWS if row[0] != "NGC2240"] + synced)
+    assert index._keys == expected._keys
+    assert sorted(index._entries) == sorted(expected._entries)
+    assert len(index.complete("ic", limit=200)) == 101
+    assert index.complete("renamed")[0]["id"] == "NGC2240"
+
+    index.remove("IC0001")
+    expected.build([row for row in ROWS if row[0] != "NGC2240"] + [r for r in synced if r[0] != "IC0001"])
+    assert index._keys == expected._keys
+    assert "IC0001" not in [c["id"] for c in index.complete("x1", limit=200)]
+
+
+def test_normalize_designation():
+    """Test designation spellings collapse to one key"""
+    assert normalize_designation("M 31") == "m31"
+    assert normalize_designation("M031") == "m31"
+    assert normalize_designation("NGC0224") == "ngc224"
+    assert normalize_designation("ngc 224") == "ngc224"
+    assert normalize_designation("IC 0434a") == "ic434a"
+    assert normalize_designation("Horsehead Nebula") == "horseheadnebula"
+
+
+def test_alias_index_resolve():
+    """Test alias lookups map to canonical ids"""
+    index = AliasIndex()
+    index.build(ROWS)
+
+    assert index.resolve("M 31") == "NGC0224"
+    assert index.resolve("NGC 224") == "NGC0224"
+    assert index.resolve("ngc0221") == "NGC0221"
+    assert index.resolve("horsehead nebula") == "IC0434"
+    assert index.resolve("M99") is None
+
+    index.add("IC999", "IC 999", ["IC999"])
+    assert index.resolve("IC 0999") == "IC999"
+
+
+def test_trigram_search_tolerates_typos():
+    """Test misspelled names still find the right object"""
+    index = TrigramIndex()
+    index.build(ROWS + [("NGC1976", "Orion Nebula", 4.0, ["M42"])])
+
+    assert index.search("Andromeda Galxy")[0][0] == "NGC0224"
+    object_id, label, score = index.search("Orian nebula")[0]
+    assert object_id == "NGC1976"
+    assert label == "Orion Nebula"
+    assert 0 < score < 1
+    assert index.search("zzzz qqqq") == []
+
+
+def test_trigram_search_one_hit_per_object():
+    """Test objects are deduplicated and replaced on add"""
+    index = TrigramIndex()
+    index.build(ROWS)
+
+    ids = [object_id for object_id, _, _ in index.search("NGC 224", limit=10)]
+    assert ids[0] == "NGC0224"
+    assert len(ids) == len(set(ids))
+
+    index.add("IC0434", "Pferdekopfnebel", [])
+    assert index.search("horsehead nebula") == []
+    assert index.search("pferdekopf nebel")[0][0] == "IC0434"
+
+
+def test_trigram_exact_match_with_common_trigrams(monkeypatch):
+    """Test trigrams skipped as too common still count for labels containing them"""
+    monkeypatch.setattr(search_index, "MAX_POSTING_LENGTH", 3)
+    index = TrigramIndex()
+    index.build([("NGC0224", "Andromeda Galaxy", 3.4, ["NGC 224"])] + ROWS[1:])
+
+    assert index.search("NGC 224")[0] == ("NGC0224", "NGC 224", 1.0)
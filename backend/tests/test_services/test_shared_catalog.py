@@ -0,0 +1,145 @@
+"""Test catalog snapshots shared between worker processes"""
+import multiprocessing
+import uuid
+from multiprocessing import shared_memory
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.astronomy import AstronomyService
+from app.services.shared_catalog import SharedCatalog, SharedSegment, segment_name
+
+
+@pytest.fixture
+def prefix():
+    prefix = f"skytest-{uuid.uuid4().hex[:8]}"
+    yield prefix
+    # The control block outlives workers by design; remove it after the test
+    try:
+        shared_memory.SharedMemory(name=prefix).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _builder(arrays):
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return arrays, {"key": "v1"}
+
+    return build, calls
+
+
+def _sum_in_child(name, queue):
+    segment = SharedSegment.attach(name)
+    queue.put(float(segment.arrays["ra"].sum()))
+
+
+@pytest.mark.asyncio
+async def test_second_worker_attaches_without_building(prefix):
+    """Test only the first worker builds; the others map the same read-only arrays"""
+    arrays = {"ra": np.arange(5, dtype=np.float64), "types": np.array(["GALAXY", "NEBULA"])}
+    first, second = SharedCatalog(prefix), SharedCatalog(prefix)
+    build, calls = _builder(arrays)
+    try:
+        published = await first.acquire("v1", build, timeout=1)
+        attached = await second.acquire("v1", build, timeout=1)
+
+        assert len(calls) == 1
+        assert published.owner and not attached.owner
+        assert attached.generation == published.generation
+        assert attached.arrays["types"].tolist() == ["GALAXY", "NEBULA"]
+        np.testing.assert_array_equal(attached.arrays["ra"], arrays["ra"])
+        with pytest.raises(ValueError):
+            attached.arrays["ra"][0] = 1.0
+
+        # Another process can attach, and its exit does not remove the segment
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        child = context.Process(target=_sum_in_child, args=(published.name, queue))
+        child.start()
+        assert queue.get(timeout=30) == 10.0
+        child.join()
+        assert SharedSegment.attach(published.name) is not None
+    finally:
+        second.close()
+        first.close()
+
+
+@pytest.mark.asyncio
+async def test_new_generation_replaces_snapshot(prefix):
+    """Test a worker notices a newer snapshot and the publisher unlinks the old one"""
+    first, second = SharedCatalog(prefix), SharedCatalog(prefix)
+    build_v1, _ = _builder({"ra": np.zeros(3)})
+    build_v2, _ = _builder({"ra": np.ones(4)})
+    try:
+        old_generation = (await first.acquire("v1", build_v1, timeout=1)).generation
+        await second.acquire("v1", build_v1, timeout=1)
+        assert not second.stale()
+
+        new = await first.acquire("v2", build_v2, timeout=1)
+        assert new.generation == old_generation + 1
+        assert SharedSegment.attach(segment_name(prefix, "v1")) is None
+
+        assert second.stale()
+        assert not second.stale()  # Each generation is reported once
+        attached = await second.acquire("v2", build_v2, timeout=1)
+        assert attached.arrays["ra"].tolist() == [1.0] * 4
+    finally:
+        second.close()
+        first.close()
+
+    assert SharedSegment.attach(segment_name(prefix, "v2")) is None
+
+
+@pytest.mark.asyncio
+async def test_astronomy_services_share_spatial_index(prefix, monkeypatch):
+    """Test workers in shared mode answer positional queries from one snapshot"""
+    monkeypatch.setattr(settings, "SHARED_CATALOG", True)
+    monkeypatch.setattr(settings, "SHARED_CATALOG_NAME", prefix)
+    monkeypatch.setattr(settings, "USE_CATALOG_STORE", False)
+
+    rows = [
+        {"id": "M65", "name": "M65", "type": "GALAXY", "ra": 169.73, "dec": 13.09,
+         "magnitude": 9.3, "size_major": 8.0, "size_minor": None, "constellation": "Leo"},
+        {"id": "M66", "name": "M66", "type": "GALAXY", "ra": 170.06, "dec": 12.99,
+         "magnitude": None, "size_major": None, "size_minor": 4.0, "constellation": None},
+        {"id": "M42", "name": "Orion Nebula", "type": "NEBULA", "ra": 83.82, "dec": -5.39,
+         "magnitude": 4.0, "size_major": 85.0, "size_minor": 60.0, "constellation": "Ori"},
+    ]
+
+    def worker():
+        service = AstronomyService()
+        service.db.get_catalog_version = AsyncMock(return_value="v1")
+        service.db.count_objects = AsyncMock(return_value=len(rows))
+        service.db.get_last_update = AsyncMock(return_value="2026-01-01 00:00:00")
+        service.db.get_sky_rows = AsyncMock(return_value=rows)
+        return service
+
+    first, second = worker(), worker()
+    try:
+        expected = await first.cone_search(170.0, 13.0, 1.0)
+        shared = await second.cone_search(170.0, 13.0, 1.0)
+
+        second.db.get_sky_rows.assert_not_called()
+        assert shared == expected
+        assert [r["id"] for r in shared] == ["M66", "M65"]
+        assert shared[0]["magnitude"] is None and shared[0]["constellation"] is None
+        assert second._sky_radii.tolist() == [8.0 / 120.0, 4.0 / 120.0, 85.0 / 120.0]
+        assert not second.spatial_index.xyz.flags.writeable
+    finally:
+        second.shared_catalog.close()
+        first.shared_catalog.close()
+
+
+def test_recommendations_use_watched_catalog():
+    """Test the recommender searches the snapshot main.lifespan watches and closes"""
+    from app.api import deps, recommendations
+
+    recommender = recommendations.recommendation_service
+    assert recommender.astronomy is deps.astronomy_service
+    assert recommender.astronomy.shared_catalog is deps.astronomy_service.shared_catalog
+    assert recommender.visibility.astronomy is deps.astronomy_service
@@ -0,0 +1,77 @@
+"""Test sky map snapshot tokens and deltas"""
+import pytest
+
+from app.config import settings
+from app.services.sky_delta import (
+    encode_snapshot, decode_snapshot, view_viewport, compact_positions, diff_positions
+)
+from app.services.viewport import Viewport
+
+
+def _view(**overrides):
+    view = {
+        "version": "1:3:2025-01-01", "latitude": 39.9, "longitude": 116.4,
+        "timestamp": "2025-01-28T22:00:00", "obj_types": ["GALAXY"], "magnitude_limit": 10.0,
+        "max_targets": 100, "unknown_magnitude": 14.0, "viewport": None
+    }
+    view.update(overrides)
+    return view
+
+
+def test_snapshot_token_round_trip():
+    """Test a token decodes to the view it was issued for, viewport included"""
+    viewport = Viewport.from_request({"az_min": 350, "az_max": 20, "alt_min": 10, "alt_max": 40}, margin=5)
+    view = _view(viewport=list(viewport.bounds))
+    token = encode_snapshot(view)
+    assert "=" not in token
+    decoded = decode_snapshot(token)
+    assert decoded == view
+    rebuilt = view_viewport(decoded)
+    assert (rebuilt.az_min, rebuilt.az_span, rebuilt.alt_min, rebuilt.alt_max) == (345.0, 40.0, 5.0, 45.0)
+    assert view_viewport(_view()) is None
+
+
+def test_malformed_snapshot_tokens_are_rejected():
+    """Test garbage, foreign JSON and incomplete views raise ValueError"""
+    for token in ("not a token!", encode_snapshot({"version": "1"})[:-3] + "@@@"):
+        with pytest.raises(ValueError):
+            decode_snapshot(token)
+    with pytest.raises(ValueError):
+        decode_snapshot(encode_snapshot({"version": "1"}))
+    with pytest.raises(ValueError):
+        decode_snapshot("WzEsMl0")  # [1,2]
+
+
+def test_snapshot_token_fields_are_validated():
+    """Test a well-formed token with a bad view is rejected, and its cap is clamped"""
+    bad_views = [
+        _view(timestamp="yesterday"), _view(timestamp=None), _view(latitude="north"),
+        _view(latitude=120.0), _view(magnitude_limit=None), _view(obj_types="GALAXY"),
+        _view(max_targets=0), _view(max_targets="all"), _view(max_targets=1.5),
+        _view(viewport=[0, 90, 10]), _view(viewport=[0, 90, 40, 10]), _view(viewport="north"),
+        _view(version=3)
+    ]
+    for view in bad_views:
+        with pytest.raises(ValueError):
+            decode_snapshot(encode_snapshot(view))
+
+    decoded = decode_snapshot(encode_snapshot(_view(max_targets=10 ** 9)))
+    assert decoded["max_targets"] == settings.SKYMAP_MAX_TARGETS
+
+
+def test_diff_positions():
+    """Test entered, left and moved objects between two views"""
+    previous = compact_positions([
+        {"id": "A", "altitude": 10.001, "azimuth": 100.0},
+        {"id": "B", "altitude": 20.0, "azimuth": 200.0},
+        {"id": "C", "altitude": 30.0, "azimuth": 300.0},
+    ])
+    current = compact_positions([
+        {"id": "D", "altitude": 5.0, "azimuth": 50.0},
+        {"id": "A", "altitude": 10.003, "azimuth": 100.0},
+        {"id": "C", "altitude": 31.0, "azimuth": 301.0},
+    ])
+    entered, left, moved = diff_positions(previous, current)
+    assert entered == [("D", 5.0, 50.0)]
+    assert left == ["B"]
+    assert moved == [("C", 31.0, 301.0)]  # A's rounded position is unchanged
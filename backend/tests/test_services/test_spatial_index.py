@@ -0,0 +1,53 @@
+"""Test RA/Dec spatial index"""
+import random
+
+import numpy as np
+
+from app.services.spatial_index import SpatialIndex, radec_to_xyz
+
+
+def _brute_force(ra, dec, center_ra, center_dec, radius):
+    """Reference cone search by angular separation"""
+    xyz = radec_to_xyz(ra, dec)
+    center = radec_to_xyz(center_ra, center_dec)
+    separations = np.degrees(np.arccos(np.clip(xyz @ center, -1.0, 1.0)))
+    return set(np.nonzero(separations <= radius)[0].tolist())
+
+
+def test_cone_matches_brute_force():
+    """Test grid candidates never miss objects inside the cone"""
+    random.seed(7)
+    ra = [random.uniform(0, 360) for _ in range(3000)]
+    dec = [np.degrees(np.arcsin(random.uniform(-1, 1))) for _ in range(3000)]
+    index = SpatialIndex()
+    index.build(ra, dec)
+
+    for center_ra, center_dec, radius in [
+        (10.0, 41.0, 5.0), (359.5, 0.0, 3.0), (120.0, 89.5, 4.0),
+        (200.0, -88.0, 10.0), (45.0, 10.0, 60.0), (0.0, 0.0, 0.5),
+    ]:
+        indices, separations = index.query_cone(center_ra, center_dec, radius)
+        expected = _brute_force(ra, dec, center_ra, center_dec, radius + 1e-9)
+        assert set(indices.tolist()) == expected
+        assert list(separations) == sorted(separations)
+
+
+def test_cone_ra_wrap_and_pole():
+    """Test neighbours across RA 0°/360° and over the pole"""
+    index = SpatialIndex()
+    index.build([359.9, 0.1, 180.0, 0.0, 90.0], [0.0, 0.0, 0.0, 89.9, 89.9])
+
+    indices, separations = index.query_cone(0.0, 0.0, 0.5)
+    assert sorted(indices.tolist()) == [0, 1]
+    assert np.allclose(separations, [0.1, 0.1])
+
+    indices, _ = index.query_cone(270.0, 89.95, 0.2)
+    assert sorted(indices.tolist()) == [3, 4]
+
+
+def test_empty_index():
+    """Test querying an empty index"""
+    index = SpatialIndex()
+    index.build([], [])
+    indices, separations = index.query_cone(0.0, 0.0, 1.0)
+    assert len(indices) == 0 and len(separations) == 0
@@ -0,0 +1,169 @@
+"""Test background SIMBAD sync jobs"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.config import settings
+from app.services.database import DatabaseService
+from app.services.simbad import CircuitBreaker
+from app.services.sync_jobs import SyncJobQueue
+
+
+def _fake_astronomy(db, sync_objects=None):
+    """Astronomy service stub whose sync succeeds for ids starting with 'M'"""
+    async def default_sync(ids):
+        return [i for i in ids if i.startswith("M")], [i for i in ids if not i.startswith("M")]
+
+    return SimpleNamespace(
+        db=db,
+        simbad=SimpleNamespace(breaker=CircuitBreaker(threshold=1, reset_timeout=0.05)),
+        sync_objects=AsyncMock(side_effect=sync_objects or default_sync)
+    )
+
+
+async def _wait_for(queue, job_id, status):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_checkpoints(tmp_path, monkeypatch):
+    """Test a submitted job is processed in checkpoints and reports throughput"""
+    monkeypatch.setattr(settings, "SIMBAD_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "SIMBAD_SYNC_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "SYNC_JOB_MAX_RATE", 0)
+
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    astronomy = _fake_astronomy(db)
+    queue = SyncJobQueue(astronomy)
+    try:
+        job = await queue.submit(["M1", "M2", "X3", "M4", "M1"])
+        assert job["status"] in ("queued", "running")
+        assert job["total"] == 4
+
+        job = await _wait_for(queue, job["job_id"], "completed")
+        assert job["processed"] == 4
+        assert job["synced"] == ["M1", "M2", "M4"]
+        assert job["failed"] == ["X3"]
+        assert job["eta_seconds"] is None
+        assert astronomy.sync_objects.call_count == 2
+    finally:
+        await queue.stop()
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_from_checkpoint(tmp_path, monkeypatch):
+    """Test a job left running by a previous process resumes after its checkpoint"""
+    monkeypatch.setattr(settings, "SIMBAD_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "SIMBAD_SYNC_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "SYNC_JOB_MAX_RATE", 0)
+
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    await db.create_sync_job("job1", ["M1", "M2", "M3", "M4"], 1000.0)
+    await db.update_sync_job("job1", status="running", started_at=1000.0,
+                             processed=2, synced=["M1", "M2"], failed=[])
+
+    astronomy = _fake_astronomy(db)
+    queue = SyncJobQueue(astronomy)
+    try:
+        await queue.start()
+        job = await _wait_for(queue, "job1", "completed")
+
+        astronomy.sync_objects.assert_called_once_with(["M3", "M4"])
+        assert job["synced"] == ["M1", "M2", "M3", "M4"]
+        # Throughput covers only time spent syncing, not the gap since 1000.0
+        assert job["throughput"] > 1
+    finally:
+        await queue.stop()
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_job(tmp_path):
+    """Test status of a missing job is None"""
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    try:
+        assert await SyncJobQueue(_fake_astronomy(db)).get("nope") is None
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_claims_a_job(tmp_path, monkeypatch):
+    """Test workers starting together run each unfinished job once"""
+    monkeypatch.setattr(settings, "SYNC_JOB_MAX_RATE", 0)
+
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    other_db = DatabaseService(str(tmp_path / "jobs.db"))
+    await db.create_sync_job("job1", ["M1", "M2"], 1000.0)
+
+    first, second = _fake_astronomy(db), _fake_astronomy(other_db)
+    queues = [SyncJobQueue(first), SyncJobQueue(second)]
+    try:
+        for queue in queues:
+            await queue.start()
+        job = await _wait_for(queues[0], "job1", "completed")
+        await asyncio.sleep(0.05)
+
+        assert first.sync_objects.call_count + second.sync_objects.call_count == 1
+        assert job["synced"] == ["M1", "M2"]
+        # A running job with a live owner is not claimable; a lapsed one is
+        assert not await db.claim_sync_job("job1", "someone", 2000.0, lease=60)
+    finally:
+        for queue in queues:
+            await queue.stop()
+        await db.close()
+        await other_db.close()
+
+
+@pytest.mark.asyncio
+async def test_lapsed_claim_is_taken_over(tmp_path):
+    """Test a running job whose owner stopped checkpointing can be claimed"""
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    try:
+        await db.create_sync_job("job1", ["M1"], 1000.0)
+        assert await db.claim_sync_job("job1", "a", 1000.0, lease=60)
+        assert not await db.claim_sync_job("job1", "b", 1030.0, lease=60)
+        assert await db.claim_sync_job("job1", "b", 1100.0, lease=60)
+        assert not await db.update_sync_job("job1", owner="a", processed=1)
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_job_pauses_while_simbad_is_unavailable(tmp_path, monkeypatch):
+    """Test ids SIMBAD could not be asked about are retried, not marked failed"""
+    monkeypatch.setattr(settings, "SIMBAD_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "SYNC_JOB_MAX_RATE", 0)
+
+    attempts = []
+
+    async def sync_objects(ids):
+        attempts.append(list(ids))
+        if len(attempts) == 1:
+            # M1's batch went through, then SIMBAD failed and the breaker opened
+            astronomy.simbad.breaker.record_failure()
+            return ["M1"], [i for i in ids if i != "M1"]
+        astronomy.simbad.breaker.record_success()
+        return [i for i in ids if i.startswith("M")], [i for i in ids if not i.startswith("M")]
+
+    db = DatabaseService(str(tmp_path / "jobs.db"))
+    astronomy = _fake_astronomy(db, sync_objects)
+    queue = SyncJobQueue(astronomy)
+    try:
+        job = await queue.submit(["M1", "M2", "X3"])
+        job = await _wait_for(queue, job["job_id"], "completed")
+
+        assert attempts == [["M1", "M2", "X3"], ["M2", "X3"]]
+        assert job["synced"] == ["M1", "M2"]
+        assert job["failed"] == ["X3"]
+    finally:
+        await queue.stop()
+        await db.close()
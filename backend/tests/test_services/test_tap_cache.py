@@ -0,0 +1,78 @@
+"""Test on-disk TAP response cache"""
+import os
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.simbad import SIMBADService
+from app.services.tap_cache import TAPResponseCache
+
+
+@pytest.mark.asyncio
+async def test_round_trip_ignores_whitespace(tmp_path):
+    """Test queries differing only in formatting share an entry"""
+    cache = TAPResponseCache(str(tmp_path), ttl=60, max_bytes=1 << 20)
+    response = {"data": [{"main_id": "M  31"}]}
+
+    assert await cache.get("SELECT * FROM basic") is None
+    await cache.put("SELECT *\n    FROM basic", response)
+
+    assert await cache.get("  SELECT * FROM   basic ") == response
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_miss(tmp_path):
+    """Test entries older than the TTL are ignored"""
+    cache = TAPResponseCache(str(tmp_path), ttl=60, max_bytes=1 << 20)
+    await cache.put("SELECT 1", {"data": [[1]]})
+
+    cache.ttl = 0.001
+    time.sleep(0.01)
+    assert await cache.get("SELECT 1") is None
+
+    cache.ttl = 0  # Never expire
+    assert await cache.get("SELECT 1") == {"data": [[1]]}
+
+
+@pytest.mark.asyncio
+async def test_empty_responses_use_negative_ttl(tmp_path):
+    """Test a cached 'not found' expires after negative_ttl even when results never expire"""
+    cache = TAPResponseCache(str(tmp_path), ttl=0, max_bytes=1 << 20, negative_ttl=0.001)
+    await cache.put("SELECT 1", {"data": [[1]]})
+    await cache.put("SELECT 2", {"data": []})
+    time.sleep(0.01)
+
+    assert await cache.get("SELECT 1") == {"data": [[1]]}
+    assert await cache.get("SELECT 2") is None
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(tmp_path):
+    """Test the least recently used entries are evicted over max_bytes"""
+    payload = {"data": ["x" * 1000]}
+    cache = TAPResponseCache(str(tmp_path), ttl=0, max_bytes=3500)
+
+    for i in range(3):
+        await cache.put(f"SELECT {i}", payload)
+        past = time.time() - 100 + i
+        os.utime(cache.path(f"SELECT {i}"), (past, past))
+
+    # Touch the oldest so it is most recently used
+    assert await cache.get("SELECT 0") == payload
+    await cache.put("SELECT 3", payload)
+
+    assert await cache.get("SELECT 1") is None
+    assert await cache.get("SELECT 0") == payload
+    assert await cache.get("SELECT 3") == payload
+
+
+@pytest.mark.asyncio
+async def test_simbad_replays_cached_response(tmp_path):
+    """Test a cached TAP response is served without the network"""
+    cache = TAPResponseCache(str(tmp_path), ttl=0, max_bytes=1 << 20)
+    service = SIMBADService(cache=cache)
+    service.start = AsyncMock(side_effect=AssertionError("network used"))
+
+    await cache.put("SELECT 1", {"data": [[1]]})
+    assert await service._execute_tap_query("SELECT 1") == {"data": [[1]]}
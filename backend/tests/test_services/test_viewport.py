@@ -0,0 +1,50 @@
+"""Test alt/az viewports"""
+import math
+
+import numpy as np
+import pytest
+
+from app.services.viewport import Viewport
+
+
+def _altaz_distance(alt1, az1, alt2, az2):
+    alt1, az1, alt2, az2 = map(np.radians, (alt1, az1, alt2, az2))
+    cos_d = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(az1 - az2)
+    return np.degrees(np.arccos(np.clip(cos_d, -1, 1)))
+
+
+def test_box_wraps_through_north():
+    """Test an azimuth range across 0° and the margin around it"""
+    view = Viewport.from_request({"az_min": 350, "az_max": 20, "alt_min": 10, "alt_max": 40}, margin=5)
+    az = np.array([340.0, 346.0, 0.0, 24.0, 26.0, 10.0])
+    alt = np.array([20.0, 20.0, 44.0, 20.0, 20.0, 46.0])
+    assert view.contains_many(az, alt).tolist() == [False, True, True, True, False, False]
+
+
+def test_center_form_and_zenith():
+    """Test center + extent boxes, and boxes reaching the zenith cover every azimuth"""
+    view = Viewport.from_request({"azimuth": 180, "altitude": 30, "width": 40, "height": 20}, margin=0)
+    assert (view.az_min, view.az_span, view.alt_min, view.alt_max) == (160.0, 40.0, 20.0, 40.0)
+
+    overhead = Viewport.from_request({"azimuth": 0, "altitude": 80, "width": 30, "height": 30}, margin=0)
+    assert overhead.full_azimuth
+    assert overhead.bounding_cap() == (90.0, 0.0, 25.0)
+
+    with pytest.raises(ValueError):
+        Viewport.from_request({"azimuth": 0, "altitude": 10}, margin=0)
+
+
+@pytest.mark.parametrize("box", [
+    (100, 160, 10, 50), (300, 40, -20, 30), (10, 200, 40, 70), (0, 90, -60, -10)
+])
+def test_bounding_cap_contains_box(box):
+    """Test every point of the box lies within the cap used for the RA/Dec prefilter"""
+    view = Viewport(*box, margin=2)
+    alt, az, radius = view.bounding_cap()
+
+    rng = np.random.default_rng(3)
+    points_az = (view.az_min + rng.uniform(0, view.az_span, 5000)) % 360
+    points_alt = rng.uniform(view.alt_min, view.alt_max, 5000)
+    assert view.contains_many(points_az, points_alt).all()
+    assert _altaz_distance(alt, az, points_alt, points_az).max() <= radius + 1e-9
+    assert radius < 180 and math.isfinite(radius)
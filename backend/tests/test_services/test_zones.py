@@ -0,0 +1,90 @@
+"""Test compiled visible zones"""
+import numpy as np
+import pytest
+
+from app.services.database import DatabaseService
+from app.services.zones import CompiledZone, ZoneService
+
+
+def _ray_cast(x, y, polygon):
+    inside = False
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[i - 1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+    return inside
+
+
+def test_raster_matches_ray_cast():
+    """Test the raster and batch paths give the plain ray cast's answers"""
+    # A notched, concave horizon line with off-grid vertices
+    polygon = [(10.5, 12.3), (60.2, 18.0), (95.0, 14.5), (95.0, 70.0), (70.3, 40.7),
+               (50.0, 75.5), (30.1, 41.2), (12.0, 62.0), (5.0, 30.0)]
+    zone = CompiledZone("z", "Notch", polygon)
+    assert zone.raster is not None
+    assert zone.azimuth_range == (5.0, 95.0) and zone.altitude_range == (12.3, 75.5)
+
+    rng = np.random.default_rng(7)
+    az = rng.uniform(0, 100, 5000)
+    alt = rng.uniform(0, 80, 5000)
+    expected = np.array([_ray_cast(x, y, polygon) for x, y in zip(az, alt)])
+
+    assert [zone.contains(x, y) for x, y in zip(az, alt)] == expected.tolist()
+    np.testing.assert_array_equal(zone.contains_many(az, alt), expected)
+
+
+@pytest.mark.asyncio
+async def test_saved_zones_compiled_once_per_version(tmp_path):
+    """Test a zone is recompiled only after an update, also one made by another worker"""
+    db_path = str(tmp_path / "zones.db")
+    writer, reader = DatabaseService(db_path), DatabaseService(db_path)
+    zones = ZoneService(reader)
+    try:
+        await writer.save_visible_zone("zone_a", "East", [[90, 20], [120, 20], [120, 60], [90, 60]], 1)
+        first = (await zones.get_zones(["zone_a"]))[0]
+        assert first.version == 1 and first.contains(100, 30)
+        assert (await zones.get_zones(["zone_a"]))[0] is first
+
+        assert await writer.update_visible_zone("zone_a", "East", [[0, 20], [45, 20], [45, 60]], 2) == 2
+        second = (await zones.get_zones(["zone_a"]))[0]
+        assert second is not first
+        assert second.version == 2 and not second.contains(100, 30)
+
+        with pytest.raises(KeyError):
+            await zones.get_zones(["zone_a", "zone_missing"])
+
+        assert await writer.delete_visible_zone("zone_a")
+        assert await zones.list_zones() == []
+        assert await writer.update_visible_zone("zone_a", "East", [[0, 0], [1, 0], [1, 1]], 1) is None
+    finally:
+        await writer.close()
+        await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_zone_crud_keeps_compiled_cache(tmp_path):
+    """Test zones saved through ZoneService are served from its cache and dropped on delete"""
+    db = DatabaseService(str(tmp_path / "zones.db"))
+    zones = ZoneService(db)
+    try:
+        created = await zones.create_zone("East", [[90, 20], [120, 20], [120, 60], [90, 60]], 1)
+        assert (await zones.get_zones([created.id]))[0] is created
+
+        updated = await zones.update_zone(created.id, "East", [[0, 20], [45, 20], [45, 60]], 2)
+        assert updated.version == 2 and not updated.contains(100, 30)
+        assert (await zones.get_zones([created.id]))[0] is updated
+        assert await zones.update_zone("zone_missing", "East", [[0, 0], [1, 0], [1, 1]], 1) is None
+
+        resolved = await zones.resolve_zones([{"polygon": [[0, 0], [10, 0], [10, 10]]}], [created.id])
+        assert [zone.id for zone in resolved] == ["zone_0", created.id]
+        with pytest.raises(ValueError):
+            await zones.resolve_zones([{"polygon": [[0, 0], [10, 0]]}])
+
+        assert await zones.delete_zone(created.id)
+        assert not await zones.delete_zone(created.id)
+        assert created.id not in zones._compiled
+        with pytest.raises(KeyError):
+            await zones.resolve_zones([], [created.id])
+    finally:
+        await db.close()
@@ -1,6 +1,9 @@
+import asyncio
+
+import httpx
 import pytest
-from unittest.mock import AsyncMock, patch
-from app.services.simbad import SIMBADService
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.simbad import CircuitBreaker, SIMBADService, SIMBADUnavailableError
 
 @pytest.mark.asyncio
 async def test_query_object():
@@ -55,3 +58,116 @@ async def test_map_simbad_type():
     assert service._map_simbad_type('GCl') == 'CLUSTER'
     assert service._map_simbad_type('HII') == 'NEBULA'
     assert service._map_simbad_type('') == 'NEBULA'
+
+@pytest.mark.asyncio
+async def test_pooled_client_reused_and_closed():
+    service = SIMBADService(timeout=5.0)
+
+    client = await service.start()
+    assert await service.start() is client
+    assert client.timeout.read == 5.0
+
+    await service.close()
+    assert client.is_closed
+    assert service._client is None
+
+@pytest.mark.asyncio
+async def test_identifier_spellings():
+    service = SIMBADService()
+
+    spellings = service._identifier_spellings('M31')
+    assert 'M31' in spellings
+    assert 'M 31' in spellings
+    assert 'M  31' in spellings
+    assert 'NGC  224' in service._identifier_spellings('NGC0224')
+    assert service._identifier_spellings('Orion Nebula') == ['Orion Nebula']
+
+@pytest.mark.asyncio
+async def test_query_objects_batch_maps_back_to_requested_ids():
+    service = SIMBADService()
+
+    mock_response = {
+        'data': [
+            {'ident': 'M  31', 'oid': 1, 'main_id': 'M  31', 'ra': 10.68, 'dec': 41.27,
+             'galdim_majaxis': 190.0, 'galdim_minaxis': 60.0, 'V': 3.4, 'all_types': 'G'},
+            {'ident': 'M 31', 'oid': 1, 'main_id': 'M  31', 'ra': 10.68, 'dec': 41.27,
+             'galdim_majaxis': 190.0, 'galdim_minaxis': 60.0, 'V': 3.4, 'all_types': 'G'},
+            {'ident': 'NGC  1952', 'oid': 2, 'main_id': 'M   1', 'ra': 83.63, 'dec': 22.01,
+             'galdim_majaxis': None, 'galdim_minaxis': None, 'V': None, 'all_types': 'SNR'},
+        ]
+    }
+
+    with patch.object(service, '_execute_tap_query', return_value=mock_response) as query:
+        objs = await service.query_objects_batch(['M31', 'NGC1952', 'NGC9999'])
+
+    assert sorted(obj.id for obj in objs) == ['M31', 'NGC1952']
+    assert "ident.id IN" in query.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_query_objects_batch_raises_when_unavailable():
+    service = SIMBADService()
+
+    with patch.object(service, '_execute_tap_query', return_value=None):
+        assert await service.query_objects_batch(['M31']) == []
+        with pytest.raises(SIMBADUnavailableError):
+            await service.query_objects_batch(['M31'], raise_on_error=True)
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_and_half_opens():
+    """Test consecutive failures open the breaker and a probe closes it"""
+    service = SIMBADService()
+    service.breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+
+    client = MagicMock()
+    client.is_closed = False
+    client.post = AsyncMock(side_effect=httpx.ConnectError("down"))
+    service._client = client
+    service._client_loop = asyncio.get_running_loop()
+
+    assert await service._execute_tap_query("SELECT 1") is None
+    assert await service._execute_tap_query("SELECT 1") is None
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    # Open: no network call at all
+    assert await service._execute_tap_query("SELECT 1") is None
+    assert client.post.call_count == 2
+
+    # After the reset timeout one probe goes through and closes the breaker
+    service.breaker.opened_at -= 61
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    response = MagicMock()
+    response.json.return_value = {'data': []}
+    client.post = AsyncMock(return_value=response)
+
+    assert await service._execute_tap_query("SELECT 1") == {'data': []}
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_lets_the_next_request_probe():
+    """Test a half-open probe cancelled mid-request does not keep the breaker shut"""
+    service = SIMBADService()
+    service.breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    service.breaker.record_failure()
+    service.breaker.opened_at -= 61
+
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    client = MagicMock()
+    client.is_closed = False
+    client.post = AsyncMock(side_effect=hang)
+    service._client = client
+    service._client_loop = asyncio.get_running_loop()
+
+    probe = asyncio.create_task(service._execute_tap_query("SELECT 1"))
+    await started.wait()
+    assert not service.breaker.allow()  # The probe is in flight
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    assert service.breaker.allow()
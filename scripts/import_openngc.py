@@ -1,26 +1,60 @@
 #!/usr/bin/env python3
 """
 OpenNGC → SQLite Import Script
-Downloads OpenNGC CSV data and imports to SQLite database
+Imports OpenNGC CSV data (downloaded or local files) to SQLite database
 
 Usage:
-    python scripts/import_openngc.py
+    python scripts/import_openngc.py                       # download, incremental update
+    python scripts/import_openngc.py --ngc NGC.csv --addendum addendum.csv
+    python scripts/import_openngc.py --full                # drop and reload everything
+
+Incremental mode keeps a content hash per catalog row and only upserts
+new or changed objects, in one transaction. Rows cached from SIMBAD are
+never touched.
+
+Either way the new catalog is built in a temporary file next to the
+database, validated, stamped with a version and renamed into place, so a
+running API never sees a half-built catalog and hot swaps to the new file.
+The live file's write lock is held from the final copy of API-owned rows
+(SIMBAD misses, sync jobs, cached objects) through the rename, so no API
+write made meanwhile is left behind in the replaced file.
+
+Alongside it a memory-mapped column store (NumPy .npy columns plus string
+offsets) is written under the same version, which API workers map
+read-only at startup instead of loading positions through SQLite.
 
 Output:
     backend/app/data/deep_sky.db
+    backend/app/data/catalog/<version>/
 """
 
+import argparse
 import csv
+import hashlib
+import json
+import os
 import sqlite3
+import sys
 import urllib.request
+import uuid
 import math
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 from io import StringIO
 
+# Tables owned by the running API, carried over into a --full rebuild
+APP_TABLES = ["lookup_misses", "sync_jobs"]
+
+# Saved user data earlier releases kept in the catalog; it now lives in a
+# user database next to it that catalog swaps never replace
+USER_TABLES = ["locations", "equipment", "visible_zones"]
+USER_DB_FILE = "user.db"
+
 # Configuration
 OPENNGC_NGC_URL = "https://raw.githubusercontent.com/mattiaverga/OpenNGC/refs/heads/master/database_files/NGC.csv"
 OPENNGC_ADDENDUM_URL = "https://raw.githubusercontent.com/mattiaverga/OpenNGC/refs/heads/master/database_files/addendum.csv"
+BACKEND_PATH = Path(__file__).parent.parent / "backend"
 DB_PATH = Path(__file__).parent.parent / "backend" / "app" / "data" / "deep_sky.db"
 SCHEMA_PATH = Path(__file__).parent.parent / "backend" / "app" / "data" / "schema.sql"
 
@@ -35,6 +69,14 @@ def download_csv(url: str) -> List[Dict]:
     print(f"✅ Downloaded {len(data)} objects")
     return data
 
+def load_csv(path: Path) -> List[Dict]:
+    """Read a local OpenNGC CSV file"""
+    print(f"Reading {path}...")
+    with open(path, newline='', encoding='utf-8') as f:
+        data = list(csv.DictReader(f, delimiter=';'))
+    print(f"✅ Read {len(data)} objects")
+    return data
+
 def parse_ra_dec(ra_str: str, dec_str: str) -> tuple[float, float]:
     """Parse RA and Dec from HH:MM:SS.SS and +/-DD:MM:SS.SS format to degrees"""
     # RA: HH:MM:SS.SS → degrees
@@ -106,13 +148,14 @@ def create_database(conn: sqlite3.Connection):
     conn.commit()
     print("✅ Schema created")
 
-def import_objects(conn: sqlite3.Connection, data: List[Dict]):
-    """Import objects from OpenNGC CSV data"""
-    print("Importing objects...")
+def build_records(data: List[Dict]) -> Dict[str, Dict]:
+    """
+    Parse OpenNGC CSV rows into per-object records
 
-    objects = []
-    aliases = []
-    observational = []
+    Returns:
+        {object_id: {'object': {...}, 'aliases': [...], 'observational': {...}}}
+    """
+    records = {}
 
     for item in data:
         # Parse name and ID
@@ -170,7 +213,7 @@ def import_objects(conn: sqlite3.Connection, data: List[Dict]):
             'constellation': item.get('Const', ''),
             'surface_brightness': surface_brightness
         }
-        objects.append(obj)
+        aliases = []
 
         # Extract identifiers as aliases
         identifiers = item.get('Identifiers', '')
@@ -212,7 +255,94 @@ def import_objects(conn: sqlite3.Connection, data: List[Dict]):
             'min_aperture': estimate_aperture(magnitude),
             'notes': f"{map_type(obj_type)}"
         }
-        observational.append(obs_info)
+
+        # Duplicate aliases collapse like INSERT OR IGNORE would
+        aliases = list({a['alias']: a for a in aliases}.values())
+        records[obj_id] = {'object': obj, 'aliases': aliases, 'observational': obs_info}
+
+    return records
+
+def _backend():
+    """Import the API's model adapter so derived columns match it exactly"""
+    if str(BACKEND_PATH) not in sys.path:
+        sys.path.insert(0, str(BACKEND_PATH))
+    from app.models.database import DeepSkyObject, ObservationalInfo
+    from app.services.database import OBJECTS_API_DDL
+    from app.services.model_adapter import API_COLUMNS, ModelAdapter
+    return DeepSkyObject, ObservationalInfo, OBJECTS_API_DDL, API_COLUMNS, ModelAdapter
+
+def materialize_api_rows(conn: sqlite3.Connection, object_ids: List[str]) -> List[str]:
+    """
+    Write ready-to-serve objects_api rows for object_ids, plus any object
+    still missing one (first run on an older database, SIMBAD-cached rows)
+    """
+    DeepSkyObject, ObservationalInfo, ddl, columns, ModelAdapter = _backend()
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(objects_api)")}
+    if existing and existing != set(columns):
+        # Derived rows in an older layout: rebuild them all
+        conn.execute("DROP TABLE objects_api")
+    conn.execute(ddl)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_objects_api_type ON objects_api(type)")
+
+    missing = [row[0] for row in conn.execute(
+        "SELECT id FROM objects WHERE id NOT IN (SELECT id FROM objects_api)"
+    )]
+    ids = list(dict.fromkeys(list(object_ids) + missing))
+    if not ids:
+        return []
+
+    adapter = ModelAdapter()
+    conn.row_factory = sqlite3.Row
+    rows = []
+    try:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            aliases = {}
+            for row in conn.execute(f"SELECT object_id, alias FROM aliases WHERE object_id IN ({marks})", chunk):
+                aliases.setdefault(row['object_id'], []).append(row['alias'])
+            obs = {row['object_id']: row for row in conn.execute(
+                f"SELECT * FROM observational_info WHERE object_id IN ({marks})", chunk
+            )}
+            for row in conn.execute(f"SELECT * FROM objects WHERE id IN ({marks})", chunk):
+                info = obs.get(row['id'])
+                obj = DeepSkyObject(
+                    id=row['id'], name=row['name'], type=row['type'], ra=row['ra'], dec=row['dec'],
+                    magnitude=row['magnitude'], size_major=row['size_major'],
+                    size_minor=row['size_minor'], constellation=row['constellation'],
+                    surface_brightness=row['surface_brightness'],
+                    aliases=aliases.get(row['id'], []),
+                    observational_info=ObservationalInfo(
+                        best_month=info['best_month'], difficulty=info['difficulty'],
+                        min_aperture=info['min_aperture'], min_magnitude=info['min_magnitude'],
+                        notes=info['notes']
+                    ) if info else None
+                )
+                api_row = adapter.to_api_row(obj)
+                rows.append(tuple(api_row[c] for c in columns))
+    finally:
+        conn.row_factory = None
+
+    conn.executemany(
+        f"INSERT OR REPLACE INTO objects_api ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        rows
+    )
+    return ids
+
+def record_hash(record: Dict) -> str:
+    """Content hash of one object record"""
+    payload = json.dumps(record, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def import_objects(conn: sqlite3.Connection, data: List[Dict]):
+    """Import objects from OpenNGC CSV data into an empty schema"""
+    print("Importing objects...")
+
+    records = build_records(data)
+    objects = [r['object'] for r in records.values()]
+    aliases = [a for r in records.values() for a in r['aliases']]
+    observational = [r['observational'] for r in records.values()]
 
     # Batch insert
     conn.executemany(
@@ -232,45 +362,355 @@ def import_objects(conn: sqlite3.Connection, data: List[Dict]):
         observational
     )
 
+    conn.executemany(
+        "INSERT OR REPLACE INTO catalog_rows (object_id, content_hash) VALUES (?, ?)",
+        [(obj_id, record_hash(r)) for obj_id, r in records.items()]
+    )
+    materialize_api_rows(conn, [])
+
     conn.commit()
     print(f"✅ Imported {len(objects)} objects")
     print(f"✅ Imported {len(aliases)} aliases")
     print(f"✅ Imported {len(observational)} observational records")
 
-def main():
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the schema only when the database is empty (never drops tables)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'objects'"
+    ).fetchone()
+    if not exists:
+        create_database(conn)
+        return
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS catalog_rows (
+            object_id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL
+        )"""
+    )
+    conn.execute(_backend()[2])
+    conn.commit()
+
+def import_incremental(conn: sqlite3.Connection, data: List[Dict], prune: bool = False) -> Dict[str, List[str]]:
+    """
+    Upsert only new or changed catalog objects in a single transaction
+
+    Objects absent from catalog_rows (e.g. SIMBAD-cached rows) are only
+    overwritten when the catalog now contains them. Catalog objects that
+    disappeared from the CSV are reported, and deleted when prune is set.
+
+    Returns:
+        Diff summary: {'added', 'changed', 'unchanged', 'removed'} id lists,
+        plus 'materialized': ids whose objects_api row was (re)written
+    """
+    records = build_records(data)
+    hashes = {r['object']['id']: record_hash(r) for r in records.values()}
+    previous = dict(conn.execute("SELECT object_id, content_hash FROM catalog_rows"))
+
+    added = [i for i in hashes if i not in previous]
+    changed = [i for i in hashes if i in previous and previous[i] != hashes[i]]
+    unchanged = [i for i in hashes if previous.get(i) == hashes[i]]
+    removed = [i for i in previous if i not in hashes]
+
+    upserts = [records[i] for i in added + changed]
+    touched = [(r['object']['id'],) for r in upserts]
+
+    with conn:
+        conn.executemany(
+            """INSERT INTO objects
+            (id, name, type, ra, dec, magnitude, size_major, size_minor, constellation, surface_brightness)
+            VALUES (:id, :name, :type, :ra, :dec, :magnitude, :size_major, :size_minor, :constellation, :surface_brightness)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name, type = excluded.type, ra = excluded.ra, dec = excluded.dec,
+                magnitude = excluded.magnitude, size_major = excluded.size_major,
+                size_minor = excluded.size_minor, constellation = excluded.constellation,
+                surface_brightness = excluded.surface_brightness,
+                updated_at = CURRENT_TIMESTAMP""",
+            [r['object'] for r in upserts]
+        )
+        conn.executemany("DELETE FROM aliases WHERE object_id = ?", touched)
+        conn.executemany(
+            "INSERT OR IGNORE INTO aliases (object_id, alias) VALUES (:object_id, :alias)",
+            [a for r in upserts for a in r['aliases']]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO observational_info (object_id, best_month, difficulty, min_aperture, notes) "
+            "VALUES (:object_id, :best_month, :difficulty, :min_aperture, :notes)",
+            [r['observational'] for r in upserts]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO catalog_rows (object_id, content_hash) VALUES (?, ?)",
+            [(i, hashes[i]) for i in added + changed]
+        )
+
+        if prune and removed:
+            gone = [(i,) for i in removed]
+            for table, column in [('aliases', 'object_id'), ('observational_info', 'object_id'),
+                                  ('catalog_rows', 'object_id'), ('objects_api', 'id'), ('objects', 'id')]:
+                conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", gone)
+
+        # Derived API columns for touched objects (and any row still lacking them)
+        materialized = materialize_api_rows(conn, added + changed)
+
+    return {'added': added, 'changed': changed, 'unchanged': unchanged, 'removed': removed,
+            'materialized': materialized}
+
+def print_summary(diff: Dict[str, List[str]], prune: bool):
+    """Print the diff summary of an incremental import"""
+    print(f"✅ Added:     {len(diff['added'])}")
+    print(f"✅ Changed:   {len(diff['changed'])}")
+    print(f"   Unchanged: {len(diff['unchanged'])}")
+    removed_label = "Removed" if prune else "Missing from catalog (kept, use --prune)"
+    print(f"   {removed_label}: {len(diff['removed'])}")
+    for key in ('added', 'changed', 'removed'):
+        if diff[key]:
+            sample = ', '.join(diff[key][:10])
+            more = f" (+{len(diff[key]) - 10} more)" if len(diff[key]) > 10 else ""
+            print(f"   {key}: {sample}{more}")
+
+def _shared_columns(conn: sqlite3.Connection, table: str) -> str:
+    """Columns of table both the attached live database and main have"""
+    live_columns = {row[1] for row in conn.execute(f"PRAGMA live.table_info({table})")}
+    return ", ".join(
+        row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")
+        if row[1] in live_columns
+    )
+
+def copy_app_tables(conn: sqlite3.Connection, live_path: Path):
+    """Carry API-owned tables (SIMBAD misses, sync jobs) from the live database"""
+    if not live_path.exists():
+        return
+    conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+    try:
+        live_tables = {row[0] for row in conn.execute(
+            "SELECT name FROM live.sqlite_master WHERE type = 'table'"
+        )}
+        for table in APP_TABLES:
+            if table in live_tables:
+                # The live table may predate newer columns
+                columns = _shared_columns(conn, table)
+                conn.execute(f"DELETE FROM main.{table}")
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM live.{table}")
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE live")
+
+def copy_cached_objects(conn: sqlite3.Connection, live_path: Path):
+    """
+    Carry objects the API cached (SIMBAD rows, in neither catalog_rows)
+    over from the live database, including any saved since the backup
+    """
+    if not live_path.exists():
+        return
+    conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+    try:
+        live_tables = {row[0] for row in conn.execute(
+            "SELECT name FROM live.sqlite_master WHERE type = 'table'"
+        )}
+        # Catalog objects this run pruned are in live.catalog_rows: leave them out
+        query = ("SELECT id FROM live.objects "
+                 "WHERE id NOT IN (SELECT object_id FROM main.catalog_rows)")
+        if 'catalog_rows' in live_tables:
+            query += " AND id NOT IN (SELECT object_id FROM live.catalog_rows)"
+        conn.execute(f"CREATE TEMP TABLE cached_ids AS {query}")
+        for table, column in [('objects', 'id'), ('aliases', 'object_id'),
+                              ('observational_info', 'object_id'), ('objects_api', 'id')]:
+            if table not in live_tables:
+                continue
+            columns = _shared_columns(conn, table)
+            conn.execute(f"DELETE FROM main.{table} WHERE {column} IN (SELECT id FROM cached_ids)")
+            conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM live.{table} "
+                         f"WHERE {column} IN (SELECT id FROM cached_ids)")
+        conn.execute("DROP TABLE cached_ids")
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE live")
+
+def lock_live_database(live_path: Path) -> Optional[sqlite3.Connection]:
+    """
+    Take the live database's write lock (readers still proceed)
+
+    Held from the final copy of API writes through the rename, so the API
+    cannot commit anything in between; the API re-checks the file once it
+    gets the lock and moves to the new one.
+    """
+    if not live_path.exists():
+        return None
+    lock = sqlite3.connect(str(live_path), timeout=30, isolation_level=None)
+    lock.execute("BEGIN IMMEDIATE")
+    return lock
+
+def move_user_tables(live_path: Path):
+    """Move saved user data out of a live catalog from an earlier release into user.db"""
+    if not live_path.exists():
+        return
+    conn = sqlite3.connect(str(live_path.with_name(USER_DB_FILE)))
+    conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+    try:
+        live_tables = dict(conn.execute(
+            "SELECT name, sql FROM live.sqlite_master WHERE type = 'table'"
+        ).fetchall())
+        user_tables = {row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table'"
+        )}
+        for table in USER_TABLES:
+            if table in live_tables and table not in user_tables:
+                conn.execute(live_tables[table])
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)")
+                conn.execute(f"INSERT OR IGNORE INTO main.{table} SELECT * FROM live.{table}")
+                print(f"Moved saved {table} to {USER_DB_FILE}")
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE live")
+        conn.close()
+
+def validate_database(conn: sqlite3.Connection) -> int:
+    """Check a freshly built catalog before it replaces the live one"""
+    result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    if result != 'ok':
+        raise RuntimeError(f"Integrity check failed: {result}")
+    count = conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+    if count == 0:
+        raise RuntimeError("Catalog is empty")
+    return count
+
+def stamp_version(conn: sqlite3.Connection) -> str:
+    """Record a new catalog version in catalog_meta"""
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('version', ?)", (version,)
+    )
+    conn.commit()
+    return version
+
+def emit_catalog_store(conn: sqlite3.Connection, directory: Path, version: str) -> Path:
+    """Write the memory-mapped column store for this catalog version"""
+    _backend()
+    from app.services.catalog_store import write_catalog_store
+    columns = ["id", "name", "type", "ra", "dec", "magnitude", "size_major", "size_minor", "constellation"]
+    cursor = conn.execute(
+        f"SELECT {', '.join('o.' + c for c in columns)}, "
+        "(SELECT GROUP_CONCAT(alias, ',') FROM aliases a WHERE a.object_id = o.id) "
+        "FROM objects o"
+    )
+    rows = [dict(zip(columns + ["aliases"], row)) for row in cursor]
+    last_update = conn.execute("SELECT MAX(updated_at) FROM objects").fetchone()[0]
+    return write_catalog_store(str(directory), rows, version, last_update)
+
+def catalog_version(conn: sqlite3.Connection) -> Optional[str]:
+    """Version stamped into a catalog, if any"""
+    try:
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def store_version(directory: Path) -> Optional[str]:
+    """Version of the active column store, if any"""
+    try:
+        return (directory / "CURRENT").read_text().strip()
+    except OSError:
+        return None
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import OpenNGC CSV data into SQLite")
+    parser.add_argument("--ngc", type=Path, help="Local NGC.csv (default: download)")
+    parser.add_argument("--addendum", type=Path, help="Local addendum.csv (default: download)")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Target database")
+    parser.add_argument("--full", action="store_true", help="Drop all tables and reload everything")
+    parser.add_argument("--prune", action="store_true", help="Delete catalog objects no longer in the CSV")
+    parser.add_argument("--store", type=Path, help="Column store directory (default: catalog/ next to --db)")
+    args = parser.parse_args(argv)
+    if args.store is None:
+        args.store = args.db.parent / "catalog"
+    return args
+
+def main(argv: Optional[List[str]] = None):
     """Main import function"""
     print("=" * 60)
     print("OpenNGC → SQLite Import")
     print("=" * 60)
 
-    # Download data from both files
-    print("\nDownloading NGC.csv...")
-    ngc_data = download_csv(OPENNGC_NGC_URL)
+    args = parse_args(argv)
 
-    print("\nDownloading addendum.csv...")
-    addendum_data = download_csv(OPENNGC_ADDENDUM_URL)
+    # Load data from both files (local when given, otherwise downloaded)
+    print("\nLoading NGC.csv...")
+    ngc_data = load_csv(args.ngc) if args.ngc else download_csv(OPENNGC_NGC_URL)
+
+    print("\nLoading addendum.csv...")
+    addendum_data = load_csv(args.addendum) if args.addendum else download_csv(OPENNGC_ADDENDUM_URL)
 
     # Combine data
     all_data = ngc_data + addendum_data
 
-    # Create database
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
-
-    # Create schema
-    create_database(conn)
-
-    # Import data
-    import_objects(conn, all_data)
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = args.db.with_name(f"{args.db.name}.tmp-{os.getpid()}")
+    if tmp_path.exists():
+        tmp_path.unlink()
 
-    # Verify
-    cursor = conn.execute("SELECT COUNT(*) FROM objects")
-    count = cursor.fetchone()[0]
-    print(f"\n📊 Database statistics:")
-    print(f"   Total objects: {count}")
+    move_user_tables(args.db)
 
-    conn.close()
-    print(f"\n✅ Database saved to: {DB_PATH}")
+    try:
+        # Build into a temporary file; the live database is never written
+        conn = sqlite3.connect(str(tmp_path))
+        if args.full:
+            # Create schema (drops every table) and import data
+            create_database(conn)
+            import_objects(conn, all_data)
+            modified = True
+        else:
+            if args.db.exists():
+                live = sqlite3.connect(str(args.db))
+                live.backup(conn)
+                live.close()
+            ensure_schema(conn)
+            for table in USER_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            print("Importing changed objects...")
+            diff = import_incremental(conn, all_data, prune=args.prune)
+            print_summary(diff, args.prune)
+            modified = bool(diff['materialized'] or (args.prune and diff['removed']))
+
+        # Verify
+        count = validate_database(conn)
+        print(f"\n📊 Database statistics:")
+        print(f"   Total objects: {count}")
+
+        if not modified:
+            version = catalog_version(conn)
+            if version and store_version(args.store) != version:
+                # Store missing or from another build: regenerate it for the live catalog
+                emit_catalog_store(conn, args.store, version)
+                print(f"   Column store written to {args.store / version}")
+            conn.close()
+            tmp_path.unlink()
+            print(f"\n✅ No changes, {args.db} left untouched")
+            print("=" * 60)
+            return
+
+        lock = lock_live_database(args.db)
+        try:
+            # Whatever the API wrote since the backup (or the --full rebuild began)
+            copy_app_tables(conn, args.db)
+            if not args.full:
+                copy_cached_objects(conn, args.db)
+            version = stamp_version(conn)
+            # Store first: a worker reloading after the swap must find the matching store
+            emit_catalog_store(conn, args.store, version)
+            conn.close()
+            os.replace(tmp_path, args.db)
+        finally:
+            if lock is not None:
+                lock.rollback()
+                lock.close()
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    print(f"\n✅ Database saved to: {args.db} (version {version})")
     print("=" * 60)
 
 if __name__ == "__main__":